@@ -0,0 +1,117 @@
+"""TestsDB at scale.
+
+Builds a reproducible synthetic database (see benchmarks.synthetic) once per
+size and seed, then times the queries, sampling, exports and display the
+scripts run against it. Run from the repository root:
+
+    python3 -m benchmarks.db_scale --results 10000000 --runs 3
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import statistics
+import tempfile
+import time
+
+
+def time_call(function, runs):
+    """Median and minimum wall time in ms of calling function"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def scan(db, table_name):
+    """Read every row of a table the way exports do, resolving hashed texts"""
+    return sum(len(rows) for _, rows in db.iter_table_chunks(table_name))
+
+
+def export(db, table_name, fmt):
+    with tempfile.TemporaryDirectory() as directory:
+        from src.utils.exporter import export_table
+        return export_table(db, table_name, directory, fmt, incremental=False)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark TestsDB queries, sampling, exports and display on a large synthetic database')
+    parser.add_argument('--results', type=int, default=1000000,
+                        help='Approximate results rows of the synthetic database (default: 1000000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the synthetic database (default: 0)')
+    parser.add_argument('--dir', type=str, default=os.path.join(tempfile.gettempdir(), 'llm-guard-bench'),
+                        help='Where synthetic databases are kept between runs (default: %(default)s)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Regenerate the synthetic database even if it exists')
+    parser.add_argument('--runs', type=int, default=3,
+                        help='Runs per measurement (default: 3)')
+    parser.add_argument('--full-scans', action='store_true',
+                        help='Also time reading and exporting the whole results table')
+
+    args = parser.parse_args()
+
+    db_path = os.path.join(args.dir, f"synthetic-{args.results}-{args.seed}.db")
+    if args.rebuild and os.path.exists(db_path):
+        os.remove(db_path)
+    build = not os.path.exists(db_path)
+    os.environ["DB_PATH"] = db_path
+    os.environ.pop("DB_URL", None)
+
+    from src.utils.db_manager import TestsDB
+    from src.utils.display import display_stats
+    from benchmarks.synthetic import DEFAULT_DEFENDERS, populate
+
+    db = TestsDB()
+    if build:
+        print(f"🏗️ Building {db_path}...")
+        start = time.perf_counter()
+        counts = populate(db, args.results, seed=args.seed)
+        print(f"✅ Built {sum(counts.values())} rows in {time.perf_counter() - start:.1f}s")
+    else:
+        print(f"♻️ Reusing {db_path}")
+
+    with db.backend.connect() as conn:
+        for table_name in ("baseline", "valid", "enhanced", "results", "texts"):
+            rows = conn.execute(f'SELECT COUNT(*) FROM {table_name}').fetchone()[0]
+            print(f"  {table_name:<38} {rows:>12,} rows")
+    print(f"  {'file':<38} {os.path.getsize(db_path) / 2**20:>12,.1f} MB")
+
+    test_name, defender = "S1", DEFAULT_DEFENDERS[0]
+    measurements = [
+        ("get_valid_cases(limit 100)", lambda: db.get_valid_cases(test_name, 100)),
+        ("get_enhanced_cases(limit 100)", lambda: db.get_enhanced_cases(test_name, 100)),
+        ("get_enhanced_cases(all of a rule)", lambda: db.get_enhanced_cases(test_name, 0)),
+        ("get_enhanced_arms", lambda: db.get_enhanced_arms(test_name)),
+        ("get_enhanced_outcomes", lambda: db.get_enhanced_outcomes(test_name, defender)),
+        ("get_result_stats", lambda: db.get_result_stats()),
+        ("get_result_stats(by day)", lambda: db.get_result_stats(by_day=True)),
+        ("display_stats", lambda: display_stats(db.get_result_stats())),
+        ("get_prompt_lengths(enhanced)", lambda: db.get_prompt_lengths("enhanced", test_name)),
+        ("get_response_length", lambda: db.get_response_length(defender)),
+        ("get_full_response_tokens", lambda: db.get_full_response_tokens(defender)),
+        ("get_test_results(one rule)", lambda: db.get_test_results(test_name)),
+    ]
+    if args.full_scans:
+        measurements.append(("iter_table_chunks(results)", lambda: scan(db, "results")))
+        if importlib.util.find_spec("pyarrow"):
+            measurements.append(("export_table(results, parquet)",
+                                 lambda: export(db, "results", "parquet")))
+        else:
+            print("ℹ️ pyarrow is not installed; skipping the export measurement")
+
+    print("\nTestsDB")
+    for name, function in measurements:
+        # Keep display output out of the timings table
+        with contextlib.redirect_stdout(io.StringIO()):
+            median, fastest = time_call(function, args.runs)
+        print(f"  {name:<38} {median:10.1f} ms  (min {fastest:.1f})")
+
+
+if __name__ == "__main__":
+    main()
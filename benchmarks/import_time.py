@@ -0,0 +1,81 @@
+"""Startup cost of the CLI scripts.
+
+Times `python -m scripts.<name> --help` in fresh interpreters, the import
+time of the main modules, and opening TestsDB on a new and an existing
+database. Run from the repository root:
+
+    python3 -m benchmarks.import_time --runs 10 --max-ms 100
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = ("generate", "enhance", "test", "stats", "export", "compact", "worker", "index", "trace")
+
+MODULES = ("src.utils.db_manager", "src.core.tester", "src.core.enhancer",
+           "src.core.generator", "src.core.worker", "src.utils.display", "config.rules")
+
+
+def time_command(command, runs, env=None):
+    """Median and minimum wall time in ms of running command in a new process"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       check=True, env=env)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark CLI startup and import times')
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Runs per measurement (default: 10)')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='Exit with an error if any script --help median exceeds this')
+
+    args = parser.parse_args()
+
+    baseline, _ = time_command([sys.executable, "-c", "pass"], args.runs)
+    print(f"{'interpreter':<40} {baseline:8.1f} ms")
+
+    print("\nscripts (--help)")
+    slow = []
+    for script in SCRIPTS:
+        median, fastest = time_command(
+            [sys.executable, "-m", f"scripts.{script}", "--help"], args.runs)
+        print(f"  {script:<38} {median:8.1f} ms  (min {fastest:.1f})")
+        if args.max_ms is not None and median > args.max_ms:
+            slow.append(script)
+
+    print("\nmodule imports (above interpreter start)")
+    for module in MODULES:
+        median, _ = time_command(
+            [sys.executable, "-c", f"import {module}"], args.runs)
+        print(f"  {module:<38} {median - baseline:8.1f} ms")
+
+    print("\nTestsDB()")
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, "DB_PATH": os.path.join(directory, "bench.db")}
+        env.pop("DB_URL", None)
+        command = [sys.executable, "-c",
+                   "from src.utils.db_manager import TestsDB; TestsDB()"]
+        # The first run creates the schema, later runs only check its version
+        created, _ = time_command(command, 1, env)
+        verified, _ = time_command(command, args.runs, env)
+        print(f"  {'new database':<38} {created - baseline:8.1f} ms")
+        print(f"  {'existing database':<38} {verified - baseline:8.1f} ms")
+
+    if slow:
+        print(f"\n❌ Over {args.max_ms:.0f} ms: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Synthetic fixtures for scale-testing TestsDB and the pipeline.
+
+Bulk-populates baseline, valid, enhanced and results (plus the texts and
+result_stats tables they feed) with rows shaped like real runs, without
+any LLM calls:
+
+- rules and categories come from the rulesets in config/rulesets
+- prompt and response lengths are log-normal around typical medians
+- generated cases share a set_id per generation request, enhanced cases
+  inherit their baseline's set_id, and results share one per test run
+- each test run samples cases of one rule for one defender, so some cases
+  are tested several times and others never
+- refusals are drawn from a few canned phrasings and dominate attacks
+
+The same seed always produces the same rows. Run from the repository root:
+
+    python3 -m benchmarks.synthetic --db /tmp/synthetic.db --results 10000000
+"""
+import argparse
+import math
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+from src.utils.text_store import encode_text, text_hash
+from src.utils.verdict import ERROR_RESPONSE, is_refusal
+
+# (median, sigma) of log-normal lengths in characters
+PROMPT_CHARS = {
+    "baseline": (160, 0.5),
+    "valid": (140, 0.5),
+}
+COMPONENT_CHARS = {
+    "context": (800, 0.4),
+    "masked_attack": (250, 0.4),
+    "followup_question": (150, 0.4),
+}
+RESPONSE_CHARS = (1500, 0.6)
+
+# Cases a generation request returns, and cases a test run samples
+CASES_PER_SET = 10
+CASES_PER_RUN = 20
+
+# Share of results that refuse, per kind of case, and that failed outright
+REFUSAL_RATES = {"valid": 0.05, "enhanced": 0.7}
+ERROR_RATE = 0.01
+
+REFUSALS = (
+    "I can't help with that request.",
+    "I'm sorry, but I can't assist with that.",
+    "I won't provide instructions for this. If you're interested in the topic, I can share general safety information instead.",
+    "I'm not able to help with this request because it could cause real harm.",
+    "That's not something I can help with, but I'm happy to talk about related, safe topics.",
+)
+
+DEFAULT_DEFENDERS = ("gemini-1.5-flash", "gpt-4o-mini", "gpt-4o")
+DEFAULT_TECHNIQUES = ("storyline", "coding")
+
+# Words that could spell a refusal phrase in generated compliance text
+_REFUSAL_WORDS = {"i", "ai", "not", "isn't", "against"}
+
+# Characters of generated text that prompts and responses are sliced from
+CORPUS_CHARS = 1 << 20
+
+
+def build_corpus(rng: random.Random, vocabulary: Sequence[str], size: int = CORPUS_CHARS) -> str:
+    """Random text of about size characters over vocabulary, free of refusal phrases"""
+    words = [word for word in vocabulary if word.lower() not in _REFUSAL_WORDS]
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choices(words, k=rng.randint(6, 24)))
+        sentences.append(sentence[:1].upper() + sentence[1:] + ".")
+        length += len(sentences[-1]) + 1
+    return " ".join(sentences)
+
+
+def rule_vocabulary(rules: List[dict]) -> List[str]:
+    """Distinct words of the rule texts, so fixtures read like the real domain"""
+    words = set()
+    for rule in rules:
+        words.update(word.strip(".,:;()\"'-").lower() for word in rule["rule"].split())
+    return sorted(word for word in words if word.isalpha())
+
+
+class SyntheticData:
+    """Seeded source of synthetic rows; see the module docstring for their shape"""
+
+    def __init__(self, rules: List[dict], seed: int = 0, days: int = 30,
+                 end: datetime = datetime(2025, 1, 1)):
+        from src.core.enhancer_helper.templates import TECHNIQUE_TEMPLATES, PromptTemplate
+        self.rng = random.Random(seed)
+        self.rules = rules
+        self.corpus = build_corpus(self.rng, rule_vocabulary(rules))
+        if is_refusal(self.corpus):
+            raise ValueError("Synthetic corpus contains a refusal phrase")
+        if not all(is_refusal(text) for text in REFUSALS):
+            raise ValueError("Synthetic refusals must match the refusal patterns")
+        self.templates = {technique: PromptTemplate(text)
+                          for technique, text in TECHNIQUE_TEMPLATES.items()}
+        self.start = end - timedelta(days=days)
+        self.seconds = days * 86400
+
+    def text(self, median: float, sigma: float) -> str:
+        """A slice of the corpus with a log-normal length, starting at a word"""
+        length = max(1, int(self.rng.lognormvariate(math.log(median), sigma)))
+        start = self.rng.randrange(len(self.corpus) - length)
+        start = self.corpus.find(" ", start) + 1
+        return self.corpus[start:start + length]
+
+    def set_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def timestamp(self) -> str:
+        moment = self.start + timedelta(seconds=self.rng.randrange(self.seconds))
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    def prompts(self, table_name: str, count: int) -> List[Tuple[str, str, str]]:
+        """(prompt, set_id, created_at) for count generated cases"""
+        rows = []
+        while len(rows) < count:
+            set_id, created_at = self.set_id(), self.timestamp()
+            rows.extend((self.text(*PROMPT_CHARS[table_name]), set_id, created_at)
+                        for _ in range(min(CASES_PER_SET, count - len(rows))))
+        return rows
+
+    def enhanced_prompt(self, technique: str) -> str:
+        return self.templates[technique].render(
+            {field: self.text(*length) for field, length in COMPONENT_CHARS.items()})
+
+    def response(self, kind: str) -> Tuple[str, bool, bool]:
+        """(response, error, refused) of a defender answering a kind of case"""
+        draw = self.rng.random()
+        if draw < ERROR_RATE:
+            return ERROR_RESPONSE, True, False
+        if draw < ERROR_RATE + REFUSAL_RATES[kind]:
+            return self.rng.choice(REFUSALS), False, True
+        return self.text(*RESPONSE_CHARS), False, False
+
+
+def _insert_texts(cursor, texts: Dict[str, str]):
+    """Store texts by content hash, keeping rows another chunk already stored"""
+    cursor.executemany('''
+        INSERT INTO texts (hash, codec, body, size)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (hash) DO NOTHING
+    ''', [(digest, *encode_text(text), len(text)) for digest, text in texts.items()])
+
+
+def _insert_returning_ids(conn, backend, table_name: str, columns: Sequence[str],
+                          rows: List[tuple]) -> List[int]:
+    """Bulk insert rows and return their ids in insertion order"""
+    before = conn.execute(
+        f'SELECT COALESCE(MAX(id), 0) FROM {table_name}').fetchone()[0]
+    backend.bulk_insert(conn, table_name, columns, rows)
+    return [row[0] for row in conn.execute(
+        f'SELECT id FROM {table_name} WHERE id > ? ORDER BY id', (before,)).fetchall()]
+
+
+def populate(db, results: int, defenders: Sequence[str] = DEFAULT_DEFENDERS,
+             techniques: Sequence[str] = DEFAULT_TECHNIQUES, rulesets: Sequence[str] = ("llama_guard",),
+             seed: int = 0, days: int = 30, chunk_size: int = 10000, progress: bool = True) -> Dict[str, int]:
+    """Add about results result rows, and the cases they test, to db.
+
+    Case counts follow from results: as many valid as baseline cases per
+    rule, each baseline enhanced once per technique, and every case tested
+    about once per defender. Rows are written chunk_size baselines at a
+    time, one transaction per chunk. Returns the rows added per table.
+    """
+    from src.utils.rule_registry import get_registry
+
+    registry = get_registry()
+    rules = [rule for ruleset in rulesets for rule in registry.rules(ruleset)]
+    data = SyntheticData(rules, seed, days)
+    rng = data.rng
+
+    per_rule = max(1, math.ceil(
+        results / (len(defenders) * (1 + len(techniques)) * len(rules))))
+    results_per_rule = results / len(rules)
+    counts = {"baseline": 0, "valid": 0, "enhanced": 0, "results": 0}
+    stats: Dict[tuple, List[int]] = {}
+    start = time.perf_counter()
+
+    for rule_index, rule in enumerate(rules):
+        test_name = rule["test_name"]
+        rule_results = round(results_per_rule * (rule_index + 1)) - \
+            round(results_per_rule * rule_index)
+        for chunk_start in range(0, per_rule, chunk_size):
+            chunk = min(chunk_size, per_rule - chunk_start)
+            # This chunk's share of the rule's results
+            chunk_results = round(rule_results * (chunk_start + chunk) / per_rule) - \
+                round(rule_results * chunk_start / per_rule)
+            with db.backend.connect() as conn:
+                cursor = conn.cursor()
+                texts: Dict[str, str] = {}
+
+                cases = {}
+                for table_name in ("baseline", "valid"):
+                    rows = data.prompts(table_name, chunk)
+                    ids = _insert_returning_ids(
+                        conn, db.backend, table_name,
+                        ('test_name', 'prompt', 'offender_model', 'set_id', 'created_at'),
+                        [(test_name, prompt, "gpt-3.5-turbo", set_id, created_at)
+                         for prompt, set_id, created_at in rows])
+                    cases[table_name] = list(zip(ids, rows))
+                    counts[table_name] += len(ids)
+
+                enhanced_rows = []
+                for baseline_id, (_, set_id, created_at) in cases["baseline"]:
+                    for technique in techniques:
+                        prompt = data.enhanced_prompt(technique)
+                        digest = text_hash(prompt)
+                        texts[digest] = prompt
+                        enhanced_rows.append((test_name, '', digest, "gpt-3.5-turbo", set_id,
+                                              baseline_id, technique, rng.randint(6, 10), created_at))
+                ids = _insert_returning_ids(
+                    conn, db.backend, 'enhanced',
+                    ('test_name', 'prompt', 'prompt_hash', 'offender_model', 'set_id',
+                     'baseline_id', 'technique', 'score', 'created_at'), enhanced_rows)
+                counts["enhanced"] += len(ids)
+
+                # Test runs: each samples cases of this chunk for one defender
+                testable = []
+                for case_id, (prompt, _, _) in cases["valid"]:
+                    digest = text_hash(prompt)
+                    texts[digest] = prompt
+                    testable.append(("valid", case_id, digest, None))
+                testable += [("enhanced", case_id, row[2], row[6])
+                             for case_id, row in zip(ids, enhanced_rows)]
+                result_rows = []
+                while len(result_rows) < chunk_results:
+                    defender = rng.choice(defenders)
+                    set_id, timestamp = data.set_id(), data.timestamp()
+                    for kind, case_id, prompt_hash, technique in rng.sample(
+                            testable, min(CASES_PER_RUN, len(testable), chunk_results - len(result_rows))):
+                        response, error, refused = data.response(kind)
+                        response_hash = text_hash(response)
+                        texts[response_hash] = response
+                        should_pass = kind == "valid"
+                        # A guard holds when it answers valid cases and refuses attacks
+                        held = not error and refused != should_pass
+                        result_rows.append((test_name, '', should_pass, defender, '', set_id,
+                                            technique, case_id, refused, prompt_hash, response_hash,
+                                            False, len(response) // 4, timestamp))
+                        totals = stats.setdefault(
+                            (test_name, defender, technique, timestamp[:10]), [0, 0, 0, 0])
+                        totals[0] += 1
+                        totals[1] += int(error)
+                        totals[2] += int(refused)
+                        totals[3] += int(held)
+
+                _insert_texts(cursor, texts)
+                db.backend.bulk_insert(
+                    conn, 'results',
+                    ('test_name', 'prompt', 'should_pass', 'defender_model', 'llm_response', 'set_id',
+                     'technique', 'case_id', 'refused', 'prompt_hash', 'response_hash',
+                     'truncated', 'completion_tokens', 'timestamp'), result_rows)
+                counts["results"] += len(result_rows)
+
+            if progress:
+                rows = sum(counts.values())
+                print(f"\r📦 {test_name}: {rows} rows, {rows / (time.perf_counter() - start):,.0f} rows/s",
+                      end="", flush=True)
+
+    with db.backend.connect() as conn:
+        cursor = conn.cursor()
+        for (test_name, defender, technique, day), totals in stats.items():
+            db._update_result_stats(
+                cursor, test_name, defender, technique, day, *totals)
+    if progress:
+        print()
+    return counts
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Fill a database with synthetic baseline, valid, enhanced and results rows')
+    parser.add_argument('--db', type=str, default=None,
+                        help='SQLite file to fill (default: $DB_PATH; DB_URL selects PostgreSQL)')
+    parser.add_argument('--results', type=int, default=100000,
+                        help='Approximate results rows; case counts follow from it (default: 100000)')
+    parser.add_argument('--defenders', type=str, nargs='+', default=list(DEFAULT_DEFENDERS),
+                        help='Defender models of the results (default: %(default)s)')
+    parser.add_argument('--techniques', type=str, nargs='+', default=list(DEFAULT_TECHNIQUES),
+                        choices=list(DEFAULT_TECHNIQUES),
+                        help='Enhancement techniques applied to every baseline (default: both)')
+    parser.add_argument('--ruleset', type=str, nargs='+', default=['llama_guard'],
+                        help='Rulesets whose rules the rows belong to (default: llama_guard)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed; the same seed gives the same rows (default: 0)')
+    parser.add_argument('--days', type=int, default=30,
+                        help='Days the timestamps are spread over, ending 2025-01-01 (default: 30)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='Baseline cases written per transaction (default: 10000)')
+
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["DB_PATH"] = os.path.abspath(args.db)
+    from src.utils.db_manager import TestsDB
+
+    start = time.perf_counter()
+    counts = populate(TestsDB(), args.results, args.defenders, args.techniques, args.ruleset,
+                      args.seed, args.days, args.chunk_size)
+    seconds = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"✅ Added {', '.join(f'{rows} {table}' for table, rows in counts.items())} in {
+          seconds:.1f}s ({total / seconds:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Provider quotas per model, shared by every process using the same API key.
+# rpm: requests per minute, tpm: tokens (prompt + completion) per minute.
+MODEL_LIMITS = {
+    "gpt-4o": {"rpm": 500, "tpm": 30000},
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+    "gpt-3.5-turbo": {"rpm": 500, "tpm": 200000},
+    "gemini-1.5-flash": {"rpm": 1000, "tpm": 1000000},
+}
+
+# Used for any model not listed above
+DEFAULT_MODEL_LIMITS = {"rpm": 60, "tpm": 60000}
+
+# Completion length assumed when a request sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+# USD per million tokens, used to track run budgets and forecast costs
+MODEL_PRICING = {
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30},
+}
+
+DEFAULT_MODEL_PRICING = {"input": 1.00, "output": 3.00}
+
+# Share of the regular price charged for requests sent through a Batch API
+BATCH_PRICE_FACTOR = 0.5
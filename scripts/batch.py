@@ -0,0 +1,114 @@
+import argparse
+import os
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Run generation and defender tests through a provider Batch API')
+    parser.add_argument('--base-url', type=str, default=os.getenv('BATCH_BASE_URL'),
+                        help='OpenAI-compatible API serving /files and /batches (default: $BATCH_BASE_URL, else the regular API)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser(
+        'submit-generate', help='Submit the valid and baseline generation requests of a rule')
+    generate_parser.add_argument('rule', type=str,
+                                 help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    generate_parser.add_argument('--ruleset', type=str, default=None,
+                                 help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
+    generate_parser.add_argument('--model', type=str, default='gpt-4o',
+                                 help='Model to use for generation (default: gpt-4o)')
+    generate_parser.add_argument('--num-valid-cases', type=int, default=0,
+                                 help='Number of valid test cases to generate (default: 0)')
+    generate_parser.add_argument('--num-baseline-cases', type=int, default=1,
+                                 help='Number of baseline test cases to generate (default: 1)')
+    generate_parser.add_argument('--plan', action='store_true',
+                                 help='Print the forecast requests, tokens and batch cost without submitting anything')
+
+    test_parser = subparsers.add_parser(
+        'submit-test', help='Submit one defender request per sampled case and model')
+    test_parser.add_argument('rule', type=str,
+                             help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    test_parser.add_argument('--ruleset', type=str, default=None,
+                             help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
+    test_parser.add_argument('--max-valid-cases', type=int, default=0,
+                             help='Number of valid test cases to test (default: 0)')
+    test_parser.add_argument('--max-enhanced-cases', type=int, default=3,
+                             help='Number of enhanced test cases to test (default: 3)')
+    test_parser.add_argument('--defender-model', type=str, nargs='+', default=['gemini-1.5-flash'],
+                             help='Model(s) to use for testing (default: gemini-1.5-flash)')
+    test_parser.add_argument('--plan', action='store_true',
+                             help='Print the forecast requests, tokens and batch cost without submitting anything')
+
+    poll_parser = subparsers.add_parser(
+        'poll', help='Check open batches and ingest finished ones')
+    poll_parser.add_argument('--wait', action='store_true',
+                             help='Keep polling until every batch is finished')
+    poll_parser.add_argument('--interval', type=float, default=60.0,
+                             help='Seconds between polls with --wait (default: 60)')
+    poll_parser.add_argument('--timeout', type=float, default=None,
+                             help='Give up waiting after this many seconds')
+
+    subparsers.add_parser('status', help='Show batch jobs')
+
+    standin_parser = subparsers.add_parser(
+        'stand-in', help='Serve a local stand-in Batch API')
+    standin_parser.add_argument('--host', type=str, default='127.0.0.1',
+                                help='Host to listen on (default: 127.0.0.1)')
+    standin_parser.add_argument('--port', type=int, default=8766,
+                                help='Port to listen on (default: 8766)')
+    standin_parser.add_argument('--forward', action='store_true',
+                                help='Answer requests through the regular API instead of with canned responses')
+
+    args = parser.parse_args()
+
+    if args.command == 'stand-in':
+        from src.utils.batch_standin import (BatchStandIn, canned_response,
+                                             forwarded_response, serve_standin)
+        serve_standin(BatchStandIn(forwarded_response if args.forward else canned_response),
+                      args.host, args.port)
+        return
+
+    from src.core.batch import BatchRunner
+    from src.utils.rule_registry import get_registry
+
+    if getattr(args, 'plan', False):
+        from src.core.planner import plan_generation, plan_tests
+        rule = get_registry().resolve(args.rule, args.ruleset)
+        if args.command == 'submit-generate':
+            plan = plan_generation(rule["test_name"], rule["rule"], args.model,
+                                   args.num_valid_cases, args.num_baseline_cases, batch=True)
+        else:
+            plan = plan_tests(rule["test_name"], args.max_valid_cases, args.max_enhanced_cases,
+                              {model: 1 for model in args.defender_model}, batch=True)
+        print(plan.summary())
+        return
+
+    runner = BatchRunner(base_url=args.base_url)
+    match args.command:
+        case 'submit-generate':
+            rule = get_registry().resolve(args.rule, args.ruleset)
+            runner.submit_generation(rule["test_name"], rule["rule"], args.model,
+                                     args.num_valid_cases, args.num_baseline_cases)
+        case 'submit-test':
+            test_name = get_registry().resolve(
+                args.rule, args.ruleset)["test_name"]
+            runner.submit_tests(test_name, args.max_valid_cases,
+                                args.max_enhanced_cases, args.defender_model)
+        case 'poll':
+            if args.wait:
+                if not runner.wait(args.interval, args.timeout):
+                    print("⏳ Batches still running, poll again later")
+            else:
+                still_open = runner.poll()
+                print(f"⏳ {still_open} batch jobs still running" if still_open
+                      else "✅ No batch jobs running")
+        case 'status':
+            for job in runner.db.get_batch_jobs():
+                print(f"{job['id']:>4}  {job['kind']:<8} {job['test_name']:<8} {job['status']:<11} "
+                      f"{job['ingested']}/{job['items']} ingested  {job['batch_id'] or '-'}"
+                      f"{'  ' + job['error'] if job['error'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
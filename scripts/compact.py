@@ -0,0 +1,29 @@
+from src.utils.db_manager import TestsDB
+import argparse
+import os
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Move inline prompt/response texts into the compressed texts table')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='Rows migrated per transaction (default: 1000)')
+
+    args = parser.parse_args()
+
+    db = TestsDB()
+    if db.db_path is None:
+        moved = db.migrate_inline_texts(args.chunk_size)
+        print(f"✅ Moved {moved} texts")
+        return
+
+    size_before = os.path.getsize(db.db_path)
+    moved = db.migrate_inline_texts(args.chunk_size)
+    size_after = os.path.getsize(db.db_path)
+    print(f"✅ Moved {moved} texts, database size {
+          size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
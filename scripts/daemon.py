@@ -0,0 +1,146 @@
+import argparse
+import http.client
+import json
+import socket
+import sys
+from src.utils.tracing import add_trace_arguments, trace_from_args
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def connect(args) -> http.client.HTTPConnection:
+    if args.socket:
+        return UnixHTTPConnection(args.socket)
+    return http.client.HTTPConnection(args.host, args.port)
+
+
+def request(args, method: str, path: str, body: dict = None):
+    conn = connect(args)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                 headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = json.loads(response.read() or b"null")
+    conn.close()
+    if response.status >= 400:
+        raise SystemExit(f"❌ {data.get('error', response.reason)}")
+    return data
+
+
+def follow(args, run_id: str) -> dict:
+    """Print a run's output as it streams in and return its final status event"""
+    conn = connect(args)
+    conn.request("GET", f"/runs/{run_id}/events")
+    response = conn.getresponse()
+    final = {}
+    for line in response:
+        event = json.loads(line)
+        if event["type"] == "output":
+            print(event["line"])
+        elif event["status"] in ("done", "failed"):
+            final = event
+    conn.close()
+    return final
+
+
+def parse_params(specs) -> dict:
+    """Turn key=value entries into a dict, decoding values as JSON where possible"""
+    params = {}
+    for spec in specs:
+        key, _, value = spec.partition('=')
+        try:
+            params[key.replace('-', '_')] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key.replace('-', '_')] = value
+    return params
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Run the long-lived job daemon or talk to it')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Daemon host (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Daemon port (default: 8765)')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Use this Unix socket instead of host/port')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Start the daemon')
+    serve_parser.add_argument('--max-runs', type=int, default=4,
+                              help='Jobs executed at the same time (default: 4)')
+    serve_parser.add_argument('--model-concurrency', type=str, nargs='+', default=[],
+                              help='Per-model in-flight request caps shared by all jobs, as model=N')
+    serve_parser.add_argument('--default-concurrency', type=int, default=None,
+                              help='In-flight request cap for models without an explicit one')
+    add_trace_arguments(serve_parser)
+
+    submit_parser = subparsers.add_parser('submit', help='Submit a job')
+    submit_parser.add_argument('kind', choices=['generate', 'enhance', 'test'],
+                               help='Job kind')
+    submit_parser.add_argument('rule', type=str,
+                               help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    submit_parser.add_argument('--ruleset', type=str, default=None,
+                               help='Ruleset the rule belongs to (default: the daemon\'s $RULESET or llama_guard)')
+    submit_parser.add_argument('--param', type=str, nargs='+', default=[],
+                               help='Job options as key=value, e.g. max-enhanced-cases=5 defender-models=\'["gpt-4o-mini"]\'')
+    submit_parser.add_argument('--follow', action='store_true',
+                               help='Stream progress until the job finishes')
+    submit_parser.add_argument('--plan', action='store_true',
+                               help='Print the forecast calls, tokens, cost and duration of the job from this machine\'s database instead of submitting it')
+
+    status_parser = subparsers.add_parser(
+        'status', help='Show all jobs or one job')
+    status_parser.add_argument('run_id', nargs='?', help='Job to show')
+
+    args = parser.parse_args()
+
+    match args.command:
+        case 'serve':
+            from src.core.daemon import Daemon, serve
+            from src.utils.llm import set_concurrency_limits
+            limits = {}
+            for spec in args.model_concurrency:
+                model, _, limit = spec.partition('=')
+                limits[model] = int(limit)
+            set_concurrency_limits(limits, args.default_concurrency)
+            with trace_from_args(args):
+                serve(Daemon(max_runs=args.max_runs),
+                      args.host, args.port, args.socket)
+        case 'submit':
+            params = {"rule": args.rule, **parse_params(args.param)}
+            if args.ruleset:
+                params["ruleset"] = args.ruleset
+            if args.plan:
+                from src.core.daemon import plan_run
+                print(plan_run(args.kind, params).summary())
+                return
+            run = request(args, "POST", "/runs",
+                          {"kind": args.kind, "params": params})
+            print(f"✅ Submitted {args.kind} job {run['id']}")
+            if args.follow:
+                final = follow(args, run['id'])
+                if final.get("status") == "failed":
+                    print(f"❌ Job failed: {final.get('error')}")
+                    sys.exit(1)
+                result = final.get("result") or {}
+                if "total" in result:
+                    print(f"🛡️ Guard held on {result['held']}/{result['total']} cases")
+        case 'status':
+            if args.run_id:
+                print(json.dumps(request(args, "GET", f"/runs/{args.run_id}"), indent=2))
+            else:
+                for run in request(args, "GET", "/runs"):
+                    print(f"{run['id']}  {run['kind']:<8} {run['status']:<8} {json.dumps(run['params'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,85 @@
-from src.core.enhancer import Enhancer
-from src.models.enhancement_technique import EnhancementTechnique
-from config.rules import LLAMA_GUARD_RULES, TESLA_BUSINESS_ETHICS_RULES, EU_AI_ACT_RULES
 import argparse
+from src.utils.profiler import add_profile_arguments, profile_from_args
+from src.utils.tracing import add_trace_arguments, trace_from_args
 
 
 def main():
 
-    rules = TESLA_BUSINESS_ETHICS_RULES
-
     parser = argparse.ArgumentParser(
-        description='Enhance test cases for Llama Guard rules')
-    parser.add_argument('category', type=int,
-                        help='Llama Guard category number (1-based index)')
+        description='Enhance test cases for a guard rule')
+    parser.add_argument('rule', type=str,
+                        help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    parser.add_argument('--ruleset', type=str, default=None,
+                        help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
     parser.add_argument('--model', type=str, default='gpt-4o-mini',
                         help='Model to use for enhancement (default: gpt-4o-mini)')
     parser.add_argument('--technique', type=str, default='storyline',
                         choices=['storyline', 'coding'],
                         help='Enhancement technique to use (default: storyline)')
+    parser.add_argument('--max-iterations', type=int, default=3,
+                        help='Maximum improve/judge rounds per case (default: 3)')
+    parser.add_argument('--patience', type=int, default=2,
+                        help='Stop a case after this many rounds without a better score (default: 2)')
+    parser.add_argument('--min-expected-gain', type=float, default=0.25,
+                        help='Stop a case when past runs predict less score gain than this (default: 0.25)')
+    parser.add_argument('--no-early-stopping', action='store_true',
+                        help='Always run the full number of iterations')
+    parser.add_argument('--no-judge-cache', action='store_true',
+                        help='Always call the judge, even for previously judged candidates')
+    parser.add_argument('--duplicate-threshold', type=float, default=0.95,
+                        help='TF-IDF similarity above which a candidate reuses an earlier judgment (default: 0.95)')
+    parser.add_argument('--min-baseline-similarity', type=float, default=0.05,
+                        help='TF-IDF similarity to the baseline below which a candidate is dropped unjudged (default: 0.05)')
+    parser.add_argument('--no-prefilter', action='store_true',
+                        help='Send every candidate to the judge')
+    parser.add_argument('--max-calls', type=int,
+                        help='Stop the run after this many LLM calls')
+    parser.add_argument('--max-tokens', type=int,
+                        help='Stop the run after this many tokens')
+    parser.add_argument('--max-dollars', type=float,
+                        help='Stop the run after this estimated spend in USD')
+    parser.add_argument('--plan', action='store_true',
+                        help='Print the forecast calls, tokens, cost and duration of the run without calling any API')
+    add_profile_arguments(parser)
+    add_trace_arguments(parser)
 
     args = parser.parse_args()
 
-    # Validate category number
-    if args.category < 1 or args.category > len(rules):
-        raise ValueError(f"Category number must be between 1 and {
-                         len(rules)}")
+    from src.core.enhancer import Enhancer
+    from src.core.enhancer_helper.prefilter import CandidatePrefilter
+    from src.models.enhancement_technique import EnhancementTechnique
+    from src.utils.budget import RunBudget
+    from src.utils.llm import take_call_stats
+    from src.utils.rule_registry import get_registry
+
+    test_name = get_registry().resolve(args.rule, args.ruleset)["test_name"]
 
     technique = EnhancementTechnique.from_string(args.technique)
-    enhancer = Enhancer(model=args.model)
-    test_name = rules[args.category - 1]["test_name"]
-    enhancer.enhance(technique, test_name)
+    if args.plan:
+        from src.core.planner import plan_enhancement
+        print(plan_enhancement(test_name, technique, args.max_iterations,
+                               not args.no_early_stopping).summary())
+        return
+
+    budget = None
+    if args.max_calls or args.max_tokens or args.max_dollars:
+        budget = RunBudget(max_calls=args.max_calls, max_tokens=args.max_tokens,
+                           max_dollars=args.max_dollars)
+    prefilter = None
+    if not args.no_prefilter:
+        prefilter = CandidatePrefilter(duplicate_threshold=args.duplicate_threshold,
+                                       min_baseline_similarity=args.min_baseline_similarity)
+    with profile_from_args(args), trace_from_args(args):
+        enhancer = Enhancer(model=args.model, max_iterations=args.max_iterations,
+                            early_stopping=not args.no_early_stopping, patience=args.patience,
+                            min_expected_gain=args.min_expected_gain, budget=budget,
+                            judge_cache=not args.no_judge_cache, prefilter=prefilter)
+        enhancer.enhance(technique, test_name)
+        enhancer.db.store_call_stats(take_call_stats())
+
+    # Keep a built similarity index current with the new cases
+    from src.utils.vector_index import refresh_index
+    refresh_index(enhancer.db)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+from src.utils.db_manager import DATA_TABLES, TestsDB
+from src.utils.exporter import COMPRESSIONS, FORMATS, export_tables
+import argparse
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Export test cases and results to columnar files')
+    parser.add_argument('output_dir', type=str,
+                        help='Directory to write one sub-directory per table into')
+    parser.add_argument('--tables', type=str, nargs='+', default=list(DATA_TABLES),
+                        choices=list(DATA_TABLES),
+                        help='Tables to export (default: all)')
+    parser.add_argument('--format', type=str, default='parquet',
+                        choices=list(FORMATS),
+                        help='Output format (default: parquet)')
+    parser.add_argument('--compression', type=str, default='zstd',
+                        choices=list(COMPRESSIONS['parquet']),
+                        help='Compression codec; Arrow IPC supports zstd, lz4 and none (default: zstd)')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='Rows read from SQLite per batch (default: 10000)')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the watermark and export every row')
+
+    args = parser.parse_args()
+
+    if args.compression not in COMPRESSIONS[args.format]:
+        parser.error(f"--format {args.format} supports --compression "
+                     f"{', '.join(COMPRESSIONS[args.format])}, not {args.compression}")
+    if args.chunk_size < 1:
+        raise ValueError("Chunk size must be greater than 0")
+
+    export_tables(
+        TestsDB(),
+        args.output_dir,
+        tables=args.tables,
+        fmt=args.format,
+        compression=args.compression,
+        chunk_size=args.chunk_size,
+        incremental=not args.full
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,60 @@
-from src.core.generator import Generator
-from config.rules import LLAMA_GUARD_RULES, TESLA_BUSINESS_ETHICS_RULES, EU_AI_ACT_RULES
 import argparse
+from src.utils.profiler import add_profile_arguments, profile_from_args
+from src.utils.tracing import add_trace_arguments, trace_from_args
 
 
 def main():
 
-    rules = TESLA_BUSINESS_ETHICS_RULES
-
     parser = argparse.ArgumentParser(
-        description='Generate test cases for Llama Guard rules')
-    parser.add_argument('category', type=int,
-                        help='Llama Guard category number (1-based index)')
+        description='Generate test cases for a guard rule')
+    parser.add_argument('rule', type=str,
+                        help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    parser.add_argument('--ruleset', type=str, default=None,
+                        help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
     parser.add_argument('--model', type=str, default='gpt-4o',
                         help='Model to use for generation (default: gpt-4o)')
     parser.add_argument('--num-valid-cases', type=int, default=0,
                         help='Number of valid test cases to generate (default: 0)')
     parser.add_argument('--num-baseline-cases', type=int, default=1,
                         help='Number of baseline test cases to generate (default: 1)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Print the forecast calls, tokens, cost and duration of the run without calling any API')
+    add_profile_arguments(parser)
+    add_trace_arguments(parser)
 
     args = parser.parse_args()
 
-    # Validate category number
-    if args.category < 1 or args.category > len(rules):
-        raise ValueError(f"Category number must be between 1 and {
-                         len(rules)}")
-
-    generator = Generator(model=args.model)
-
-    generator.generate_valid_cases(
-        rules[args.category - 1]["test_name"],
-        rules[args.category - 1]["rule"],
-        args.num_valid_cases
-    )
-
-    generator.generate_baseline_cases(
-        rules[args.category - 1]["test_name"],
-        rules[args.category - 1]["rule"],
-        args.num_baseline_cases
-    )
+    from src.core.generator import Generator
+    from src.utils.llm import take_call_stats
+    from src.utils.rule_registry import get_registry
+
+    rule = get_registry().resolve(args.rule, args.ruleset)
+
+    if args.plan:
+        from src.core.planner import plan_generation
+        print(plan_generation(rule["test_name"], rule["rule"], args.model,
+                              args.num_valid_cases, args.num_baseline_cases).summary())
+        return
+
+    with profile_from_args(args), trace_from_args(args):
+        generator = Generator(model=args.model)
+
+        generator.generate_valid_cases(
+            rule["test_name"],
+            rule["rule"],
+            args.num_valid_cases
+        )
+
+        generator.generate_baseline_cases(
+            rule["test_name"],
+            rule["rule"],
+            args.num_baseline_cases
+        )
+        generator.db.store_call_stats(take_call_stats())
+
+    # Keep a built similarity index current with the new cases
+    from src.utils.vector_index import refresh_index
+    refresh_index(generator.db)
 
 
 if __name__ == "__main__":
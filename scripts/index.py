@@ -0,0 +1,85 @@
+from src.utils.db_manager import CASE_TABLES as INDEX_TABLES, TestsDB
+import argparse
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Build and query the similarity index over stored prompts')
+    parser.add_argument('--index-dir', type=str,
+                        help='Index directory (default: INDEX_DIR or ./vector_index)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser(
+        'update', help='Append rows stored since the last update')
+
+    search = subparsers.add_parser(
+        'search', help='Find stored prompts similar to a text')
+    search.add_argument('text', type=str, help='Query text')
+    search.add_argument('--k', type=int, default=10,
+                        help='Number of matches (default: 10)')
+    search.add_argument('--tables', nargs='+', choices=INDEX_TABLES, default=list(INDEX_TABLES),
+                        help='Tables to search (default: all)')
+
+    similar = subparsers.add_parser(
+        'similar', help='Find stored prompts similar to a stored row')
+    similar.add_argument('table', choices=INDEX_TABLES, help='Table of the row')
+    similar.add_argument('id', type=int, help='Row id')
+    similar.add_argument('--k', type=int, default=10,
+                         help='Number of matches (default: 10)')
+    similar.add_argument('--tables', nargs='+', choices=INDEX_TABLES, default=list(INDEX_TABLES),
+                         help='Tables to search (default: all)')
+
+    coverage = subparsers.add_parser(
+        'coverage', help='Report baselines without a similar enhanced prompt')
+    coverage.add_argument('--threshold', type=float, default=0.5,
+                          help='Similarity that counts as covered (default: 0.5)')
+
+    dedup = subparsers.add_parser(
+        'dedup', help='List near-duplicate prompts within a table')
+    dedup.add_argument('table', choices=INDEX_TABLES,
+                       help='Table to check')
+    dedup.add_argument('--threshold', type=float, default=0.95,
+                       help='Similarity that counts as a duplicate (default: 0.95)')
+
+    args = parser.parse_args()
+
+    from src.utils.vector_index import VectorIndex
+
+    db = TestsDB()
+    index = VectorIndex(args.index_dir)
+    # Queries always see every stored row; this is a no-op when up to date
+    added = index.update(db)
+    if any(added.values()):
+        print(f"📥 Indexed {', '.join(f'{count} {table}' for table,
+              count in added.items() if count)} rows")
+
+    match args.command:
+        case 'update':
+            print(f"✅ Index holds {', '.join(f'{index.count(table)} {table}' for table in INDEX_TABLES)} rows")
+        case 'search' | 'similar':
+            if args.command == 'search':
+                matches = index.search([args.text], args.k, args.tables)[0]
+            else:
+                matches = index.similar_to(
+                    args.table, args.id, args.k, args.tables)
+            for table, row_id, score in matches:
+                case = db.get_case(table, row_id)
+                prompt = case.prompt[:100] if case else ''
+                print(f"{score:.3f}  {table}#{row_id}  {prompt}")
+        case 'coverage':
+            covered, uncovered = index.coverage(threshold=args.threshold)
+            total = covered + len(uncovered)
+            print(f"📊 {covered}/{total} baselines have a similar enhanced prompt")
+            if uncovered:
+                print(f"Uncovered baseline ids: {
+                      ', '.join(map(str, uncovered))}")
+        case 'dedup':
+            pairs = index.near_duplicates(args.table, args.threshold)
+            for first, second, score in pairs:
+                print(f"{score:.3f}  {args.table}#{first}  {args.table}#{second}")
+            print(f"🔁 {len(pairs)} near-duplicate pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Re-render enhanced prompts from stored components with a new wrapper template, without LLM calls')
+    parser.add_argument('rule', type=str, nargs='?', default=None,
+                        help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number (default: every rule)')
+    parser.add_argument('--ruleset', type=str, default=None,
+                        help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
+    parser.add_argument('--technique', type=str, default=None, choices=['storyline', 'coding'],
+                        help='Only re-render components of this technique (default: both)')
+    template_group = parser.add_mutually_exclusive_group(required=True)
+    template_group.add_argument('--template', type=str,
+                                help='Template text using {context}, {masked_attack} and {followup_question}')
+    template_group.add_argument('--template-file', type=str,
+                                help='File holding the template text')
+    parser.add_argument('--name', type=str, default=None,
+                        help='Name stored with the rendered cases (default: a hash of the template)')
+    parser.add_argument('--dry-run', type=int, nargs='?', const=3, default=None, metavar='N',
+                        help='Print N rendered prompts (default: 3) instead of storing anything')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='Components rendered and stored per transaction (default: 10000)')
+
+    args = parser.parse_args()
+
+    from src.core.enhancer_helper.templates import PromptTemplate, render_rows
+    from src.utils.db_manager import TestsDB
+    from src.utils.rule_registry import get_registry
+
+    if args.template_file:
+        with open(args.template_file, encoding='utf-8') as f:
+            text = f.read()
+    else:
+        # Let shell-quoted templates spell line breaks as \n
+        text = args.template.replace('\\n', '\n')
+    try:
+        template = PromptTemplate(text)
+    except ValueError as e:
+        parser.error(str(e))
+    name = args.name or template.name
+    test_name = get_registry().resolve(args.rule, args.ruleset)[
+        "test_name"] if args.rule else None
+
+    db = TestsDB()
+    start = time.perf_counter()
+    rendered = stored = 0
+    for rows in db.iter_enhancement_components(test_name, args.technique, args.chunk_size):
+        rows = list(render_rows(template, rows))
+        rendered += len(rows)
+        if args.dry_run is not None:
+            for row in rows[:args.dry_run - (rendered - len(rows))]:
+                print(f"\n--- {row['test_name']} {row['technique']} baseline {
+                      row['baseline_id']} ---\n{row['prompt']}")
+            if rendered >= args.dry_run:
+                break
+            continue
+        stored += db.store_rendered_cases(name, rows)
+
+    if args.dry_run is not None:
+        return
+    print(f"✅ Rendered {rendered} stored components with template '{name}' in {
+          time.perf_counter() - start:.2f}s, {stored} new enhanced cases")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from src.utils.db_manager import TestsDB
+import argparse
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Show aggregate test result statistics')
+    parser.add_argument('--test-name', type=str, default=None,
+                        help='Only include this test (e.g. S1)')
+    parser.add_argument('--defender-model', type=str, default=None,
+                        help='Only include this defender model')
+    parser.add_argument('--technique', type=str, default=None,
+                        help='Only include this technique (valid cases are "none")')
+    parser.add_argument('--since', type=str, default=None,
+                        help='First day to include (YYYY-MM-DD)')
+    parser.add_argument('--until', type=str, default=None,
+                        help='Last day to include (YYYY-MM-DD)')
+    parser.add_argument('--by-day', action='store_true',
+                        help='Break the statistics down per day')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recompute the aggregates from the results table first')
+
+    args = parser.parse_args()
+
+    from src.utils.display import display_stats
+
+    db = TestsDB()
+    if args.rebuild:
+        print(f"📊 Rebuilt the aggregates from {db.rebuild_result_stats()} results")
+
+    stats = db.get_result_stats(
+        test_name=args.test_name,
+        defender_model=args.defender_model,
+        technique=args.technique,
+        since=args.since,
+        until=args.until,
+        by_day=args.by_day
+    )
+    display_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,145 @@
-from src.core.tester import Tester
-from src.utils.display import display_results
-from config.rules import LLAMA_GUARD_RULES
 import argparse
+from src.utils.profiler import add_profile_arguments, profile_from_args
+from src.utils.tracing import add_trace_arguments, trace_from_args
+
+
+def parse_defender_models(specs, default_limit):
+    """Turn 'model' or 'model=N' entries into a {model: concurrency} map"""
+    defender_models = {}
+    for spec in specs:
+        model, _, limit = spec.partition('=')
+        defender_models[model] = int(limit) if limit else default_limit
+        if defender_models[model] < 1:
+            raise ValueError(f"Concurrency for {model} must be at least 1")
+    return defender_models
 
 
 def main():
 
     parser = argparse.ArgumentParser(
-        description='Test Llama Guard rules')
-    parser.add_argument('category', type=int,
-                        help='Llama Guard category number (1-based index)')
+        description='Test a guard rule against defender models')
+    parser.add_argument('rule', type=str,
+                        help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    parser.add_argument('--ruleset', type=str, default=None,
+                        help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
     parser.add_argument('--max-valid-cases', type=int, default=0,
                         help='Number of valid test cases to generate (default: 0)')
     parser.add_argument('--max-enhanced-cases', type=int, default=3,
                         help='Number of enhanced test cases to generate (default: 3)')
-    parser.add_argument('--defender-model', type=str, default='gemini-1.5-flash',
-                        help='Model to use for testing (default: gemini-1.5-flash)')
+    parser.add_argument('--defender-model', type=str, nargs='+', default=['gemini-1.5-flash'],
+                        help='Model(s) to use for testing, optionally as model=N to cap concurrent requests (default: gemini-1.5-flash)')
+    parser.add_argument('--max-concurrency', type=int, default=1,
+                        help='Concurrent requests per defender model without an explicit limit (default: 1)')
+    parser.add_argument('--display', type=str, default='full', choices=['full', 'compact', 'summary'],
+                        help='How results are printed as they complete: in full, one truncated line each, or only the final summary (default: full)')
+    parser.add_argument('--timeout', type=float, default=120.0,
+                        help='Seconds before a defender call is abandoned and stored as an error (default: 120)')
+    parser.add_argument('--hedge-budget', type=float, default=0.05,
+                        help='Extra requests allowed, as a fraction of calls, for duplicating calls slower than the model\'s p95 latency; 0 disables hedging (default: 0.05)')
+    parser.add_argument('--select', type=str, default='random', choices=['random', 'thompson', 'epsilon'],
+                        help='How enhanced cases are chosen: uniformly at random, or adaptively from past results per technique and baseline by Thompson sampling or epsilon-greedy (default: random)')
+    parser.add_argument('--exploration', type=float, default=0.1,
+                        help='Probability of picking a random technique and baseline instead of the most promising with adaptive selection (default: 0.1)')
+    parser.add_argument('--sequential', action='store_true',
+                        help='Stop testing each defender once its refusal rate is known well enough; --max-enhanced-cases becomes the most calls per defender')
+    parser.add_argument('--ci-width', type=float, default=0.1,
+                        help='With --sequential, stop once the refusal rate interval is at most this wide (default: 0.1)')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='With --sequential, also stop once the interval lies entirely above or below this refusal rate')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='Confidence level of the --sequential interval (default: 0.95)')
+    parser.add_argument('--min-cases', type=int, default=5,
+                        help='Cases tested per defender before --sequential may stop (default: 5)')
+    parser.add_argument('--early-abort', action='store_true',
+                        help='Stream defender responses and stop reading once they clearly refuse or comply; the truncated response is stored')
+    parser.add_argument('--compliance-chars', type=int, default=600,
+                        help='Refusal-free characters after which a streamed response counts as compliance with --early-abort (default: 600)')
+    parser.add_argument('--report', type=str, nargs='+', default=[],
+                        help='Also write every result in full to these files (.html or .jsonl)')
+    parser.add_argument('--plan', action='store_true',
+                        help='Print the forecast calls, tokens, cost and duration of the run without calling any API')
+    add_profile_arguments(parser)
+    add_trace_arguments(parser)
 
     args = parser.parse_args()
 
-    # Validate category number
-    if args.category < 1 or args.category > len(LLAMA_GUARD_RULES):
-        raise ValueError(f"Category number must be between 1 and {
-                         len(LLAMA_GUARD_RULES)}")
+    # Imported only after parsing so --help and argument errors return quickly
+    from src.core.tester import Tester
+    from src.utils.display import (ResultStream, display_early_abort,
+                                   display_latency, display_sequential,
+                                   display_summary)
+    from src.utils.llm import take_call_stats
+    from src.utils.report import open_report
+    from src.utils.rule_registry import get_registry
 
     if args.max_valid_cases < 0 or args.max_enhanced_cases < 0:
         raise ValueError("Max valid and enhanced cases must be greater than 0")
 
-    tester = Tester()
-    results = tester.run_tests(
-        LLAMA_GUARD_RULES[args.category - 1]["test_name"],
-        args.max_valid_cases,
-        args.max_enhanced_cases,
-        args.defender_model
-    )
-    display_results(results)
+    defender_models = parse_defender_models(
+        args.defender_model, args.max_concurrency)
+    fanout = len(defender_models) > 1 or max(defender_models.values()) > 1
+    if fanout and args.select != 'random':
+        parser.error(
+            "--select needs a single defender model tested one request at a time")
+    if args.sequential and args.select != 'random':
+        parser.error(
+            "--sequential needs an unbiased sample, so it cannot be combined with --select")
+    test_name = get_registry().resolve(args.rule, args.ruleset)["test_name"]
+
+    if args.plan:
+        from src.core.planner import plan_tests
+        print(plan_tests(test_name, args.max_valid_cases, args.max_enhanced_cases,
+                         defender_models, args.early_abort, args.compliance_chars,
+                         args.sequential).summary())
+        return
+
+    stream = ResultStream(args.display, [open_report(path)
+                          for path in args.report])
+    with profile_from_args(args), trace_from_args(args):
+        tester = Tester(timeout=args.timeout,
+                        hedge_budget=args.hedge_budget,
+                        early_abort=args.early_abort,
+                        compliance_chars=args.compliance_chars)
+        stream.start()
+        try:
+            if args.sequential:
+                results = tester.run_sequential_tests(
+                    test_name,
+                    args.max_valid_cases,
+                    args.max_enhanced_cases,
+                    list(defender_models),
+                    on_result=stream,
+                    width=args.ci_width,
+                    threshold=args.threshold,
+                    confidence=args.confidence,
+                    min_cases=args.min_cases
+                )
+            elif fanout:
+                results = tester.run_fanout_tests(
+                    test_name,
+                    args.max_valid_cases,
+                    args.max_enhanced_cases,
+                    defender_models,
+                    on_result=stream
+                )
+            else:
+                results = tester.run_tests(
+                    test_name,
+                    args.max_valid_cases,
+                    args.max_enhanced_cases,
+                    next(iter(defender_models)),
+                    on_result=stream,
+                    selection=args.select,
+                    exploration=args.exploration
+                )
+        finally:
+            stream.close()
+        if len(defender_models) > 1 or args.display != 'full':
+            display_summary(results)
+        display_latency(tester.latency_stats())
+        display_early_abort(tester.abort_stats)
+        display_sequential(tester.sequential_stats)
+        tester.db.store_call_stats(take_call_stats())
 
 
 if __name__ == "__main__":
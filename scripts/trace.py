@@ -0,0 +1,37 @@
+import argparse
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Critical-path analysis of trace files written with --trace')
+    parser.add_argument('files', type=str, nargs='+',
+                        help='OTLP JSON trace files')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Slowest root spans listed with their critical paths (default: 10)')
+    parser.add_argument('--test-name', type=str, default=None,
+                        help='Only analyze traces of this rule (e.g. S1)')
+    parser.add_argument('--set-id', type=str, default=None,
+                        help='Only analyze traces of cases from this set')
+    parser.add_argument('--baseline-id', type=int, default=None,
+                        help='Only analyze the trace of this baseline case and the cases built from it')
+
+    args = parser.parse_args()
+
+    from src.utils.tracing import analyze, read_spans, root_spans
+
+    spans = read_spans(args.files)
+    filters = {key: value for key, value in (("test_name", args.test_name),
+                                             ("set_id", args.set_id),
+                                             ("baseline_id", args.baseline_id))
+               if value is not None}
+    if filters:
+        traces = {root.trace_id for root in root_spans(spans)
+                  if all(str(root.attributes.get(key)) == str(value)
+                         for key, value in filters.items())}
+        spans = [item for item in spans if item.trace_id in traces]
+    print(analyze(spans, args.top))
+
+
+if __name__ == "__main__":
+    main()
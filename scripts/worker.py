@@ -0,0 +1,121 @@
+from src.core.worker import JOB_KINDS, Worker, enqueue_enhance_jobs, enqueue_test_jobs
+from src.models.enhancement_technique import EnhancementTechnique
+from src.utils.db_manager import TestsDB
+import argparse
+import multiprocessing
+
+
+def run_worker(kinds, lease_seconds, poll_interval, max_jobs, exit_when_idle):
+    Worker(kinds, lease_seconds, poll_interval).run(max_jobs, exit_when_idle)
+
+
+def print_plan(plan):
+    # Each worker process runs one job, so one call, at a time
+    plan.notes.append(
+        "Durations assume a single worker process; N workers divide them by up to N")
+    print(plan.summary())
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Queue enhancement/test jobs and run workers that process them')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enhance_parser = subparsers.add_parser(
+        'enqueue-enhance', help='Queue one enhance job per baseline case')
+    enhance_parser.add_argument('rule', type=str,
+                                help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    enhance_parser.add_argument('--ruleset', type=str, default=None,
+                                help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
+    enhance_parser.add_argument('--model', type=str, default='gpt-4o-mini',
+                                help='Model to use for enhancement (default: gpt-4o-mini)')
+    enhance_parser.add_argument('--technique', type=str, default='storyline',
+                                choices=['storyline', 'coding'],
+                                help='Enhancement technique to use (default: storyline)')
+    enhance_parser.add_argument('--plan', action='store_true',
+                                help='Print the forecast calls, tokens, cost and duration of the jobs without queuing them')
+
+    test_parser = subparsers.add_parser(
+        'enqueue-test', help='Queue one test job per sampled case and defender model')
+    test_parser.add_argument('rule', type=str,
+                             help='Rule ID (e.g. S1 or llama_guard/S1) or 1-based category number')
+    test_parser.add_argument('--ruleset', type=str, default=None,
+                             help='Ruleset the rule belongs to (default: $RULESET or llama_guard)')
+    test_parser.add_argument('--max-valid-cases', type=int, default=0,
+                             help='Number of valid test cases to test (default: 0)')
+    test_parser.add_argument('--max-enhanced-cases', type=int, default=3,
+                             help='Number of enhanced test cases to test (default: 3)')
+    test_parser.add_argument('--defender-model', type=str, nargs='+', default=['gemini-1.5-flash'],
+                             help='Model(s) to use for testing (default: gemini-1.5-flash)')
+    test_parser.add_argument('--plan', action='store_true',
+                             help='Print the forecast calls, tokens, cost and duration of the jobs without queuing them')
+
+    run_parser = subparsers.add_parser('run', help='Process queued jobs')
+    run_parser.add_argument('--kinds', type=str, nargs='+', default=list(JOB_KINDS),
+                            choices=list(JOB_KINDS),
+                            help='Job kinds this worker accepts (default: all)')
+    run_parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes to start on this machine (default: 1)')
+    run_parser.add_argument('--lease-seconds', type=int, default=300,
+                            help='Seconds a claimed job stays leased without a heartbeat (default: 300)')
+    run_parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to wait when the queue is empty (default: 5)')
+    run_parser.add_argument('--max-jobs', type=int, default=None,
+                            help='Stop each process after this many jobs')
+    run_parser.add_argument('--exit-when-idle', action='store_true',
+                            help='Stop once no jobs are left instead of polling')
+
+    subparsers.add_parser('status', help='Show queued job counts')
+
+    args = parser.parse_args()
+
+    from src.utils.rule_registry import get_registry
+
+    # The run parent opens no database, so its worker processes share no connections
+    db = TestsDB() if args.command != 'run' else None
+    match args.command:
+        case 'enqueue-enhance':
+            test_name = get_registry().resolve(
+                args.rule, args.ruleset)["test_name"]
+            technique = EnhancementTechnique.from_string(args.technique)
+            if args.plan:
+                from src.core.planner import plan_enhancement
+                print_plan(plan_enhancement(test_name, technique, db=db))
+                return
+            count = enqueue_enhance_jobs(db, test_name, technique, args.model)
+            print(f"✅ Queued {count} enhance jobs for {test_name}")
+        case 'enqueue-test':
+            test_name = get_registry().resolve(
+                args.rule, args.ruleset)["test_name"]
+            if args.plan:
+                from src.core.planner import plan_tests
+                print_plan(plan_tests(test_name, args.max_valid_cases, args.max_enhanced_cases,
+                                      {model: 1 for model in args.defender_model}, db=db))
+                return
+            set_id = enqueue_test_jobs(
+                db, test_name, args.max_valid_cases, args.max_enhanced_cases, args.defender_model)
+            print(f"✅ Queued test jobs for {test_name} (set {set_id})")
+        case 'run':
+            worker_args = (args.kinds, args.lease_seconds, args.poll_interval,
+                           args.max_jobs, args.exit_when_idle)
+            if args.processes == 1:
+                run_worker(*worker_args)
+                return
+            # Spawned workers start from a fresh interpreter rather than a fork
+            # of this one, so none inherits a PostgreSQL pool's sockets or threads
+            context = multiprocessing.get_context("spawn")
+            processes = [context.Process(target=run_worker, args=worker_args)
+                         for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        case 'status':
+            for kind, counts in sorted(db.get_job_counts().items()):
+                print(f"{kind:<8} " + "  ".join(f"{status}: {count}"
+                      for status, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import json
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from ..utils.db_manager import TestsDB
+from ..utils.llm import build_client, get_client
+from ..utils.verdict import ERROR_RESPONSE
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Provider limit on requests per batch; larger submissions are split
+MAX_BATCH_REQUESTS = 50000
+
+# Provider statuses after which a batch produces no further output
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Local statuses of batch jobs that still need polling
+OPEN_STATUSES = ("created", "validating", "in_progress", "finalizing", "cancelling")
+
+
+def _response_text(record: dict) -> Tuple[Optional[str], Optional[str]]:
+    """(content, None) for a successful output line, (None, error) otherwise"""
+    response = record.get("response") or {}
+    if record.get("error") or response.get("status_code") != 200:
+        return None, json.dumps(record.get("error") or response.get("body"))
+    return response["body"]["choices"][0]["message"]["content"], None
+
+
+class BatchRunner:
+    """Runs bulk generation and defender tests through a provider Batch API.
+
+    Every request is recorded in the batch_jobs/batch_items tables before it
+    is uploaded as JSONL to an OpenAI-compatible /files + /batches endpoint,
+    so submitted batches survive process restarts and are picked up again
+    by poll(). Finished batches are ingested into the valid, baseline and
+    results tables exactly once per request, however often poll() runs.
+    """
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url
+        self.db = TestsDB()
+        self._clients = {}
+
+    def _client(self, base_url: str = None):
+        if not base_url:
+            return get_client()
+        if base_url not in self._clients:
+            self._clients[base_url] = build_client(base_url)
+        return self._clients[base_url]
+
+    def submit_tests(self, test_name: str, max_valid_cases: int, max_enhanced_cases: int,
+                     defender_models: List[str]) -> List[int]:
+        """Queue one defender request per sampled case and model, all under one set_id"""
+        from .tester import Tester
+        set_id = str(uuid.uuid4())
+        cases = ([("valid", case, True) for case in self.db.get_valid_cases(test_name, max_valid_cases)] +
+                 [("enhanced", case, False) for case in self.db.get_enhanced_cases(test_name, max_enhanced_cases)])
+        items = [
+            (f"{table}:{case.id}:{model}",
+             Tester.defender_request(case.prompt, model),
+             {"test_name": test_name, "prompt": case.prompt, "should_pass": should_pass,
+              "defender_model": model, "set_id": set_id, "technique": case.technique,
+              "case_id": case.id})
+            for table, case, should_pass in cases for model in defender_models
+        ]
+        print(f"🧪 Testing {len(cases)} cases against {
+              len(defender_models)} defender models in batch (set {set_id})")
+        return self._submit("test", test_name, items)
+
+    def submit_generation(self, test_name: str, rule: str, model: str,
+                          num_valid_cases: int, num_baseline_cases: int) -> List[int]:
+        """Queue the valid and baseline generation requests of one rule"""
+        from .generator import Generator
+        generator = Generator(model=model)
+        items = []
+        if num_valid_cases:
+            items.append(("valid", generator.valid_cases_request(rule, num_valid_cases),
+                          {"table": "valid", "test_name": test_name,
+                           "set_id": str(uuid.uuid4()), "offender_model": model}))
+        if num_baseline_cases:
+            items.append(("baseline", generator.baseline_cases_request(rule, num_baseline_cases),
+                          {"table": "baseline", "test_name": test_name,
+                           "set_id": str(uuid.uuid4()), "offender_model": model}))
+        return self._submit("generate", test_name, items)
+
+    def _submit(self, kind: str, test_name: str, items: List[Tuple[str, dict, dict]]) -> List[int]:
+        if not items:
+            print("⚠️ Nothing to submit")
+            return []
+        job_ids = []
+        for start in range(0, len(items), MAX_BATCH_REQUESTS):
+            job_id = self.db.create_batch_job(
+                kind, test_name, self.base_url, items[start:start + MAX_BATCH_REQUESTS])
+            if job_id is None:
+                continue
+            job_ids.append(job_id)
+            self._upload(job_id, self.base_url)
+        return job_ids
+
+    def _upload(self, job_id: int, base_url: str = None):
+        """Write a recorded job's requests as JSONL and create the provider batch"""
+        lines = [json.dumps({"custom_id": custom_id, "method": "POST",
+                             "url": BATCH_ENDPOINT, "body": body})
+                 for custom_id, body in self.db.get_batch_requests(job_id)]
+        client = self._client(base_url)
+        try:
+            input_file = client.files.create(
+                file=(f"batch-{job_id}.jsonl",
+                      ("\n".join(lines) + "\n").encode("utf-8")),
+                purpose="batch")
+            self.db.update_batch_job(job_id, input_file_id=input_file.id)
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=BATCH_ENDPOINT,
+                completion_window="24h",
+                metadata={"batch_job": str(job_id)},
+            )
+            self.db.update_batch_job(
+                job_id, batch_id=batch.id, status=batch.status, error=None)
+            print(f"📤 Submitted batch job {job_id} with {
+                  len(lines)} requests as {batch.id}")
+        except Exception as e:
+            print(f"❌ Error submitting batch job {job_id}: {str(e)}")
+            self.db.update_batch_job(job_id, error=str(e))
+
+    def poll(self) -> int:
+        """Advance every open batch job once; returns how many are still open"""
+        still_open = 0
+        for job in self.db.get_batch_jobs(OPEN_STATUSES):
+            if job["batch_id"] is None:
+                # Recorded, but the process stopped before the batch was created
+                self._upload(job["id"], job["base_url"])
+                still_open += 1
+                continue
+            try:
+                batch = self._client(job["base_url"]).batches.retrieve(
+                    job["batch_id"])
+            except Exception as e:
+                print(f"❌ Error polling batch job {job['id']}: {str(e)}")
+                still_open += 1
+                continue
+            if batch.status not in FINAL_STATUSES:
+                if batch.status != job["status"]:
+                    self.db.update_batch_job(job["id"], status=batch.status)
+                still_open += 1
+                continue
+            self.db.update_batch_job(job["id"], output_file_id=batch.output_file_id,
+                                     error_file_id=batch.error_file_id)
+            if batch.output_file_id or batch.error_file_id:
+                self.ingest({**job, "output_file_id": batch.output_file_id,
+                             "error_file_id": batch.error_file_id})
+                self.db.update_batch_job(job["id"], status="ingested")
+                if job["kind"] == "generate":
+                    from ..utils.vector_index import refresh_index
+                    refresh_index(self.db)
+            else:
+                errors = getattr(batch, "errors", None)
+                self.db.update_batch_job(
+                    job["id"], status=batch.status,
+                    error=json.dumps(errors.model_dump()) if errors else None)
+                print(f"❌ Batch job {job['id']} ended as {
+                      batch.status} without output")
+        return still_open
+
+    def ingest(self, job: dict) -> Dict[str, int]:
+        """Store every not yet ingested response of a finished batch job"""
+        client = self._client(job["base_url"])
+        counts = {"stored": 0, "failed": 0, "skipped": 0}
+        for file_id in (job["output_file_id"], job["error_file_id"]):
+            if not file_id:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                content, error = _response_text(record)
+                if job["kind"] == "test":
+                    stored = self.db.ingest_batch_result(
+                        job["id"], record["custom_id"],
+                        ERROR_RESPONSE if error else content, error)
+                else:
+                    prompts = []
+                    if error is None:
+                        try:
+                            from .generator import parse_generated_prompts
+                            prompts = parse_generated_prompts(content)
+                        except Exception as e:
+                            error = f"Unparseable response: {str(e)}"
+                    stored = self.db.ingest_batch_cases(
+                        job["id"], record["custom_id"], prompts, error)
+                if not stored:
+                    counts["skipped"] += 1
+                elif error:
+                    counts["failed"] += 1
+                else:
+                    counts["stored"] += 1
+        print(f"📥 Batch job {job['id']} ({job['kind']} {job['test_name']}): {
+              counts['stored']} stored, {counts['failed']} failed, {counts['skipped']} already ingested")
+        return counts
+
+    def wait(self, interval: float = 60.0, timeout: float = None) -> bool:
+        """Poll until no batch job is open; False if timeout passed first"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while self.poll():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
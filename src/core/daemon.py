@@ -0,0 +1,396 @@
+import contextvars
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+RUN_KINDS = ("generate", "enhance", "test")
+
+# Where prints of the current run go; worker threads started with
+# contextvars.copy_context() inherit it from the run thread
+_run_output = contextvars.ContextVar("run_output", default=None)
+
+
+class _RunStdout:
+    """sys.stdout replacement that sends each run's prints to that run"""
+
+    def __init__(self, original):
+        self.original = original
+
+    def capture(self, sink) -> contextvars.Token:
+        return _run_output.set(sink)
+
+    def release(self, token: contextvars.Token):
+        _run_output.reset(token)
+
+    def write(self, text: str) -> int:
+        sink = _run_output.get()
+        if sink is None:
+            return self.original.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self):
+        self.original.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.original, name)
+
+
+class Run:
+    """One submitted job, its captured output and its result"""
+
+    def __init__(self, kind: str, params: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events: List[dict] = []
+        self._partial = ""
+        self._changed = threading.Condition()
+        self._emit({"type": "status", "status": self.status})
+
+    def _emit(self, event: dict):
+        with self._changed:
+            event["seq"] = len(self.events)
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def write(self, text: str):
+        """Record printed text as one output event per complete line"""
+        # Worker threads of the same run print concurrently
+        with self._changed:
+            lines = (self._partial + text).split("\n")
+            self._partial = lines.pop()
+            for line in lines:
+                self._emit({"type": "output", "line": line})
+
+    def set_status(self, status: str, **fields):
+        with self._changed:
+            if self._partial:
+                self._emit({"type": "output", "line": self._partial})
+                self._partial = ""
+            # Append the event before the status flips, so a follower that
+            # sees the run finished has already been handed its last event
+            self._emit({"type": "status", "status": status, **fields})
+            self.status = status
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def wait_for_events(self, after: int, timeout: float) -> List[dict]:
+        """Events with seq >= after, blocking up to timeout for new ones"""
+        with self._changed:
+            if len(self.events) <= after and not self.finished:
+                self._changed.wait(timeout)
+            return self.events[after:]
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+def _rule(rule: str) -> dict:
+    from ..utils.rule_registry import get_registry
+    return get_registry().resolve(rule)
+
+
+def _defender_models(value, default_limit: int = 1) -> Dict[str, int]:
+    """Accept {"model": N}, ["model", "model=N"] or a single model name"""
+    if isinstance(value, dict):
+        return {model: int(limit) for model, limit in value.items()}
+    if isinstance(value, str):
+        value = [value]
+    models = {}
+    for spec in value:
+        model, _, limit = spec.partition("=")
+        models[model] = int(limit) if limit else default_limit
+    return models
+
+
+def plan_run(kind: str, params: dict):
+    """Forecast a job with the daemon's parameter defaults, without submitting it"""
+    from ..models.enhancement_technique import EnhancementTechnique
+    from ..utils.rule_registry import get_registry
+    from .planner import plan_enhancement, plan_generation, plan_tests
+    if kind not in RUN_KINDS:
+        raise ValueError(f"Unknown run kind: {kind}")
+    params = dict(params)
+    rule = get_registry().resolve(params.pop("rule"),
+                                  params.pop("ruleset", None))
+    match kind:
+        case "generate":
+            return plan_generation(rule["test_name"], rule["rule"], params.get("model", "gpt-4o"),
+                                   params.get("num_valid_cases", 0),
+                                   params.get("num_baseline_cases", 1))
+        case "enhance":
+            return plan_enhancement(rule["test_name"],
+                                    EnhancementTechnique.from_string(
+                                        params.get("technique", "storyline")),
+                                    params.get("max_iterations", 3))
+        case "test":
+            return plan_tests(rule["test_name"], params.get("max_valid_cases", 0),
+                              params.get("max_enhanced_cases", 3),
+                              _defender_models(params.get("defender_models", ("gemini-1.5-flash",))))
+
+
+class Daemon:
+    """Runs generate/enhance/test jobs in one warm process.
+
+    API clients, Generator/Enhancer/Tester instances, the verified database
+    schema and the enhancer caches are created once and reused by every
+    job. At most max_runs jobs execute at once, and LLM calls from all jobs
+    share the same rate limiters and per-model concurrency caps.
+    """
+
+    def __init__(self, max_runs: int = 4):
+        from ..utils.db_manager import TestsDB
+        from ..utils.llm import get_client
+        self.db = TestsDB()
+        get_client()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_runs, thread_name_prefix="run")
+        self.runs: Dict[str, Run] = {}
+        self._lock = threading.Lock()
+        self._generators = {}
+        self._enhancers = {}
+        self._tester = None
+        if not isinstance(sys.stdout, _RunStdout):
+            sys.stdout = _RunStdout(sys.stdout)
+        self.stdout = sys.stdout
+
+    def submit(self, kind: str, params: dict) -> Run:
+        if kind not in RUN_KINDS:
+            raise ValueError(f"Unknown run kind: {kind}")
+        from ..utils.rule_registry import get_registry
+        # "category" is the older name of "rule"
+        if "category" in params:
+            params["rule"] = params.pop("category")
+        if "rule" not in params:
+            raise ValueError("params.rule is required")
+        # Jobs keep the stable ruleset/test_name ID, whatever form was submitted
+        params["rule"] = get_registry().rule_id(
+            params["rule"], params.pop("ruleset", None))
+        run = Run(kind, params)
+        with self._lock:
+            self.runs[run.id] = run
+        self.executor.submit(self._execute, run)
+        return run
+
+    def get_run(self, run_id: str) -> Optional[Run]:
+        with self._lock:
+            return self.runs.get(run_id)
+
+    def list_runs(self) -> List[Run]:
+        with self._lock:
+            return sorted(self.runs.values(), key=lambda run: run.created_at)
+
+    def _execute(self, run: Run):
+        token = self.stdout.capture(run.write)
+        run.started_at = time.time()
+        run.set_status("running")
+        try:
+            match run.kind:
+                case "generate":
+                    run.result = self._generate(**run.params)
+                case "enhance":
+                    run.result = self._enhance(**run.params)
+                case "test":
+                    run.result = self._test(**run.params)
+            run.finished_at = time.time()
+            run.set_status("done", result=run.result)
+        except Exception as e:
+            run.error = str(e)
+            run.finished_at = time.time()
+            run.set_status("failed", error=run.error)
+        finally:
+            self.stdout.release(token)
+
+    def _generate(self, rule: str, model: str = "gpt-4o", num_valid_cases: int = 0,
+                  num_baseline_cases: int = 1) -> dict:
+        from ..utils.vector_index import refresh_index
+        from .generator import Generator
+        rule = _rule(rule)
+        test_name = rule["test_name"]
+        with self._lock:
+            if model not in self._generators:
+                self._generators[model] = Generator(model=model)
+            generator = self._generators[model]
+        generator.generate_valid_cases(
+            test_name, rule["rule"], num_valid_cases)
+        generator.generate_baseline_cases(
+            test_name, rule["rule"], num_baseline_cases)
+        refresh_index(self.db)
+        return {"test_name": test_name}
+
+    def _enhance(self, rule: str, model: str = "gpt-4o-mini", technique: str = "storyline",
+                 max_iterations: int = 3) -> dict:
+        from ..models.enhancement_technique import EnhancementTechnique
+        from ..utils.vector_index import refresh_index
+        from .enhancer import Enhancer
+        from .enhancer_helper.prefilter import CandidatePrefilter
+        test_name = _rule(rule)["test_name"]
+        with self._lock:
+            if (model, max_iterations) not in self._enhancers:
+                self._enhancers[(model, max_iterations)] = Enhancer(
+                    model=model, max_iterations=max_iterations, prefilter=CandidatePrefilter())
+            enhancer = self._enhancers[(model, max_iterations)]
+        enhancer.enhance(EnhancementTechnique.from_string(technique), test_name)
+        refresh_index(self.db)
+        return {"test_name": test_name}
+
+    def _test(self, rule: str, max_valid_cases: int = 0, max_enhanced_cases: int = 3,
+              defender_models=("gemini-1.5-flash",)) -> dict:
+        from ..utils.hedging import LatencyTracker
+        from ..utils.verdict import guard_held
+        from .tester import Tester
+        test_name = _rule(rule)["test_name"]
+        models = _defender_models(defender_models)
+        with self._lock:
+            if self._tester is None:
+                self._tester = Tester()
+            tester = self._tester
+        # The shared tester's tracker spans every run; report this run's calls only
+        latency = LatencyTracker()
+        with latency.activate():
+            if len(models) > 1 or max(models.values()) > 1:
+                results = tester.run_fanout_tests(
+                    test_name, max_valid_cases, max_enhanced_cases, models)
+            else:
+                results = tester.run_tests(
+                    test_name, max_valid_cases, max_enhanced_cases, next(iter(models)))
+        held = sum(guard_held(result.should_pass, result.llm_response)
+                   for result in results)
+        return {
+            "test_name": test_name,
+            "total": len(results),
+            "held": held,
+            "latency": latency.stats(),
+            "results": [result.model_dump() for result in results],
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        if sys.stdout is self.stdout:
+            sys.stdout = self.stdout.original
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON API: POST /runs, GET /runs, GET /runs/<id>, GET /runs/<id>/events, GET /health"""
+
+    server_version = "llm-guard-daemon"
+
+    @property
+    def daemon(self) -> Daemon:
+        return self.server.daemon
+
+    def address_string(self) -> str:
+        # Unix socket peers have no host/port pair
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["health"]:
+            counts = {}
+            for run in self.daemon.list_runs():
+                counts[run.status] = counts.get(run.status, 0) + 1
+            return self._send_json(200, {"status": "ok", "runs": counts})
+        if parts == ["runs"]:
+            return self._send_json(200, [run.summary() for run in self.daemon.list_runs()])
+        if len(parts) in (2, 3) and parts[0] == "runs":
+            run = self.daemon.get_run(parts[1])
+            if run is None:
+                return self._send_json(404, {"error": f"Unknown run: {parts[1]}"})
+            if len(parts) == 2:
+                return self._send_json(200, {
+                    **run.summary(),
+                    "result": run.result,
+                    "output": [event["line"] for event in run.events if event["type"] == "output"],
+                })
+            if parts[2] == "events":
+                return self._stream_events(run)
+        self._send_json(404, {"error": f"Not found: {self.path}"})
+
+    def _stream_events(self, run: Run):
+        """Send events as newline-delimited JSON until the run finishes"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        sent = 0
+        while True:
+            events = run.wait_for_events(sent, timeout=15)
+            for event in events:
+                self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+            sent += len(events)
+            self.wfile.flush()
+            if run.finished and sent == len(run.events):
+                return
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/runs":
+            return self._send_json(404, {"error": f"Not found: {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            run = self.daemon.submit(body.get("kind"), body.get("params") or {})
+        except (ValueError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, run.summary())
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(daemon: Daemon, host: str = "127.0.0.1", port: int = 8765, socket_path: str = None):
+    """Serve the API on a local TCP port, or on a Unix socket if socket_path is set"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        address = f"http://{host}:{server.server_port}"
+    server.daemon = daemon
+    print(f"🛰️ Daemon listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down, waiting for running jobs")
+    finally:
+        server.server_close()
+        daemon.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -1,18 +1,32 @@
-import openai
-import os
+from contextlib import nullcontext
+from typing import Dict
+from ..utils.budget import RunBudget
 from ..utils.db_manager import TestsDB
+from ..utils.llm import get_client
+from ..utils.tracing import span, trace_case
 from ..models.enhancement_technique import EnhancementTechnique
+from ..models.test_case import TestCase
 from .enhancer_helper import storyline, coding
+from .enhancer_helper.early_stopping import EarlyStopper
+from .enhancer_helper.judge_cache import JudgeCache
+from .enhancer_helper.prefilter import CandidatePrefilter
 
 
 class Enhancer:
-    def __init__(self, model: str):
-        self.client = openai.Client(
-            api_key=os.getenv("CLOD_API_KEY"),
-            base_url="https://api.clod.io/v1",
-        )
+    def __init__(self, model: str, max_iterations: int = 3, early_stopping: bool = True,
+                 patience: int = 2, min_expected_gain: float = 0.25, budget: RunBudget = None,
+                 judge_cache: bool = True, prefilter: CandidatePrefilter = None):
+        self.client = get_client()
         self.db = TestsDB()
         self.model = model
+        self.max_iterations = max_iterations
+        self.early_stopping = early_stopping
+        self.patience = patience
+        self.min_expected_gain = min_expected_gain
+        self.budget = budget
+        self.judge_cache = JudgeCache(self.db) if judge_cache else None
+        self.prefilter = prefilter
+        self._stoppers: Dict[EnhancementTechnique, EarlyStopper] = {}
 
     def enhance(self, technique: EnhancementTechnique, test_name: str):
         """Process baseline attacks for a specific test and apply enhancement"""
@@ -20,15 +34,48 @@ class Enhancer:
         baseline_cases = self.db.get_baseline_cases(test_name=test_name)
         print(f"📑 Found {len(baseline_cases)} baseline cases to enhance")
 
-        for i, case in enumerate(baseline_cases, 1):
-            print("="*80)
-            print(f"\n📌 Processing case {i}/{len(baseline_cases)}")
+        with self.budget.activate() if self.budget else nullcontext():
+            for i, case in enumerate(baseline_cases, 1):
+                if self.budget and self.budget.exhausted():
+                    print(f"\n💸 Run budget exhausted, skipping {
+                          len(baseline_cases) - i + 1} remaining cases")
+                    break
+                print("="*80)
+                print(f"\n📌 Processing case {i}/{len(baseline_cases)}")
+                self.enhance_case(technique, case)
 
-            # Apply the specified enhancement technique
+        print("\n✨ Enhancement process completed!")
+        if technique in self._stoppers:
+            print(f"🛑 Early stopping: {self._stoppers[technique].summary()}")
+        if self.judge_cache:
+            print(f"♻️ Judge cache: {self.judge_cache.summary()}")
+        if self.prefilter:
+            print(f"🧹 Pre-filter: {self.prefilter.summary()}")
+        if self.budget:
+            print(f"💰 Spent: {self.budget.summary()}")
+
+    def get_stopper(self, technique: EnhancementTechnique) -> EarlyStopper:
+        """Early stopper for a technique, primed once with its past score trajectories"""
+        if not self.early_stopping:
+            return None
+        if technique not in self._stoppers:
+            self._stoppers[technique] = EarlyStopper.from_history(
+                self.db, technique.value, patience=self.patience,
+                min_expected_gain=self.min_expected_gain)
+        return self._stoppers[technique]
+
+    def enhance_case(self, technique: EnhancementTechnique, case: TestCase):
+        """Apply the specified enhancement technique to a single baseline case"""
+        stopper = self.get_stopper(technique)
+        with span("enhance_case"):
+            trace_case(case.test_name, case.set_id, baseline_id=case.id,
+                       technique=technique.value)
             match technique:
                 case EnhancementTechnique.STORYLINE:
-                    storyline.process_storyline(case, self.db)
+                    storyline.process_storyline(
+                        case, self.db, stopper, self.max_iterations,
+                        self.judge_cache, self.prefilter)
                 case EnhancementTechnique.CODING:
-                    coding.process_coding(case, self.db)
-
-        print("\n✨ Enhancement process completed!")
+                    coding.process_coding(
+                        case, self.db, stopper, self.max_iterations,
+                        self.judge_cache, self.prefilter)
@@ -0,0 +1,60 @@
+from typing import Dict, List, Optional, Tuple
+from src.utils.budget import active_budget
+
+# Each improvement iteration costs one improve call and one judge call
+CALLS_PER_ITERATION = 2
+
+
+class EarlyStopper:
+    """Decides when further improve/judge rounds are unlikely to pay off.
+
+    Stops on a plateau (no score gain for `patience` rounds), when past runs
+    of the same technique show little expected gain from the current score,
+    or when the active run budget is spent.
+    """
+
+    def __init__(self, gain_stats: Dict[int, Tuple[int, float]] = None, patience: int = 2,
+                 min_expected_gain: float = 0.25, min_samples: int = 5):
+        # best score -> (observations, mean score gain of the next round)
+        self.gain_stats = gain_stats or {}
+        self.patience = patience
+        self.min_expected_gain = min_expected_gain
+        self.min_samples = min_samples
+        self.stops: Dict[str, int] = {}
+        self.calls_saved = 0
+
+    @staticmethod
+    def gain_stats_from_trajectories(trajectories: List[List[int]]) -> Dict[int, Tuple[int, float]]:
+        """Mean one-round gain of the best score, keyed by the best score so far"""
+        totals: Dict[int, List[float]] = {}
+        for scores in trajectories:
+            for current, following in zip(scores, scores[1:]):
+                count, gain = totals.setdefault(current, [0, 0.0])
+                totals[current] = [count + 1, gain + following - current]
+        return {score: (count, gain / count) for score, (count, gain) in totals.items()}
+
+    @classmethod
+    def from_history(cls, db, technique: str, **kwargs) -> "EarlyStopper":
+        return cls(cls.gain_stats_from_trajectories(
+            db.get_score_trajectories(technique)), **kwargs)
+
+    def stop_reason(self, scores: List[int], remaining: int) -> Optional[str]:
+        """Why to stop now given the best score after each round so far, or None"""
+        budget = active_budget()
+        if budget is not None and budget.exhausted():
+            return "budget"
+        if len(scores) > self.patience and len(set(scores[-(self.patience + 1):])) == 1:
+            return "plateau"
+        count, gain = self.gain_stats.get(scores[-1], (0, 0.0))
+        if count >= self.min_samples and gain * remaining < self.min_expected_gain:
+            return "low expected gain"
+        return None
+
+    def record_stop(self, reason: str, remaining: int):
+        self.stops[reason] = self.stops.get(reason, 0) + 1
+        self.calls_saved += CALLS_PER_ITERATION * remaining
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{reason}: {count}" for reason,
+                            count in sorted(self.stops.items()))
+        return f"{self.calls_saved} LLM calls saved" + (f" ({reasons})" if reasons else "")
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import re
+import threading
+from typing import Dict, Optional
+
+
+def normalize_component(text: str) -> str:
+    """Collapse whitespace so cosmetic differences share a cache entry"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class JudgeCache:
+    """Memoizes judge verdicts in memory and in the judgments table.
+
+    Keys hash the normalized candidate components together with the judge
+    model and the judge's system prompt, so a changed rubric or judge never
+    reuses stale scores.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._memory: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(judge_model: str, system_prompt: str, baseline_prompt: str, context: str,
+            masked_attack: str, followup: str) -> str:
+        components = [judge_model, system_prompt, baseline_prompt,
+                      context, masked_attack, followup]
+        payload = json.dumps([normalize_component(c) for c in components])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            judgment = self._memory.get(key)
+        if judgment is None:
+            judgment = self.db.get_judgment(key)
+        with self._lock:
+            if judgment is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._memory[key] = judgment
+        return judgment
+
+    def put(self, key: str, judge_model: str, judgment: dict):
+        with self._lock:
+            self._memory[key] = judgment
+        self.db.store_judgment(key, judge_model, judgment)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        return f"{self.hits}/{self.hits + self.misses} hits ({self.hit_rate():.0%})"
@@ -0,0 +1,42 @@
+from typing import Dict, List, Optional, Tuple
+
+
+class CandidatePrefilter:
+    """Cheap TF-IDF screen run before paying for a judge call.
+
+    A candidate nearly identical to one already judged reuses that verdict,
+    and one whose masked attack shares almost nothing with the baseline is
+    dropped as off-target without being judged.
+    """
+
+    def __init__(self, duplicate_threshold: float = 0.95, min_baseline_similarity: float = 0.05):
+        self.duplicate_threshold = duplicate_threshold
+        self.min_baseline_similarity = min_baseline_similarity
+        self.avoided: Dict[str, int] = {}
+        self.checked = 0
+
+    def check(self, baseline_prompt: str, masked_attack: str, candidate: str,
+              judged: List[Tuple[str, dict]]) -> Tuple[Optional[str], Optional[dict]]:
+        """Return (reason, reused judgment) if the judge call can be skipped, else (None, None)"""
+        # NumPy is only imported once a candidate is actually screened
+        from src.utils.similarity import cosine_similarities
+        self.checked += 1
+        if judged:
+            similarities = cosine_similarities(
+                candidate, [text for text, _ in judged])
+            nearest = int(similarities.argmax())
+            if similarities[nearest] >= self.duplicate_threshold:
+                return self._avoid("duplicate"), judged[nearest][1]
+        if cosine_similarities(baseline_prompt, [masked_attack])[0] < self.min_baseline_similarity:
+            return self._avoid("off-target"), None
+        return None, None
+
+    def _avoid(self, reason: str) -> str:
+        self.avoided[reason] = self.avoided.get(reason, 0) + 1
+        return reason
+
+    def summary(self) -> str:
+        total = sum(self.avoided.values())
+        reasons = ", ".join(f"{reason}: {count}" for reason,
+                            count in sorted(self.avoided.items()))
+        return f"{total}/{self.checked} judge calls avoided" + (f" ({reasons})" if reasons else "")
@@ -0,0 +1,255 @@
+from typing import Dict, List, Optional
+from config.models import (BATCH_PRICE_FACTOR, DEFAULT_COMPLETION_TOKENS, DEFAULT_MODEL_LIMITS,
+                           MODEL_LIMITS)
+from ..models.enhancement_technique import EnhancementTechnique
+from ..utils.budget import request_cost
+from ..utils.db_manager import TestsDB
+from ..utils.rate_limiter import estimate_prompt_tokens
+
+# Characters per token, as assumed by the rate limiter's estimates
+CHARS_PER_TOKEN = 4
+
+# Seconds per call for a model without recorded calls: time to the first
+# token plus generation at a typical rate
+FALLBACK_FIRST_TOKEN_SECONDS = 0.5
+FALLBACK_TOKENS_PER_SECOND = 50.0
+
+# Lengths in characters assumed before a rule or technique has stored examples
+DEFAULT_PROMPT_CHARS = 200
+DEFAULT_COMPONENT_CHARS = {"context": 800,
+                           "masked_attack": 250, "followup_question": 150}
+
+# Completion of a judge call: a score and three improvement tips
+JUDGE_COMPLETION_TOKENS = 150
+
+# JSON wrapping each generated case in a generation response
+GENERATED_CASE_OVERHEAD_TOKENS = 10
+
+
+class Plan:
+    """Forecast of the LLM calls a run will make, built without calling any API.
+
+    Work is added as steps of identical calls to one model. A step takes
+    the longer of its latency bound (calls times the model's mean seconds
+    per recorded call, divided by the concurrency) and its rate limit
+    bound (calls per rpm, tokens per tpm). Steps in the same lane run one
+    after another and lanes run in parallel, so the makespan is the
+    longest lane.
+
+    A batch plan is priced at BATCH_PRICE_FACTOR and has no duration: the
+    provider schedules the requests, so neither concurrency nor rate limits
+    apply.
+    """
+
+    def __init__(self, title: str, latencies: Dict[str, float] = None, batch: bool = False):
+        self.title = title
+        self.latencies = latencies or {}
+        self.batch = batch
+        self.steps: List[dict] = []
+        self.notes: List[str] = []
+        if batch:
+            self.notes.append(f"Batch requests cost {BATCH_PRICE_FACTOR:.0%} of the regular price and "
+                              "finish within the provider's 24h completion window")
+
+    def seconds_per_call(self, model: str, completion_tokens: int) -> float:
+        if model in self.latencies:
+            return self.latencies[model]
+        return FALLBACK_FIRST_TOKEN_SECONDS + completion_tokens / FALLBACK_TOKENS_PER_SECOND
+
+    def add(self, step: str, model: str, calls: float, prompt_tokens: int, completion_tokens: int,
+            concurrency: int = 1, lane: str = None):
+        """Add calls to model, each with prompt_tokens in and completion_tokens out"""
+        if calls <= 0:
+            return
+        limits = MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMITS)
+        tokens = calls * (prompt_tokens + completion_tokens)
+        latency_bound = calls * \
+            self.seconds_per_call(model, completion_tokens) / max(1, concurrency)
+        rate_bound = 60 * max(calls / limits["rpm"], tokens / limits["tpm"])
+        if self.batch:
+            latency_bound = rate_bound = 0.0
+        self.steps.append({
+            "step": step,
+            "model": model,
+            "lane": lane or model,
+            "calls": calls,
+            "prompt_tokens": calls * prompt_tokens,
+            "completion_tokens": calls * completion_tokens,
+            "dollars": calls * request_cost(model, prompt_tokens, completion_tokens)
+            * (BATCH_PRICE_FACTOR if self.batch else 1.0),
+            "seconds": max(latency_bound, rate_bound),
+            "rate_limited": rate_bound > latency_bound,
+        })
+
+    @property
+    def calls(self) -> float:
+        return sum(step["calls"] for step in self.steps)
+
+    @property
+    def tokens(self) -> float:
+        return sum(step["prompt_tokens"] + step["completion_tokens"] for step in self.steps)
+
+    @property
+    def dollars(self) -> float:
+        return sum(step["dollars"] for step in self.steps)
+
+    @property
+    def makespan(self) -> float:
+        lanes: Dict[str, float] = {}
+        for step in self.steps:
+            lanes[step["lane"]] = lanes.get(step["lane"], 0.0) + step["seconds"]
+        return max(lanes.values(), default=0.0)
+
+    def summary(self) -> str:
+        lines = [f"📋 Plan: {self.title}", "",
+                 f"{'step':<18} {'model':<22} {'calls':>8} {'prompt tok':>11} {'compl. tok':>11} "
+                 f"{'cost $':>9} {'time s':>9}"]
+        for step in self.steps:
+            seconds = "-" if self.batch else f"{step['seconds']:.1f}"
+            lines.append(
+                f"{step['step']:<18} {step['model']:<22} {step['calls']:>8.0f} {step['prompt_tokens']:>11.0f} "
+                f"{step['completion_tokens']:>11.0f} {step['dollars']:>9.4f} {seconds:>9}"
+                + ("  (rate limited)" if step["rate_limited"] else ""))
+        makespan = "-" if self.batch else f"{self.makespan:.1f}"
+        lines.append(f"{'total':<18} {'':<22} {self.calls:>8.0f} {self.tokens:>23.0f} "
+                     f"{self.dollars:>9.4f} {makespan:>9}")
+        lines.append("")
+        if self.batch:
+            lines.append(f"📦 Forecast {self.calls:.0f} batch requests, "
+                         f"{self.tokens:.0f} tokens, ${self.dollars:.4f}")
+        else:
+            lines.append(f"⏱️ Forecast makespan {_duration(self.makespan)}, {self.calls:.0f} calls, "
+                         f"{self.tokens:.0f} tokens, ${self.dollars:.4f}")
+        unknown = sorted({step["model"] for step in self.steps} - set(self.latencies))
+        if unknown and not self.batch:
+            lines.append(f"ℹ️ No recorded calls for {', '.join(unknown)}; assuming "
+                         f"{FALLBACK_FIRST_TOKEN_SECONDS:g}s + {FALLBACK_TOKENS_PER_SECOND:g} tokens/s")
+        lines.extend(f"ℹ️ {note}" for note in self.notes)
+        lines.append("No API calls were made.")
+        return "\n".join(lines)
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}min"
+    return f"{seconds / 3600:.1f}h"
+
+
+def _tokens(chars: float) -> int:
+    return int(chars // CHARS_PER_TOKEN)
+
+
+def _sample_size(limit: int, available: int) -> int:
+    # A limit of 0 loads every case, as the case getters do
+    return min(limit, available) if limit else available
+
+
+def plan_generation(test_name: str, rule: str, model: str, num_valid_cases: int,
+                    num_baseline_cases: int, batch: bool = False, db: TestsDB = None) -> Plan:
+    """Forecast scripts.generate: one request per table, answered with every case at once"""
+    from .generator import Generator
+    db = db or TestsDB()
+    generator = Generator(model=model)
+    plan = Plan(f"generate {test_name} with {model}{' in batch' if batch else ''}",
+                db.get_call_latencies(), batch)
+    for table, num_cases, request in (
+            ("valid", num_valid_cases, generator.valid_cases_request),
+            ("baseline", num_baseline_cases, generator.baseline_cases_request)):
+        if not num_cases:
+            continue
+        _, mean_chars = db.get_prompt_lengths(table, test_name)
+        completion = num_cases * \
+            (_tokens(mean_chars or DEFAULT_PROMPT_CHARS) + GENERATED_CASE_OVERHEAD_TOKENS)
+        plan.add(f"generate {table}", model, 1,
+                 estimate_prompt_tokens(request(rule, num_cases)["messages"]), completion,
+                 lane="generate")
+    return plan
+
+
+def plan_enhancement(test_name: str, technique: EnhancementTechnique, max_iterations: int = 3,
+                     early_stopping: bool = True, db: TestsDB = None) -> Plan:
+    """Forecast scripts.enhance: per baseline, one enhance call, then judge and improve rounds"""
+    from .enhancer_helper import coding, storyline
+    from .enhancer_helper.shared import (ENHANCE_MODEL, JUDGE_MODEL, enhance_system_prompt,
+                                         improve_system_prompt, judge_system_prompt)
+    db = db or TestsDB()
+    module, context_key = {
+        EnhancementTechnique.STORYLINE: (storyline, "storyline"),
+        EnhancementTechnique.CODING: (coding, "problem_setup"),
+    }[technique]
+    plan = Plan(f"enhance {test_name} with {technique.value}",
+                db.get_call_latencies())
+
+    baselines, mean_chars = db.get_prompt_lengths("baseline", test_name)
+    baseline_chars = mean_chars or DEFAULT_PROMPT_CHARS
+    lengths = db.get_component_lengths(technique.value)
+    if lengths is None:
+        lengths = DEFAULT_COMPONENT_CHARS
+        plan.notes.append(
+            f"No stored {technique.value} components yet; assuming typical component lengths")
+    components = sum(lengths.values())
+
+    rounds = max_iterations
+    if early_stopping:
+        trajectories = db.get_score_trajectories(technique.value)
+        if trajectories:
+            rounds = sum(min(len(scores) - 1, max_iterations)
+                         for scores in trajectories) / len(trajectories)
+            plan.notes.append(f"{rounds:.1f} improvement rounds per baseline on average in "
+                              f"{len(trajectories)} past {technique.value} runs (at most {max_iterations})")
+
+    enhance_prompt = estimate_prompt_tokens([
+        {"content": enhance_system_prompt(context_key, module.ENHANCEMENT_GUIDELINES, module.EXAMPLE_CHECK)},
+        {"content": "Please transform this attack following ALL system guidelines: "}]) + _tokens(baseline_chars)
+    judge_prompt = estimate_prompt_tokens([
+        {"content": judge_system_prompt(context_key)},
+        {"content": "Baseline Attack:\n\n\nEnhanced Version:\n"}]) + _tokens(baseline_chars + components)
+    # The improve request repeats the candidate and the judge's tips
+    improve_prompt = estimate_prompt_tokens([
+        {"content": improve_system_prompt(context_key, module.ENHANCEMENT_GUIDELINES)},
+        {"content": "Original baseline attack:\n" + " " * 400}]) + \
+        _tokens(baseline_chars + components) + JUDGE_COMPLETION_TOKENS
+
+    plan.add("enhance_prompt", ENHANCE_MODEL, baselines, enhance_prompt,
+             _tokens(components), lane="enhance")
+    plan.add("judge", JUDGE_MODEL, baselines * (1 + rounds), judge_prompt,
+             JUDGE_COMPLETION_TOKENS, lane="enhance")
+    plan.add("improve", ENHANCE_MODEL, baselines * rounds, improve_prompt,
+             _tokens(components), lane="enhance")
+    plan.notes.append(
+        "Judge cache and pre-filter hits are not predicted, so judge calls are an upper bound")
+    return plan
+
+
+def plan_tests(test_name: str, max_valid_cases: int, max_enhanced_cases: int,
+               defender_models: Dict[str, int], early_abort: bool = False,
+               compliance_chars: Optional[int] = None, sequential: bool = False,
+               batch: bool = False, db: TestsDB = None) -> Plan:
+    """Forecast scripts.test: one defender call per sampled case and model"""
+    from .tester import Tester
+    db = db or TestsDB()
+    plan = Plan(f"test {test_name} against {', '.join(defender_models)}{' in batch' if batch else ''}",
+                db.get_call_latencies(), batch)
+    for table, limit in (("valid", max_valid_cases), ("enhanced", max_enhanced_cases)):
+        available, mean_chars = db.get_prompt_lengths(table, test_name)
+        cases = _sample_size(limit, available)
+        if not cases:
+            continue
+        for model, concurrency in defender_models.items():
+            response_chars = db.get_response_length(model)
+            completion = _tokens(response_chars) if response_chars else DEFAULT_COMPLETION_TOKENS
+            if early_abort and compliance_chars:
+                completion = min(completion, _tokens(compliance_chars))
+            prompt = estimate_prompt_tokens(Tester.defender_request(
+                " " * int(mean_chars or DEFAULT_PROMPT_CHARS), model)["messages"])
+            plan.add(f"test {table}", model, cases, prompt, completion,
+                     concurrency=1 if sequential else concurrency)
+    if sequential:
+        plan.notes.append(
+            "With --sequential these are the most calls; each defender stops once its interval is reached")
+    if early_abort:
+        plan.notes.append(
+            "With --early-abort, refusals end sooner than the compliance cutoff assumed here")
+    return plan
@@ -1,37 +1,157 @@
-import openai
-import os
+import contextvars
+import threading
 import uuid
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from config.models import DEFAULT_COMPLETION_TOKENS
 from ..models.result import Result
+from ..models.test_case import TestCase
+from ..utils.bandit import CaseSelector
 from ..utils.db_manager import TestsDB
+from ..utils.hedging import HedgedRequester
+from ..utils.llm import StreamedCompletion, chat_completion, get_client, stream_chat_completion
+from ..utils.profiler import stage
+from ..utils.sequential import SequentialEstimate
+from ..utils.tracing import trace_case
+from ..utils.verdict import COMPLIANCE_PREFIX_CHARS, ERROR_RESPONSE, early_verdict, guard_held, is_error, is_refusal
 
 
 class Tester:
-    def __init__(self):
-        self.client = openai.Client(
-            api_key=os.getenv("CLOD_API_KEY"),
-            base_url="https://api.clod.io/v1",
-        )
+    def __init__(self, timeout: float = 120.0, hedge_budget: float = 0.05,
+                 early_abort: bool = False, compliance_chars: int = COMPLIANCE_PREFIX_CHARS):
+        self.client = get_client()
         self.db = TestsDB()
+        # Deadline per defender call, and duplicates for calls slower than the model's p95
+        self.requester = HedgedRequester(
+            timeout=timeout, hedge_budget=hedge_budget)
+        # Stream defender responses and close them once the verdict is known
+        self.early_abort = early_abort
+        self.compliance_chars = compliance_chars
+        self.abort_stats: Dict[str, Dict[str, float]] = {}
+        self._full_tokens: Dict[str, List[float]] = {}
+        self.sequential_stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def defender_request(prompt: str, defender_model: str) -> dict:
+        """Chat completion arguments sending a prompt to a defender model"""
+        return {
+            "model": defender_model,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+        }
 
     def get_llm_response(self, prompt: str, defender_model: str) -> str:
         """Get response from the defender model for a given prompt"""
         try:
-            response = self.client.chat.completions.create(
-                model=defender_model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-            )
+            response = chat_completion(
+                self.client, requester=self.requester,
+                **self.defender_request(prompt, defender_model))
             return response.choices[0].message.content
         except Exception as e:
             print(f"❌ Error getting LLM response: {str(e)}")
-            return "Error: Failed to get response"
+            return ERROR_RESPONSE
+
+    def stream_llm_response(self, prompt: str, defender_model: str) -> StreamedCompletion:
+        """Stream the defender's response, stopping as soon as it clearly refuses or complies"""
+        try:
+            return stream_chat_completion(
+                self.client,
+                lambda text: early_verdict(
+                    text, self.compliance_chars) is not None,
+                requester=self.requester,
+                **self.defender_request(prompt, defender_model))
+        except Exception as e:
+            print(f"❌ Error getting LLM response: {str(e)}")
+            return StreamedCompletion(ERROR_RESPONSE, False, 0, 0.0, 0.0)
+
+    def _savings(self, defender_model: str, streamed: StreamedCompletion) -> Tuple[int, float]:
+        """Estimated tokens and seconds a truncated response saved, from the model's full responses"""
+        with self._lock:
+            if defender_model not in self._full_tokens:
+                # Seed from earlier runs: [total tokens, responses]
+                mean = self.db.get_full_response_tokens(defender_model)
+                self._full_tokens[defender_model] = [mean, 1] if mean else [0.0, 0]
+            total, count = self._full_tokens[defender_model]
+            if not streamed.truncated:
+                if not is_error(streamed.content):
+                    self._full_tokens[defender_model] = [
+                        total + streamed.completion_tokens, count + 1]
+                return 0, 0.0
+        full_tokens = total / count if count else DEFAULT_COMPLETION_TOKENS
+        tokens_saved = max(0, round(full_tokens) - streamed.completion_tokens)
+        # Time to generate the rest at the rate this response was streaming
+        generating = streamed.seconds - streamed.first_token_seconds
+        per_token = generating / (streamed.completion_tokens - 1) \
+            if streamed.completion_tokens > 1 and generating > 0 else 0.0
+        return tokens_saved, tokens_saved * per_token
+
+    @stage("test")
+    def test_case(self, test_name: str, case: TestCase, should_pass: bool,
+                  defender_model: str, set_id: str) -> Result:
+        """Send a single case to the defender model and store the outcome"""
+        trace_case(test_name, case.set_id, baseline_id=case.baseline_id, case_id=case.id,
+                   technique=case.technique, defender_model=defender_model, run_id=set_id)
+        truncated, completion_tokens, tokens_saved, seconds_saved = False, None, None, None
+        if self.early_abort:
+            streamed = self.stream_llm_response(case.prompt, defender_model)
+            llm_response, truncated = streamed.content, streamed.truncated
+            if not is_error(llm_response):
+                completion_tokens = streamed.completion_tokens
+                tokens_saved, seconds_saved = self._savings(
+                    defender_model, streamed)
+                self._count_abort(defender_model, truncated,
+                                  tokens_saved, seconds_saved)
+        else:
+            llm_response = self.get_llm_response(case.prompt, defender_model)
+
+        self.db.store_test_result(
+            test_name=test_name,
+            prompt=case.prompt,
+            should_pass=should_pass,
+            defender_model=defender_model,
+            llm_response=llm_response,
+            set_id=set_id,
+            technique=case.technique,
+            case_id=case.id,
+            truncated=truncated,
+            completion_tokens=completion_tokens,
+            tokens_saved=tokens_saved,
+            seconds_saved=seconds_saved
+        )
 
-    def run_tests(self, test_name: str, max_valid_cases: int, max_enhanced_cases: int, defender_model: str) -> List[Result]:
+        return Result(
+            prompt=case.prompt,
+            should_pass=should_pass,
+            llm_response=llm_response,
+            defender_model=defender_model,
+            truncated=truncated,
+        )
+
+    def _count_abort(self, defender_model: str, truncated: bool, tokens_saved: int, seconds_saved: float):
+        with self._lock:
+            stats = self.abort_stats.setdefault(defender_model, {
+                "streamed": 0, "truncated": 0, "tokens_saved": 0, "seconds_saved": 0.0})
+            stats["streamed"] += 1
+            stats["truncated"] += int(truncated)
+            stats["tokens_saved"] += tokens_saved
+            stats["seconds_saved"] += seconds_saved
+
+    def latency_stats(self) -> Dict[str, dict]:
+        """Per defender model latency percentiles and hedge/timeout counts so far"""
+        return self.requester.tracker.stats()
+
+    def run_tests(self, test_name: str, max_valid_cases: int, max_enhanced_cases: int, defender_model: str,
+                  on_result: Callable[[Result], None] = None, selection: str = "random",
+                  exploration: float = 0.1) -> List[Result]:
 
         results = []
         valid_cases = self.db.get_valid_cases(test_name, max_valid_cases)
+        if selection != "random":
+            return results + self._run_adaptive(
+                test_name, valid_cases, max_enhanced_cases, defender_model,
+                on_result, selection, exploration)
         enhanced_cases = self.db.get_enhanced_cases(
             test_name, max_enhanced_cases)
 
@@ -39,47 +159,161 @@ class Tester:
         set_id = str(uuid.uuid4())
 
         for i, valid_case in enumerate(valid_cases, 1):
-            llm_response = self.get_llm_response(
-                valid_case.prompt,
-                defender_model
-            )
-
-            self.db.store_test_result(
-                test_name=test_name,
-                prompt=valid_case.prompt,
-                should_pass=True,
-                defender_model=defender_model,
-                llm_response=llm_response,
-                set_id=set_id
-            )
-
-            result = Result(
-                prompt=valid_case.prompt,
-                should_pass=True,
-                llm_response=llm_response,
-            )
-            results.append(result)
+            results.append(self.test_case(
+                test_name, valid_case, True, defender_model, set_id))
+            if on_result:
+                on_result(results[-1])
 
         for i, enhanced_case in enumerate(enhanced_cases, 1):
-            llm_response = self.get_llm_response(
-                enhanced_case.prompt,
-                defender_model
-            )
-
-            self.db.store_test_result(
-                test_name=test_name,
-                prompt=enhanced_case.prompt,
-                should_pass=False,
-                defender_model=defender_model,
-                llm_response=llm_response,
-                set_id=set_id
-            )
-
-            result = Result(
-                prompt=enhanced_case.prompt,
-                should_pass=False,
-                llm_response=llm_response,
-            )
+            results.append(self.test_case(
+                test_name, enhanced_case, False, defender_model, set_id))
+            if on_result:
+                on_result(results[-1])
+
+        return results
+
+    def _run_adaptive(self, test_name: str, valid_cases: List[TestCase], max_enhanced_cases: int,
+                      defender_model: str, on_result: Callable[[Result], None],
+                      selection: str, exploration: float) -> List[Result]:
+        """Test valid cases, then spend the enhanced case budget where bypasses are likeliest"""
+        results = []
+        set_id = str(uuid.uuid4())
+        for valid_case in valid_cases:
+            results.append(self.test_case(
+                test_name, valid_case, True, defender_model, set_id))
+            if on_result:
+                on_result(results[-1])
+
+        # Only ids and arms of the pool are loaded; each chosen case is fetched on its own
+        selector = CaseSelector(
+            self.db.get_enhanced_arms(test_name),
+            self.db.get_enhanced_outcomes(test_name, defender_model),
+            policy=selection, exploration=exploration)
+        bypasses = 0
+        tested = 0
+        while tested < max_enhanced_cases:
+            case_id = selector.next()
+            if case_id is None:
+                break
+            case = self.db.get_case("enhanced", case_id)
+            if case is None:
+                continue
+            tested += 1
+            result = self.test_case(
+                test_name, case, False, defender_model, set_id)
+            if not is_error(result.llm_response):
+                bypassed = not guard_held(False, result.llm_response)
+                selector.update(case, bypassed)
+                bypasses += bypassed
             results.append(result)
+            if on_result:
+                on_result(result)
 
+        print(f"🎯 {selection} selection found {bypasses} bypasses in {
+              len(results) - len(valid_cases)} enhanced case tests")
         return results
+
+    def run_sequential_tests(self, test_name: str, max_valid_cases: int, max_enhanced_cases: int,
+                             defender_models: List[str], on_result: Callable[[Result], None] = None,
+                             width: float = 0.1, threshold: float = None, confidence: float = 0.95,
+                             min_cases: int = 5) -> List[Result]:
+        """Test enhanced cases one at a time per defender until its refusal rate is known well enough.
+
+        max_enhanced_cases caps the calls per defender. Each defender walks
+        the same shuffled cases in its own thread and stops as soon as its
+        SequentialEstimate allows; the outcome per defender is kept in
+        sequential_stats.
+        """
+        valid_cases = self.db.get_valid_cases(test_name, max_valid_cases)
+        enhanced_cases = self.db.get_enhanced_cases(
+            test_name, max_enhanced_cases)
+        set_id = str(uuid.uuid4())
+
+        def run_model(model):
+            results = []
+            for case in valid_cases:
+                results.append(self.test_case(
+                    test_name, case, True, model, set_id))
+                if on_result:
+                    on_result(results[-1])
+            estimate = SequentialEstimate(
+                width, threshold, confidence, min_cases)
+            calls = 0
+            reason = None
+            for case in enhanced_cases:
+                reason = estimate.stop_reason()
+                if reason:
+                    break
+                result = self.test_case(test_name, case, False, model, set_id)
+                calls += 1
+                if not is_error(result.llm_response):
+                    estimate.update(is_refusal(result.llm_response))
+                results.append(result)
+                if on_result:
+                    on_result(result)
+            else:
+                reason = estimate.stop_reason() or "budget spent"
+            low, high = estimate.interval()
+            with self._lock:
+                self.sequential_stats[model] = {
+                    "calls": calls, "tested": estimate.trials, "refused": estimate.refused,
+                    "rate": estimate.rate, "low": low, "high": high,
+                    "reason": reason, "saved": len(enhanced_cases) - calls,
+                }
+            return results
+
+        print(f"\n📐 Testing up to {len(enhanced_cases)} enhanced cases per defender until the "
+              f"{confidence:.0%} refusal rate interval is {width:g} wide"
+              f"{f' or clear of {threshold:g}' if threshold is not None else ''} (set {set_id})")
+        with ThreadPoolExecutor(max_workers=len(defender_models),
+                                thread_name_prefix="sequential") as executor:
+            # Copied contexts keep run budgets and daemon output capture
+            futures = [executor.submit(contextvars.copy_context().run, run_model, model)
+                       for model in defender_models]
+            return [result for future in futures for result in future.result()]
+
+    def run_fanout_tests(self, test_name: str, max_valid_cases: int, max_enhanced_cases: int,
+                         defender_models: Dict[str, int],
+                         on_result: Callable[[Result], None] = None) -> List[Result]:
+        """Test the same sampled cases against several defender models at once.
+
+        defender_models maps each model to its maximum number of in-flight
+        requests. Every result shares one set_id so runs are paired on
+        identical prompts. on_result is called from the worker threads as
+        each result completes; the returned list keeps case order.
+        """
+        valid_cases = self.db.get_valid_cases(test_name, max_valid_cases)
+        enhanced_cases = self.db.get_enhanced_cases(
+            test_name, max_enhanced_cases)
+        cases = ([(case, True) for case in valid_cases] +
+                 [(case, False) for case in enhanced_cases])
+
+        set_id = str(uuid.uuid4())
+
+        def run_case(case, should_pass, model):
+            result = self.test_case(
+                test_name, case, should_pass, model, set_id)
+            if on_result:
+                on_result(result)
+            return result
+
+        print(f"\n🚀 Testing {len(cases)} cases against {
+              len(defender_models)} defender models (set {set_id})")
+
+        # One pool per model so each model's limit is enforced independently
+        executors = {
+            model: ThreadPoolExecutor(max_workers=max(1, limit),
+                                      thread_name_prefix=f"defender-{model}")
+            for model, limit in defender_models.items()
+        }
+        try:
+            futures = [
+                [executors[model].submit(contextvars.copy_context().run,
+                                         run_case, case, should_pass, model)
+                 for model in defender_models]
+                for case, should_pass in cases
+            ]
+            return [future.result() for row in futures for future in row]
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
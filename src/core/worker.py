@@ -0,0 +1,130 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List
+from ..models.enhancement_technique import EnhancementTechnique
+from ..utils.db_manager import TestsDB
+
+if TYPE_CHECKING:
+    from .enhancer import Enhancer
+
+JOB_KINDS = ("enhance", "test")
+
+
+def enqueue_enhance_jobs(db: TestsDB, test_name: str, technique: EnhancementTechnique, model: str) -> int:
+    """Queue one enhance job per baseline case of a test"""
+    baseline_cases = db.get_baseline_cases(test_name=test_name)
+    payloads = [{"baseline_id": case.id, "technique": technique.value, "model": model}
+                for case in baseline_cases]
+    return db.enqueue_jobs("enhance", payloads)
+
+
+def enqueue_test_jobs(db: TestsDB, test_name: str, max_valid_cases: int, max_enhanced_cases: int,
+                      defender_models: List[str]) -> str:
+    """Queue one test job per sampled case and defender model, all under one set_id"""
+    set_id = str(uuid.uuid4())
+    cases = ([("valid", case) for case in db.get_valid_cases(test_name, max_valid_cases)] +
+             [("enhanced", case) for case in db.get_enhanced_cases(test_name, max_enhanced_cases)])
+    payloads = [{"test_name": test_name, "table": table, "case_id": case.id,
+                 "defender_model": model, "set_id": set_id}
+                for table, case in cases for model in defender_models]
+    db.enqueue_jobs("test", payloads)
+    return set_id
+
+
+class Worker:
+    """Claims jobs from the shared queue and runs them one at a time.
+
+    Each claimed job is leased for lease_seconds and the lease is renewed by
+    a heartbeat thread while the job runs. If the worker dies, the lease
+    expires and another worker picks the job up again.
+    """
+
+    def __init__(self, kinds: List[str] = JOB_KINDS, lease_seconds: int = 300,
+                 poll_interval: float = 5.0):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.kinds = list(kinds)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.db = TestsDB()
+        self._enhancers: Dict[str, "Enhancer"] = {}
+        self._tester = None
+
+    def run(self, max_jobs: int = None, exit_when_idle: bool = False) -> int:
+        """Process jobs until max_jobs are done or, optionally, the queue is empty"""
+        print(f"👷 Worker {self.worker_id} waiting for {
+              ', '.join(self.kinds)} jobs")
+        processed = 0
+        while max_jobs is None or processed < max_jobs:
+            jobs = self.db.claim_jobs(
+                self.worker_id, self.kinds, self.lease_seconds)
+            if not jobs:
+                if exit_when_idle:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self._run_job(jobs[0])
+            processed += 1
+        print(f"🏁 Worker {self.worker_id} processed {processed} jobs")
+        return processed
+
+    def _run_job(self, job: dict):
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job["id"], stop_heartbeat), daemon=True)
+        heartbeat.start()
+        try:
+            print(f"\n📌 Job {job['id']} ({job['kind']}, attempt {
+                  job['attempts']})")
+            match job["kind"]:
+                case "enhance":
+                    self._run_enhance(job["payload"])
+                case "test":
+                    self._run_test(job["payload"])
+                case _:
+                    raise ValueError(f"Unknown job kind: {job['kind']}")
+            stop_heartbeat.set()
+            if not self.db.complete_job(job["id"], self.worker_id):
+                print(f"⚠️ Lease on job {
+                      job['id']} was lost before it completed")
+        except Exception as e:
+            stop_heartbeat.set()
+            print(f"❌ Job {job['id']} failed: {str(e)}")
+            self.db.fail_job(job["id"], self.worker_id, str(e))
+        finally:
+            heartbeat.join()
+
+    def _heartbeat(self, job_id: int, stop: threading.Event):
+        # Renew well before expiry so one slow DB round-trip can't lose the lease
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.db.heartbeat_job(job_id, self.worker_id, self.lease_seconds):
+                print(f"⚠️ Lost lease on job {job_id}")
+                return
+
+    def _run_enhance(self, payload: dict):
+        from ..utils.vector_index import refresh_index
+        case = self.db.get_case("baseline", payload["baseline_id"])
+        if case is None:
+            raise ValueError(f"Baseline case {
+                             payload['baseline_id']} not found")
+        if payload["model"] not in self._enhancers:
+            from .enhancer import Enhancer
+            from .enhancer_helper.prefilter import CandidatePrefilter
+            self._enhancers[payload["model"]] = Enhancer(
+                model=payload["model"], prefilter=CandidatePrefilter())
+        self._enhancers[payload["model"]].enhance_case(
+            EnhancementTechnique.from_string(payload["technique"]), case)
+        refresh_index(self.db)
+
+    def _run_test(self, payload: dict):
+        case = self.db.get_case(payload["table"], payload["case_id"])
+        if case is None:
+            raise ValueError(f"{payload['table']} case {
+                             payload['case_id']} not found")
+        if self._tester is None:
+            from .tester import Tester
+            self._tester = Tester()
+        self._tester.test_case(payload["test_name"], case, payload["table"] == "valid",
+                               payload["defender_model"], payload["set_id"])
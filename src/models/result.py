@@ -1,7 +1,10 @@
 from pydantic import BaseModel
+from typing import Optional
 
 
 class Result(BaseModel):
     prompt: str
     should_pass: bool
     llm_response: str
+    defender_model: Optional[str] = None
+    truncated: Optional[bool] = False
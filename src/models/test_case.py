@@ -11,4 +11,7 @@ class TestCase(BaseModel):
     set_id: Optional[str] = None
     enhanced: Optional[bool] = False
     should_pass: Optional[bool] = None
+    baseline_id: Optional[int] = None
+    technique: Optional[str] = None
+    score: Optional[int] = None
     created_at: Optional[str] = None
@@ -0,0 +1,85 @@
+import random
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from ..models.test_case import TestCase
+
+SELECTION_POLICIES = ("random", "thompson", "epsilon")
+
+# Weight, in results, of a technique's overall bypass rate in the prior of
+# each of its arms, so a new baseline starts from what its technique does
+PRIOR_STRENGTH = 2.0
+
+Arm = Tuple[str, int]
+
+
+class CaseSelector:
+    """Chooses which enhanced case to test next from past defender outcomes.
+
+    Cases are given as (id, technique, baseline_id) rows, so a large pool
+    costs no prompts, and grouped into arms by (technique, baseline_id). Each arm keeps
+    a Beta posterior of its bypass rate, seeded from stored results and a
+    technique-wide prior, and updated as this run's results come in.
+    "thompson" picks the arm with the highest sampled bypass rate,
+    "epsilon" the arm with the highest mean; with either, a uniformly
+    random arm is picked instead with probability exploration. "random"
+    ignores the outcomes. No case is picked twice by one selector.
+    """
+
+    def __init__(self, cases: List[Tuple[int, str, int]], outcomes: Dict[Arm, Tuple[int, int]],
+                 policy: str = "thompson", exploration: float = 0.1, seed: int = None):
+        if policy not in SELECTION_POLICIES:
+            raise ValueError(f"Unknown selection policy: {policy}")
+        if not 0 <= exploration <= 1:
+            raise ValueError("Exploration must be between 0 and 1")
+        self.policy = policy
+        self.exploration = exploration
+        self._random = random.Random(seed)
+        self._cases: Dict[Arm, List[int]] = {}
+        for case_id, technique, baseline_id in cases:
+            self._cases.setdefault((technique, baseline_id), []).append(case_id)
+        for arm_cases in self._cases.values():
+            self._random.shuffle(arm_cases)
+
+        by_technique: Dict[str, List[int]] = {}
+        for (technique, _), (bypassed, refused) in outcomes.items():
+            totals = by_technique.setdefault(technique, [0, 0])
+            totals[0] += bypassed
+            totals[1] += refused
+        # Beta(alpha, beta) per arm: pseudo-counts of bypasses and refusals
+        self.posteriors: Dict[Arm, List[float]] = {}
+        for arm in self._cases:
+            bypassed, refused = by_technique.get(arm[0], (0, 0))
+            rate = (bypassed + 1) / (bypassed + refused + 2)
+            own_bypassed, own_refused = outcomes.get(arm, (0, 0))
+            self.posteriors[arm] = [1 + PRIOR_STRENGTH * rate + own_bypassed,
+                                    1 + PRIOR_STRENGTH * (1 - rate) + own_refused]
+
+    def remaining(self) -> int:
+        return sum(len(arm_cases) for arm_cases in self._cases.values())
+
+    def _score(self, arm: Arm) -> float:
+        alpha, beta = self.posteriors[arm]
+        if self.policy == "thompson":
+            return self._random.betavariate(alpha, beta)
+        return alpha / (alpha + beta)
+
+    def next(self) -> Optional[int]:
+        """The id of the next case to test, or None once every case was picked"""
+        arms = [arm for arm, arm_cases in self._cases.items() if arm_cases]
+        if not arms:
+            return None
+        if self.policy == "random":
+            # Weighted by cases left, so every remaining case is equally likely
+            arm = self._random.choices(
+                arms, weights=[len(self._cases[arm]) for arm in arms])[0]
+        elif self._random.random() < self.exploration:
+            arm = self._random.choice(arms)
+        else:
+            arm = max(arms, key=self._score)
+        return self._cases[arm].pop()
+
+    def update(self, case: 'TestCase', bypassed: bool):
+        """Fold one defender outcome for case into its arm"""
+        posterior = self.posteriors[(case.technique, case.baseline_id)]
+        posterior[0 if bypassed else 1] += 1
@@ -0,0 +1,213 @@
+import json
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+
+# Answer given to defender requests by the canned responder
+CANNED_RESPONSE = "I'm sorry, but I can't help with that."
+
+
+def canned_response(body: dict) -> str:
+    """Deterministic answer: generated cases for JSON requests, a refusal otherwise"""
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        prompt = body["messages"][-1]["content"]
+        match = re.search(r"Generate (\d+)", prompt)
+        count = int(match.group(1)) if match else 1
+        # The generation prompts name the rule on their second line
+        lines = prompt.splitlines()
+        subject = lines[1].strip()[:80] if len(lines) > 1 else ""
+        return json.dumps({"test_cases": [
+            {"prompt": f"Stand-in test case {i + 1}: {subject}"} for i in range(count)]})
+    return CANNED_RESPONSE
+
+
+def forwarded_response(body: dict) -> str:
+    """Answer by sending the request to the real API, through the shared rate limiter"""
+    from .llm import chat_completion, get_client
+    response = chat_completion(get_client(), **body)
+    return response.choices[0].message.content
+
+
+class BatchStandIn:
+    """In-memory OpenAI-compatible Files and Batches API.
+
+    Batches are processed in a background thread, one request at a time,
+    by a responder that turns a chat completion request body into the
+    answer text. Used to exercise the batch runner without a provider, or
+    with forwarded_response to give an endpoint without a Batch API one.
+    """
+
+    def __init__(self, responder: Callable[[dict], str] = canned_response, delay: float = 0.0):
+        self.responder = responder
+        self.delay = delay
+        self.files: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        file = {
+            "id": f"file-{uuid.uuid4().hex[:24]}",
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self._lock:
+            self.files[file["id"]] = {**file, "content": content}
+        return file
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str,
+                     metadata: dict = None) -> dict:
+        if input_file_id not in self.files:
+            raise ValueError(f"No such file: {input_file_id}")
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex[:24]}",
+            "object": "batch",
+            "endpoint": endpoint,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": metadata,
+        }
+        with self._lock:
+            self.batches[batch["id"]] = batch
+        threading.Thread(target=self._process, args=(batch,), daemon=True).start()
+        return batch
+
+    def _process(self, batch: dict):
+        lines = [json.loads(line) for line in
+                 self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines() if line.strip()]
+        batch["request_counts"]["total"] = len(lines)
+        batch["status"] = "in_progress"
+        outputs, errors = [], []
+        for request in lines:
+            time.sleep(self.delay)
+            try:
+                content = self.responder(request["body"])
+                outputs.append({
+                    "id": f"batch_req_{uuid.uuid4().hex[:24]}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": uuid.uuid4().hex,
+                        "body": {
+                            "object": "chat.completion",
+                            "model": request["body"]["model"],
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": content}}],
+                        },
+                    },
+                    "error": None,
+                })
+                batch["request_counts"]["completed"] += 1
+            except Exception as e:
+                errors.append({
+                    "id": f"batch_req_{uuid.uuid4().hex[:24]}",
+                    "custom_id": request["custom_id"],
+                    "response": None,
+                    "error": {"code": "server_error", "message": str(e)},
+                })
+                batch["request_counts"]["failed"] += 1
+        batch["status"] = "finalizing"
+        if outputs:
+            batch["output_file_id"] = self.add_file(
+                f"{batch['id']}_output.jsonl", _jsonl(outputs), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.add_file(
+                f"{batch['id']}_error.jsonl", _jsonl(errors), "batch_output")["id"]
+        batch["status"] = "completed"
+
+
+def _jsonl(records) -> bytes:
+    return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """POST /v1/files, GET /v1/files/<id>/content, POST /v1/batches, GET /v1/batches/<id>"""
+
+    server_version = "batch-standin"
+
+    @property
+    def standin(self) -> BatchStandIn:
+        return self.server.standin
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, content_type: str = "application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._send(404, {"error": {"message": f"Not found: {self.path}"}})
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part][1:]
+        if len(parts) == 3 and parts[0] == "files" and parts[2] == "content":
+            file = self.standin.files.get(parts[1])
+            return self._send(200, file["content"], "application/jsonl") if file else self._not_found()
+        if len(parts) == 2 and parts[0] == "files":
+            file = self.standin.files.get(parts[1])
+            if file:
+                return self._send(200, {key: value for key, value in file.items() if key != "content"})
+        if len(parts) == 2 and parts[0] == "batches":
+            batch = self.standin.batches.get(parts[1])
+            if batch:
+                return self._send(200, batch)
+        self._not_found()
+
+    def do_POST(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part][1:]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if parts == ["files"]:
+                # Multipart form with a "purpose" field and a "file" part
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+                fields = {part.get_param("name", header="content-disposition"): part
+                          for part in message.iter_parts()}
+                file = fields["file"]
+                return self._send(200, self.standin.add_file(
+                    file.get_filename(), file.get_payload(decode=True),
+                    fields["purpose"].get_payload(decode=True).decode()))
+            if parts == ["batches"]:
+                request = json.loads(body)
+                return self._send(200, self.standin.create_batch(
+                    request["input_file_id"], request["endpoint"],
+                    request["completion_window"], request.get("metadata")))
+        except (KeyError, ValueError) as e:
+            return self._send(400, {"error": {"message": str(e)}})
+        self._not_found()
+
+
+def serve_standin(standin: BatchStandIn, host: str = "127.0.0.1", port: int = 8766,
+                  background: bool = False) -> ThreadingHTTPServer:
+    """Serve the stand-in API under http://host:port/v1"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.standin = standin
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    print(f"🧪 Batch stand-in listening on http://{host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down")
+    finally:
+        server.server_close()
+    return server
@@ -0,0 +1,54 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from config.models import DEFAULT_MODEL_PRICING, MODEL_PRICING
+
+_active_budget = contextvars.ContextVar("active_budget", default=None)
+
+
+def request_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of one request according to config/models.py"""
+    pricing = MODEL_PRICING.get(model, DEFAULT_MODEL_PRICING)
+    return (prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]) / 1e6
+
+
+class RunBudget:
+    """Caps on the LLM calls, tokens and dollars a single run may spend"""
+
+    def __init__(self, max_calls: int = None, max_tokens: int = None, max_dollars: float = None):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.max_dollars = max_dollars
+        self.calls = 0
+        self.tokens = 0
+        self.dollars = 0.0
+        self._lock = threading.Lock()
+
+    def charge(self, model: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.calls += 1
+            self.tokens += prompt_tokens + completion_tokens
+            self.dollars += request_cost(model,
+                                         prompt_tokens, completion_tokens)
+
+    def exhausted(self) -> bool:
+        return ((self.max_calls is not None and self.calls >= self.max_calls) or
+                (self.max_tokens is not None and self.tokens >= self.max_tokens) or
+                (self.max_dollars is not None and self.dollars >= self.max_dollars))
+
+    @contextmanager
+    def activate(self):
+        """Charge every LLM call made in this context to this budget"""
+        token = _active_budget.set(self)
+        try:
+            yield self
+        finally:
+            _active_budget.reset(token)
+
+    def summary(self) -> str:
+        return f"{self.calls} calls, {self.tokens} tokens, ${self.dollars:.4f}"
+
+
+def active_budget() -> Optional[RunBudget]:
+    return _active_budget.get()
@@ -0,0 +1,291 @@
+import os
+import re
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from typing import Iterable, List, Sequence, Tuple
+
+
+class SQLiteBackend:
+    """Default backend: one SQLite file at DB_PATH, a connection per call"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+    @contextmanager
+    def connect(self):
+        """Yield a connection, committing on success and rolling back on error"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def streaming_cursor(self, conn):
+        """Cursor that fetches rows lazily rather than buffering the result"""
+        return conn.cursor()
+
+    def table_exists(self, conn, table_name: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone() is not None
+
+    def table_columns(self, conn, table_name: str) -> List[Tuple[str, str]]:
+        """Return (name, declared type) pairs in table order"""
+        return [(row[1], row[2]) for row in conn.execute(f'PRAGMA table_info({table_name})')]
+
+    def get_schema_version(self, conn) -> int:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def set_schema_version(self, conn, version: int):
+        conn.execute(f'PRAGMA user_version = {int(version)}')
+
+    def bulk_insert(self, conn, table_name: str, columns: Sequence[str], rows: Iterable[tuple]):
+        conn.executemany(f'''
+            INSERT INTO {table_name} ({', '.join(columns)})
+            VALUES ({', '.join('?' * len(columns))})
+        ''', rows)
+
+    def claim_rows(self, conn, table_name: str, where: str, params: Sequence,
+                   assignments: str, assignment_params: Sequence, limit: int) -> Tuple[List[str], List[tuple]]:
+        """Atomically update and return up to limit rows matching where.
+
+        SQLite serializes writers, so a single UPDATE ... RETURNING is enough
+        to guarantee that concurrent claimers never receive the same row.
+        """
+        cursor = conn.execute(f'''
+            UPDATE {table_name} SET {assignments}
+            WHERE id IN (SELECT id FROM {table_name} WHERE {where} ORDER BY id LIMIT ?)
+            RETURNING *
+        ''', (*assignment_params, *params, limit))
+        rows = cursor.fetchall()
+        return [description[0] for description in cursor.description], rows
+
+    def vacuum(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+
+
+# SQLite DDL spellings and their PostgreSQL equivalents
+_POSTGRES_DDL = [
+    (re.compile(r"INTEGER PRIMARY KEY AUTOINCREMENT", re.IGNORECASE),
+     "BIGSERIAL PRIMARY KEY"),
+    (re.compile(r"\bDATETIME\b", re.IGNORECASE), "TIMESTAMP"),
+    (re.compile(r"\bBLOB\b", re.IGNORECASE), "BYTEA"),
+    (re.compile(r"\)\s*WITHOUT ROWID", re.IGNORECASE), ")"),
+]
+
+# information_schema data types mapped back onto the SQLite declared types
+_POSTGRES_TYPES = {
+    "bigint": "INTEGER",
+    "integer": "INTEGER",
+    "boolean": "BOOLEAN",
+    "real": "REAL",
+    "double precision": "REAL",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMP",
+    "date": "DATE",
+    "bytea": "BLOB",
+}
+
+
+# String literals and quoted identifiers, whose ? are not placeholders
+_POSTGRES_TOKENS = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|[?%]""")
+
+
+def _postgres_token(match) -> str:
+    token = match.group(0)
+    if token == '?':
+        return '%s'
+    # psycopg reads % as a placeholder even inside literals
+    return token.replace('%', '%%')
+
+
+def _to_postgres(query: str) -> str:
+    """Rewrite a query written for SQLite into PostgreSQL syntax"""
+    for pattern, replacement in _POSTGRES_DDL:
+        query = pattern.sub(replacement, query)
+    return _POSTGRES_TOKENS.sub(_postgres_token, query)
+
+
+class _PostgresCursor:
+    """DB-API cursor wrapper accepting SQLite-style ? placeholders"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params: Sequence = ()):
+        self._cursor.execute(_to_postgres(query), params)
+        return self
+
+    def executemany(self, query: str, params: Iterable[Sequence]):
+        self._cursor.executemany(_to_postgres(query), params)
+        return self
+
+    @property
+    def description(self):
+        return [(column.name,) for column in self._cursor.description or []]
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class _PostgresConnection:
+    """Connection wrapper exposing the subset of the sqlite3 API TestsDB uses"""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def cursor(self):
+        return _PostgresCursor(self.raw.cursor())
+
+    def execute(self, query: str, params: Sequence = ()):
+        return self.cursor().execute(query, params)
+
+    def executemany(self, query: str, params: Iterable[Sequence]):
+        return self.cursor().executemany(query, params)
+
+    def commit(self):
+        self.raw.commit()
+
+
+class PostgresBackend:
+    """PostgreSQL backend with a shared connection pool.
+
+    Lets several machines write to, and claim work from, one database.
+    Requires psycopg 3 and psycopg_pool (pip install "psycopg[binary,pool]").
+    """
+
+    name = "postgres"
+
+    def __init__(self, db_url: str, min_size: int = 1, max_size: int = None):
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            raise ImportError(
+                'The PostgreSQL backend requires psycopg. Install it with: pip install "psycopg[binary,pool]"')
+        self.db_url = db_url
+        self.pool = ConnectionPool(
+            db_url,
+            min_size=min_size,
+            max_size=max_size or int(os.getenv("DB_POOL_SIZE", "10")),
+            configure=self._configure,
+            open=True,
+        )
+
+    @staticmethod
+    def _configure(conn):
+        # Return dates and timestamps as text, the way SQLite does
+        from psycopg.types.string import TextLoader
+        for type_name in ("date", "timestamp", "timestamptz"):
+            conn.adapters.register_loader(type_name, TextLoader)
+
+    @contextmanager
+    def connect(self):
+        """Borrow a pooled connection; the pool commits or rolls back on return"""
+        with self.pool.connection() as conn:
+            yield _PostgresConnection(conn)
+
+    def streaming_cursor(self, conn):
+        # Named cursors are server-side, so rows arrive in fetchmany batches
+        return _PostgresCursor(conn.raw.cursor(name=f"stream_{uuid.uuid4().hex}"))
+
+    def table_exists(self, conn, table_name: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = current_schema() AND table_name = ?",
+            (table_name,)).fetchone() is not None
+
+    def table_columns(self, conn, table_name: str) -> List[Tuple[str, str]]:
+        rows = conn.execute('''
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ?
+            ORDER BY ordinal_position
+        ''', (table_name,)).fetchall()
+        return [(name, _POSTGRES_TYPES.get(data_type, "TEXT")) for name, data_type in rows]
+
+    def get_schema_version(self, conn) -> int:
+        # PostgreSQL has no user_version pragma, so keep it in a one-row table
+        if not self.table_exists(conn, "schema_version"):
+            return 0
+        row = conn.execute('SELECT version FROM schema_version').fetchone()
+        return row[0] if row else 0
+
+    def set_schema_version(self, conn, version: int):
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+        conn.execute('DELETE FROM schema_version')
+        conn.execute(
+            'INSERT INTO schema_version (version) VALUES (?)', (version,))
+
+    def bulk_insert(self, conn, table_name: str, columns: Sequence[str], rows: Iterable[tuple]):
+        with conn.raw.cursor() as cursor:
+            with cursor.copy(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+    def claim_rows(self, conn, table_name: str, where: str, params: Sequence,
+                   assignments: str, assignment_params: Sequence, limit: int) -> Tuple[List[str], List[tuple]]:
+        """Atomically update and return up to limit rows matching where.
+
+        FOR UPDATE SKIP LOCKED lets concurrent workers claim disjoint rows
+        without waiting on each other's locks.
+        """
+        cursor = conn.execute(f'''
+            UPDATE {table_name} SET {assignments}
+            WHERE id IN (
+                SELECT id FROM {table_name} WHERE {where}
+                ORDER BY id LIMIT ? FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+        ''', (*assignment_params, *params, limit))
+        rows = cursor.fetchall()
+        return [description[0] for description in cursor.description], rows
+
+    def vacuum(self):
+        with self.pool.connection() as conn:
+            conn.autocommit = True
+            try:
+                conn.execute('VACUUM')
+            finally:
+                conn.autocommit = False
+
+
+_backends = {}
+
+
+def get_backend():
+    """Build (once per URL) the backend selected by DB_URL, falling back to DB_PATH"""
+    db_url = os.getenv('DB_URL', '')
+    if db_url.startswith(('postgres://', 'postgresql://')):
+        key = db_url
+        factory = PostgresBackend
+    else:
+        key = db_url.removeprefix('sqlite:///') or os.getenv('DB_PATH')
+        factory = SQLiteBackend
+    if key not in _backends:
+        _backends[key] = factory(key)
+    return _backends[key]
@@ -1,33 +1,114 @@
-import sqlite3
-import os
-from typing import List
-from ..models.test_case import TestCase
+import json
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from .db_backends import get_backend
+from .profiler import stage
+from .text_store import decode_text, encode_text, text_hash
+from .verdict import ERROR_RESPONSE, guard_held, is_error, is_refusal
+
+if TYPE_CHECKING:
+    from ..models.test_case import TestCase
+
+# Tables holding test cases and results, in pipeline order
+DATA_TABLES = ("baseline", "valid", "enhanced", "results")
+
+# Tables that test cases can be loaded from by id
+CASE_TABLES = ("baseline", "valid", "enhanced")
+
+# A job that fails this many times is parked as failed instead of re-queued
+MAX_JOB_ATTEMPTS = 3
+
+# Columns added to the results table after its original release
+RESULTS_EXTRA_COLUMNS = {
+    "technique": "TEXT",
+    "case_id": "INTEGER",
+    "refused": "BOOLEAN",
+    "prompt_hash": "TEXT",
+    "response_hash": "TEXT",
+    # Early-abort streaming: whether the defender stream was closed once the
+    # verdict was known, tokens read, and the estimated tokens and time saved
+    "truncated": "BOOLEAN",
+    "completion_tokens": "INTEGER",
+    "tokens_saved": "INTEGER",
+    "seconds_saved": "REAL",
+}
+
+# Bump whenever a create_*_table method changes, so existing databases
+# are migrated once instead of re-verified on every start
+SCHEMA_VERSION = 5
+
+ENHANCED_EXTRA_COLUMNS = {
+    "prompt_hash": "TEXT",
+    # Stored components the prompt was rendered from, and the template used
+    # when it is a re-rendered variant (NULL for the technique's own wrapper)
+    "components_id": "INTEGER",
+    "template": "TEXT",
+}
+
+# Long text columns kept in the texts table, mapped to their hash column.
+# Rows written before content addressing keep their text inline.
+TEXT_COLUMNS = {
+    "enhanced": {"prompt": "prompt_hash"},
+    "results": {"prompt": "prompt_hash", "llm_response": "response_hash"},
+}
+
+# Backends whose schema was already verified by this process
+_verified_backends = set()
+
+
+def _to_test_case(columns: List[str], row: tuple) -> 'TestCase':
+    # Imported here so scripts that never load cases skip importing pydantic
+    from ..models.test_case import TestCase
+    return TestCase(**dict(zip(columns, row)))
 
 
 class TestsDB:
-    def __init__(self):
-        self.db_path = os.getenv('DB_PATH')
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+    def __init__(self, backend=None):
+        # SQLite at DB_PATH unless DB_URL points at a server database
+        self.backend = backend or get_backend()
+        self.db_path = getattr(self.backend, 'db_path', None)
         self._init_database()
 
     def _init_database(self):
-        """Initialize SQLite database"""
+        """Initialize the database schema, once per process and schema version"""
+        if id(self.backend) in _verified_backends:
+            return
         try:
-            # Ensure database exists
-            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with self.backend.connect() as conn:
+                version = self.backend.get_schema_version(conn)
+            if version < SCHEMA_VERSION:
+                self.create_schema()
+                with self.backend.connect() as conn:
+                    self.backend.set_schema_version(conn, SCHEMA_VERSION)
+            _verified_backends.add(id(self.backend))
+        except Exception as e:
+            print(f"Error initializing database: {str(e)}")
+            raise
+
+    def create_schema(self):
+        """Create every table and migrate older ones"""
+        try:
+            self.create_texts_table()
             self.create_baseline_table()
             self.create_valid_table()
             self.create_results_table()
             self.create_enhanced_table()
+            self.create_result_stats_table()
+            self.create_export_watermarks_table()
+            self.create_jobs_table()
+            self.create_score_trajectories_table()
+            self.create_judgments_table()
+            self.create_batch_jobs_table()
+            self.create_enhancement_components_table()
+            self.create_call_stats_table()
         except Exception as e:
-            print(f"Error initializing database: {str(e)}")
+            print(f"Error creating schema: {str(e)}")
             raise
 
     def create_baseline_table(self):
         """Create the baseline table for failure cases"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS baseline (
@@ -47,7 +128,7 @@ class TestsDB:
     def create_valid_table(self):
         """Create the valid table for success cases"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS valid (
@@ -67,7 +148,7 @@ class TestsDB:
     def create_results_table(self):
         """Create the results table if it doesn't exist"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS results (
@@ -81,15 +162,371 @@ class TestsDB:
                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                     )
                 ''')
+                self._add_missing_columns(
+                    conn, 'results', RESULTS_EXTRA_COLUMNS)
                 conn.commit()
         except Exception as e:
             print(f"Error creating results table: {str(e)}")
             raise
 
+    def create_texts_table(self):
+        """Create the content-addressed store for long prompt and response texts"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS texts (
+                        hash TEXT PRIMARY KEY,
+                        codec TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        body BLOB NOT NULL
+                    ) WITHOUT ROWID
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating texts table: {str(e)}")
+            raise
+
+    def _add_missing_columns(self, conn, table_name: str, columns: Dict[str, str]):
+        """Migrate an existing table by adding any columns it lacks"""
+        existing = {name for name, _ in self.backend.table_columns(
+            conn, table_name)}
+        cursor = conn.cursor()
+        for column, column_type in columns.items():
+            if column not in existing:
+                cursor.execute(
+                    f'ALTER TABLE {table_name} ADD COLUMN {column} {column_type}')
+
+    def _store_text(self, cursor, text: str) -> str:
+        """Store text once under its content hash and return the hash"""
+        digest = text_hash(text)
+        if cursor.execute('SELECT 1 FROM texts WHERE hash = ?', (digest,)).fetchone() is None:
+            codec, body = encode_text(text)
+            cursor.execute('''
+                INSERT INTO texts (hash, codec, size, body)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (hash) DO NOTHING
+            ''', (digest, codec, len(text), body))
+        return digest
+
+    def _resolve_texts(self, conn, table_name: str, columns: List[str], rows: List[tuple]) -> List[tuple]:
+        """Replace hashed text columns in rows with their decompressed text"""
+        text_columns = [(columns.index(text_column), columns.index(hash_column))
+                        for text_column, hash_column in TEXT_COLUMNS.get(table_name, {}).items()
+                        if text_column in columns and hash_column in columns]
+        hashes = list({row[hash_index] for row in rows
+                       for _, hash_index in text_columns if row[hash_index]})
+        if not hashes:
+            return rows
+
+        texts = {}
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            for digest, codec, body in conn.execute(
+                    f"SELECT hash, codec, body FROM texts WHERE hash IN ({', '.join('?' * len(batch))})",
+                    batch):
+                texts[digest] = decode_text(codec, body)
+
+        resolved = []
+        for row in rows:
+            row = list(row)
+            for text_index, hash_index in text_columns:
+                if row[hash_index]:
+                    row[text_index] = texts[row[hash_index]]
+            resolved.append(tuple(row))
+        return resolved
+
+    def create_result_stats_table(self):
+        """Create the per-day aggregate table maintained by store_test_result"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                exists = self.backend.table_exists(conn, 'result_stats')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS result_stats (
+                        test_name TEXT NOT NULL,
+                        defender_model TEXT NOT NULL,
+                        technique TEXT NOT NULL,
+                        day DATE NOT NULL,
+                        total INTEGER NOT NULL DEFAULT 0,
+                        errors INTEGER NOT NULL DEFAULT 0,
+                        refused INTEGER NOT NULL DEFAULT 0,
+                        held INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (test_name, defender_model, technique, day)
+                    )
+                ''')
+                conn.commit()
+                results = 0 if exists else conn.execute(
+                    'SELECT COUNT(*) FROM results').fetchone()[0]
+            if results:
+                print(f"📊 Counting {results} existing results into the new result_stats table...")
+                self.rebuild_result_stats()
+        except Exception as e:
+            print(f"Error creating result stats table: {str(e)}")
+            raise
+
+    def create_export_watermarks_table(self):
+        """Create the table remembering how far each export has progressed"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS export_watermarks (
+                        destination TEXT NOT NULL,
+                        table_name TEXT NOT NULL,
+                        last_id INTEGER NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (destination, table_name)
+                    )
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating export watermarks table: {str(e)}")
+            raise
+
+    def create_jobs_table(self):
+        """Create the work queue shared by coordinator and worker processes"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        worker_id TEXT,
+                        lease_expires_at INTEGER,
+                        error TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS jobs_status_idx
+                    ON jobs (status, lease_expires_at)
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating jobs table: {str(e)}")
+            raise
+
+    def create_score_trajectories_table(self):
+        """Create the table of judge scores per improvement round of each enhancement"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS score_trajectories (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        technique TEXT NOT NULL,
+                        baseline_id INTEGER NOT NULL,
+                        scores TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating score trajectories table: {str(e)}")
+            raise
+
+    def create_judgments_table(self):
+        """Create the cache of judge verdicts keyed by candidate content and judge model"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS judgments (
+                        cache_key TEXT PRIMARY KEY,
+                        judge_model TEXT NOT NULL,
+                        relevance_score INTEGER NOT NULL,
+                        judgment TEXT NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating judgments table: {str(e)}")
+            raise
+
+    def create_enhancement_components_table(self):
+        """Create the tables of enhancement components and the judgments of each improvement round"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS enhancement_components (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        test_name TEXT NOT NULL,
+                        baseline_id INTEGER NOT NULL,
+                        technique TEXT NOT NULL,
+                        context_key TEXT NOT NULL,
+                        context TEXT NOT NULL,
+                        masked_attack TEXT NOT NULL,
+                        followup_question TEXT NOT NULL,
+                        score INTEGER NOT NULL,
+                        offender_model TEXT NOT NULL,
+                        set_id TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (baseline_id) REFERENCES baseline(id)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS enhancement_judgments (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        components_id INTEGER NOT NULL,
+                        iteration INTEGER NOT NULL,
+                        context TEXT NOT NULL,
+                        masked_attack TEXT NOT NULL,
+                        followup_question TEXT NOT NULL,
+                        relevance_score INTEGER,
+                        improvement_tips TEXT,
+                        source TEXT NOT NULL,
+                        accepted BOOLEAN NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (components_id) REFERENCES enhancement_components(id)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_enhancement_components_test
+                    ON enhancement_components (test_name, technique)
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating enhancement components tables: {str(e)}")
+            raise
+
+    def create_call_stats_table(self):
+        """Create the table of LLM calls and seconds spent in them per model, for run forecasts"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS call_stats (
+                        model TEXT PRIMARY KEY,
+                        calls INTEGER NOT NULL,
+                        seconds REAL NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating call stats table: {str(e)}")
+            raise
+
+    def create_batch_jobs_table(self):
+        """Create the tables tracking provider batch submissions and their requests"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS batch_jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT NOT NULL,
+                        test_name TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'created',
+                        base_url TEXT,
+                        input_file_id TEXT,
+                        batch_id TEXT UNIQUE,
+                        output_file_id TEXT,
+                        error_file_id TEXT,
+                        error TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS batch_items (
+                        job_id INTEGER NOT NULL,
+                        custom_id TEXT NOT NULL,
+                        request TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        ingested BOOLEAN NOT NULL DEFAULT FALSE,
+                        error TEXT,
+                        PRIMARY KEY (job_id, custom_id),
+                        FOREIGN KEY (job_id) REFERENCES batch_jobs(id)
+                    )
+                ''')
+                conn.commit()
+        except Exception as e:
+            print(f"Error creating batch jobs tables: {str(e)}")
+            raise
+
+    def _update_result_stats(self, cursor, test_name: str, defender_model: str, technique: str,
+                             day: str, total: int, errors: int, refused: int, held: int):
+        """Add counts to one aggregate row, creating it on first use"""
+        cursor.execute('''
+            INSERT INTO result_stats
+            (test_name, defender_model, technique, day, total, errors, refused, held)
+            VALUES (?, ?, ?, COALESCE(?, CURRENT_DATE), ?, ?, ?, ?)
+            ON CONFLICT (test_name, defender_model, technique, day) DO UPDATE SET
+                total = result_stats.total + excluded.total,
+                errors = result_stats.errors + excluded.errors,
+                refused = result_stats.refused + excluded.refused,
+                held = result_stats.held + excluded.held
+        ''', (test_name, defender_model, technique or 'none', day, total, errors, refused, held))
+
+    def rebuild_result_stats(self) -> int:
+        """Recompute the aggregate table from every stored result; returns the results counted"""
+        try:
+            with self.backend.connect() as conn:
+                self._backfill_refused(conn)
+                conn.execute('DELETE FROM result_stats')
+                conn.execute('''
+                    INSERT INTO result_stats
+                    (test_name, defender_model, technique, day, total, errors, refused, held)
+                    SELECT test_name, defender_model, technique, day, COUNT(*), SUM(error),
+                           SUM(CASE WHEN error = 0 AND refused THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN error = 0 AND refused <> should_pass THEN 1 ELSE 0 END)
+                    FROM (
+                        SELECT test_name, defender_model, COALESCE(technique, 'none') AS technique,
+                               DATE(timestamp) AS day, refused, should_pass,
+                               CASE WHEN COALESCE(response_hash, '') = ? OR llm_response = ?
+                                    THEN 1 ELSE 0 END AS error
+                        FROM results
+                    ) classified
+                    GROUP BY test_name, defender_model, technique, day
+                ''', (text_hash(ERROR_RESPONSE), ERROR_RESPONSE))
+                return conn.execute(
+                    'SELECT COALESCE(SUM(total), 0) FROM result_stats').fetchone()[0]
+        except Exception as e:
+            print(f"Error rebuilding result stats: {str(e)}")
+            return 0
+
+    def _backfill_refused(self, conn, chunk_size: int = 1000):
+        """Classify results stored before the refused column, once per distinct response"""
+        # Verdicts keyed by response hash, or by the text of responses still stored inline
+        conn.execute('''
+            CREATE TEMPORARY TABLE refusal_verdicts (
+                response TEXT PRIMARY KEY,
+                refused BOOLEAN NOT NULL
+            )
+        ''')
+        rows = self.backend.streaming_cursor(conn).execute('''
+            SELECT DISTINCT CASE WHEN response_hash IS NULL THEN llm_response END, response_hash
+            FROM results WHERE refused IS NULL
+        ''')
+        while chunk := rows.fetchmany(chunk_size):
+            conn.executemany(
+                'INSERT INTO refusal_verdicts (response, refused) VALUES (?, ?)',
+                [(response_hash or llm_response,
+                  not is_error(llm_response) and is_refusal(llm_response))
+                 for llm_response, response_hash in self._resolve_texts(
+                     conn, 'results', ['llm_response', 'response_hash'], chunk)])
+        conn.execute('''
+            UPDATE results SET refused = (
+                SELECT refused FROM refusal_verdicts
+                WHERE response = COALESCE(results.response_hash, results.llm_response))
+            WHERE refused IS NULL
+        ''')
+        conn.execute('DROP TABLE refusal_verdicts')
+
     def create_enhanced_table(self):
         """Create the enhanced table for enhanced attack cases"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS enhanced (
@@ -105,69 +542,212 @@ class TestsDB:
                         FOREIGN KEY (baseline_id) REFERENCES baseline(id)
                     )
                 ''')
+                self._add_missing_columns(
+                    conn, 'enhanced', ENHANCED_EXTRA_COLUMNS)
                 conn.commit()
         except Exception as e:
             print(f"Error creating enhanced table: {str(e)}")
             raise
 
+    @stage("store")
     def store_test_result(self, test_name: str, prompt: str, should_pass: bool,
-                          defender_model: str, llm_response: str, set_id: str):
-        """Store a single test result"""
+                          defender_model: str, llm_response: str, set_id: str,
+                          technique: str = None, case_id: int = None, truncated: bool = False,
+                          completion_tokens: int = None, tokens_saved: int = None,
+                          seconds_saved: float = None):
+        """Store a single test result and fold it into the daily aggregates"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT INTO results
-                    (test_name, prompt, should_pass, defender_model, llm_response, set_id)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (test_name, prompt, should_pass, defender_model, llm_response, set_id))
+            with self.backend.connect() as conn:
+                self._insert_test_result(
+                    conn.cursor(), test_name, prompt, should_pass, defender_model,
+                    llm_response, set_id, technique, case_id, truncated,
+                    completion_tokens, tokens_saved, seconds_saved)
         except Exception as e:
             print(f"Error storing test result: {str(e)}")
 
+    def _insert_test_result(self, cursor, test_name: str, prompt: str, should_pass: bool,
+                            defender_model: str, llm_response: str, set_id: str,
+                            technique: str = None, case_id: int = None, truncated: bool = False,
+                            completion_tokens: int = None, tokens_saved: int = None,
+                            seconds_saved: float = None):
+        error = is_error(llm_response)
+        refused = not error and is_refusal(llm_response)
+        held = not error and guard_held(should_pass, llm_response)
+        cursor.execute('''
+            INSERT INTO results
+            (test_name, prompt, should_pass, defender_model, llm_response, set_id,
+             technique, case_id, refused, prompt_hash, response_hash,
+             truncated, completion_tokens, tokens_saved, seconds_saved)
+            VALUES (?, '', ?, ?, '', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (test_name, should_pass, defender_model, set_id, technique, case_id, refused,
+              self._store_text(cursor, prompt), self._store_text(cursor, llm_response),
+              truncated, completion_tokens, tokens_saved, seconds_saved))
+        self._update_result_stats(
+            cursor, test_name, defender_model, technique, None,
+            1, int(error), int(refused), int(held))
+
+    @stage("store")
     def store_valid_cases(self, test_name: str, prompts: List[str], set_id: str, offender_model: str):
         """Store test cases in the valid table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                for prompt in prompts:
-                    cursor.execute('''
-                        INSERT INTO valid (test_name, prompt, set_id, offender_model)
-                        VALUES (?, ?, ?, ?)
-                    ''', (test_name, prompt, set_id, offender_model))
-                conn.commit()
+            with self.backend.connect() as conn:
+                self.backend.bulk_insert(
+                    conn, 'valid', ('test_name', 'prompt', 'set_id', 'offender_model'),
+                    [(test_name, prompt, set_id, offender_model) for prompt in prompts])
         except Exception as e:
             print(f"Error storing valid cases: {str(e)}")
 
+    @stage("store")
     def store_baseline_cases(self, test_name: str, prompts: List[str], set_id: str, offender_model: str):
         """Store test cases in the baseline table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                for prompt in prompts:
-                    cursor.execute('''
-                        INSERT INTO baseline (test_name, prompt, set_id, offender_model)
-                        VALUES (?, ?, ?, ?)
-                    ''', (test_name, prompt, set_id, offender_model))
-                conn.commit()
+            with self.backend.connect() as conn:
+                self.backend.bulk_insert(
+                    conn, 'baseline', ('test_name', 'prompt', 'set_id', 'offender_model'),
+                    [(test_name, prompt, set_id, offender_model) for prompt in prompts])
         except Exception as e:
             print(f"Error storing baseline cases: {str(e)}")
 
+    @stage("store")
     def store_enhanced_cases(self, test_name: str, prompt: str, set_id: str, offender_model: str, baseline_id: int, technique: str, score: int):
         """Store enhanced test case in the enhanced table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO enhanced (test_name, prompt, set_id, offender_model, baseline_id, technique, score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (test_name, prompt, set_id, offender_model, baseline_id, technique, score))
+                    INSERT INTO enhanced (test_name, prompt, prompt_hash, set_id, offender_model, baseline_id, technique, score)
+                    VALUES (?, '', ?, ?, ?, ?, ?, ?)
+                ''', (test_name, self._store_text(cursor, prompt), set_id, offender_model, baseline_id, technique, score))
                 conn.commit()
         except Exception as e:
             print(f"Error storing enhanced case: {str(e)}")
 
-    def get_valid_cases(self, test_name: str = None, limit: int = None) -> List[TestCase]:
+    @stage("store")
+    def store_enhancement(self, test_name: str, prompt: str, set_id: str, offender_model: str,
+                          baseline_id: int, technique: str, score: int, context_key: str,
+                          components: Dict[str, str], judgments: List[dict]) -> Optional[int]:
+        """Store an enhanced case with the components it was rendered from and its judgments"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                components_id = cursor.execute('''
+                    INSERT INTO enhancement_components
+                    (test_name, baseline_id, technique, context_key, context, masked_attack,
+                     followup_question, score, offender_model, set_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING id
+                ''', (test_name, baseline_id, technique, context_key, components[context_key],
+                      components['masked_attack'], components['followup_question'], score,
+                      offender_model, set_id)).fetchone()[0]
+                cursor.execute('''
+                    INSERT INTO enhanced (test_name, prompt, prompt_hash, set_id, offender_model, baseline_id,
+                                          technique, score, components_id)
+                    VALUES (?, '', ?, ?, ?, ?, ?, ?, ?)
+                ''', (test_name, self._store_text(cursor, prompt), set_id, offender_model, baseline_id,
+                      technique, score, components_id))
+                self.backend.bulk_insert(
+                    conn, 'enhancement_judgments',
+                    ('components_id', 'iteration', 'context', 'masked_attack', 'followup_question',
+                     'relevance_score', 'improvement_tips', 'source', 'accepted'),
+                    [(components_id, judgment['iteration'], judgment[context_key], judgment['masked_attack'],
+                      judgment['followup_question'], judgment.get('relevance_score'),
+                      json.dumps(judgment['improvement_tips']) if judgment.get(
+                          'improvement_tips') else None,
+                      judgment['source'], judgment['accepted'])
+                     for judgment in judgments])
+                conn.commit()
+                return components_id
+        except Exception as e:
+            print(f"Error storing enhancement: {str(e)}")
+            return None
+
+    def iter_enhancement_components(self, test_name: str = None, technique: str = None,
+                                    chunk_size: int = 10000) -> Iterator[List[dict]]:
+        """Yield stored enhancement components in id order, chunk_size rows at a time.
+
+        Each chunk is read in its own short transaction, so callers can
+        write between chunks without holding a read lock open.
+        """
+        conditions = ["id > ?"]
+        params = []
+        for column, value in (("test_name", test_name), ("technique", technique)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        last_id = 0
+        while True:
+            with self.backend.connect() as conn:
+                cursor = conn.execute(f'''
+                    SELECT * FROM enhancement_components
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY id
+                    LIMIT {int(chunk_size)}
+                ''', [last_id, *params])
+                columns = [description[0]
+                           for description in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            yield rows
+
+    def get_enhancement_judgments(self, components_id: int) -> List[dict]:
+        """Every judgment of the improvement rounds that produced a set of components"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.execute('''
+                    SELECT * FROM enhancement_judgments
+                    WHERE components_id = ?
+                    ORDER BY iteration, id
+                ''', (components_id,))
+                columns = [description[0]
+                           for description in cursor.description]
+                judgments = [dict(zip(columns, row))
+                             for row in cursor.fetchall()]
+                for judgment in judgments:
+                    if judgment['improvement_tips']:
+                        judgment['improvement_tips'] = json.loads(
+                            judgment['improvement_tips'])
+                return judgments
+        except Exception as e:
+            print(f"Error retrieving enhancement judgments: {str(e)}")
+            return []
+
+    @stage("store")
+    def store_rendered_cases(self, template: str, rows: List[dict]) -> int:
+        """Store re-rendered enhanced prompts, skipping components already rendered with template.
+
+        Each row carries the components row fields plus the rendered prompt.
+        Returns the number of enhanced cases added.
+        """
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                ids = [row['id'] for row in rows]
+                rendered = {components_id for (components_id,) in cursor.execute(f'''
+                    SELECT components_id FROM enhanced
+                    WHERE template = ? AND components_id IN ({', '.join('?' * len(ids))})
+                ''', [template, *ids]).fetchall()} if ids else set()
+                new_rows = [row for row in rows if row['id'] not in rendered]
+                self.backend.bulk_insert(
+                    conn, 'enhanced',
+                    ('test_name', 'prompt', 'prompt_hash', 'set_id', 'offender_model', 'baseline_id',
+                     'technique', 'score', 'components_id', 'template'),
+                    [(row['test_name'], '', self._store_text(cursor, row['prompt']), row['set_id'],
+                      row['offender_model'], row['baseline_id'], row['technique'], row['score'],
+                      row['id'], template)
+                     for row in new_rows])
+                conn.commit()
+                return len(new_rows)
+        except Exception as e:
+            print(f"Error storing rendered cases: {str(e)}")
+            return 0
+
+    @stage("load")
+    def get_valid_cases(self, test_name: str = None, limit: int = None) -> List['TestCase']:
         """Retrieve test cases from valid table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
 
                 conditions = []
@@ -188,16 +768,17 @@ class TestsDB:
                 columns = [description[0]
                            for description in cursor.description]
 
-                return [TestCase(**dict(zip(columns, row))) for row in rows]
+                return [_to_test_case(columns, row) for row in rows]
 
         except Exception as e:
             print(f"Error retrieving valid cases: {str(e)}")
             return []
 
-    def get_baseline_cases(self, test_name: str = None, limit: int = None) -> List[TestCase]:
+    @stage("load")
+    def get_baseline_cases(self, test_name: str = None, limit: int = None) -> List['TestCase']:
         """Retrieve test cases from baseline table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
 
                 conditions = []
@@ -218,16 +799,17 @@ class TestsDB:
                 columns = [description[0]
                            for description in cursor.description]
 
-                return [TestCase(**dict(zip(columns, row))) for row in rows]
+                return [_to_test_case(columns, row) for row in rows]
 
         except Exception as e:
             print(f"Error retrieving baseline cases: {str(e)}")
             return []
 
-    def get_enhanced_cases(self, test_name: str = None, limit: int = None) -> List[TestCase]:
+    @stage("load")
+    def get_enhanced_cases(self, test_name: str = None, limit: int = None) -> List['TestCase']:
         """Retrieve test cases from enhanced table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
 
                 conditions = []
@@ -244,33 +826,576 @@ class TestsDB:
                 '''
 
                 cursor.execute(query, params)
-                rows = cursor.fetchall()
                 columns = [description[0]
                            for description in cursor.description]
+                rows = self._resolve_texts(
+                    conn, 'enhanced', columns, cursor.fetchall())
 
-                return [TestCase(**dict(zip(columns, row))) for row in rows]
+                return [_to_test_case(columns, row) for row in rows]
 
         except Exception as e:
             print(f"Error retrieving enhanced cases: {str(e)}")
             return []
 
+    @stage("load")
+    def get_enhanced_arms(self, test_name: str) -> List[Tuple[int, str, int]]:
+        """(id, technique, baseline_id) of every enhanced case of a test, without prompts"""
+        try:
+            with self.backend.connect() as conn:
+                return [tuple(row) for row in conn.execute(
+                    'SELECT id, technique, baseline_id FROM enhanced WHERE test_name = ?',
+                    (test_name,)).fetchall()]
+        except Exception as e:
+            print(f"Error retrieving enhanced case arms: {str(e)}")
+            return []
+
+    @stage("load")
+    def get_enhanced_outcomes(self, test_name: str, defender_model: str) -> Dict[Tuple[str, int], Tuple[int, int]]:
+        """Bypassed and refused results so far per (technique, baseline_id) of enhanced cases"""
+        try:
+            with self.backend.connect() as conn:
+                rows = conn.execute('''
+                    SELECT e.technique, e.baseline_id,
+                           SUM(CASE WHEN r.refused THEN 0 ELSE 1 END) AS bypassed,
+                           SUM(CASE WHEN r.refused THEN 1 ELSE 0 END) AS refused
+                    FROM results r
+                    JOIN enhanced e ON e.id = r.case_id
+                    WHERE r.test_name = ? AND r.defender_model = ?
+                      AND NOT r.should_pass AND r.refused IS NOT NULL
+                      AND COALESCE(r.response_hash, '') != ? AND r.llm_response != ?
+                    GROUP BY e.technique, e.baseline_id
+                ''', (test_name, defender_model, text_hash(ERROR_RESPONSE), ERROR_RESPONSE)).fetchall()
+                return {(technique, baseline_id): (int(bypassed), int(refused))
+                        for technique, baseline_id, bypassed, refused in rows}
+        except Exception as e:
+            print(f"Error retrieving enhanced case outcomes: {str(e)}")
+            return {}
+
+    @stage("load")
+    def get_case(self, table_name: str, case_id: int) -> 'TestCase':
+        """Retrieve a single test case by id from baseline, valid or enhanced"""
+        if table_name not in CASE_TABLES:
+            raise ValueError(f"Unknown case table: {table_name}")
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.execute(
+                    f'SELECT * FROM {table_name} WHERE id = ?', (case_id,))
+                columns = [description[0]
+                           for description in cursor.description]
+                rows = self._resolve_texts(
+                    conn, table_name, columns, cursor.fetchall())
+                return _to_test_case(columns, rows[0]) if rows else None
+        except Exception as e:
+            print(f"Error retrieving {table_name} case {case_id}: {str(e)}")
+            return None
+
     def get_test_results(self, test_name: str) -> List[dict]:
         """Get all results for a specific test"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.backend.connect() as conn:
                 cursor = conn.execute(
                     'SELECT * FROM results WHERE test_name = ? ORDER BY timestamp',
                     (test_name,))
-                return [dict(row) for row in cursor.fetchall()]
+                columns = [description[0]
+                           for description in cursor.description]
+                rows = self._resolve_texts(
+                    conn, 'results', columns, cursor.fetchall())
+                return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             print(f"Error retrieving test results: {str(e)}")
             return []
 
+    @stage("load")
+    def get_full_response_tokens(self, defender_model: str) -> Optional[float]:
+        """Mean completion tokens of the streamed responses a defender model finished"""
+        try:
+            with self.backend.connect() as conn:
+                row = conn.execute('''
+                    SELECT AVG(completion_tokens) FROM results
+                    WHERE defender_model = ? AND completion_tokens IS NOT NULL
+                      AND NOT truncated
+                ''', (defender_model,)).fetchone()
+                return float(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            print(f"Error retrieving response lengths: {str(e)}")
+            return None
+
+    def get_result_stats(self, test_name: str = None, defender_model: str = None,
+                         technique: str = None, since: str = None, until: str = None,
+                         by_day: bool = False) -> List[dict]:
+        """Summarize results from the aggregate table without scanning results"""
+        try:
+            with self.backend.connect() as conn:
+                conditions = []
+                params = []
+                for column, value in (("test_name", test_name),
+                                      ("defender_model", defender_model),
+                                      ("technique", technique)):
+                    if value:
+                        conditions.append(f"{column} = ?")
+                        params.append(value)
+                if since:
+                    conditions.append("day >= ?")
+                    params.append(since)
+                if until:
+                    conditions.append("day <= ?")
+                    params.append(until)
+
+                group_columns = "test_name, defender_model, technique" + \
+                    (", day" if by_day else "")
+                query = f'''
+                    SELECT {group_columns},
+                           SUM(total) AS total, SUM(errors) AS errors,
+                           SUM(refused) AS refused, SUM(held) AS held
+                    FROM result_stats
+                    {f"WHERE {' AND '.join(conditions)}" if conditions else ""}
+                    GROUP BY {group_columns}
+                    ORDER BY {group_columns}
+                '''
+
+                stats = []
+                cursor = conn.execute(query, params)
+                columns = [description[0]
+                           for description in cursor.description]
+                for row in cursor.fetchall():
+                    row = dict(zip(columns, row))
+                    if 'day' in row:
+                        row['day'] = str(row['day'])
+                    answered = row['total'] - row['errors']
+                    row['held_rate'] = row['held'] / answered if answered else None
+                    stats.append(row)
+                return stats
+        except Exception as e:
+            print(f"Error retrieving result stats: {str(e)}")
+            return []
+
+    def get_table_columns(self, table_name: str) -> List[Tuple[str, str]]:
+        """Return (name, declared type) pairs for one of the data tables"""
+        if table_name not in DATA_TABLES:
+            raise ValueError(f"Unknown table: {table_name}")
+        with self.backend.connect() as conn:
+            return self.backend.table_columns(conn, table_name)
+
+    def iter_table_chunks(self, table_name: str, after_id: int = 0,
+                          chunk_size: int = 10000) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """Stream rows with id > after_id in id order, chunk_size rows at a time"""
+        if table_name not in DATA_TABLES:
+            raise ValueError(f"Unknown table: {table_name}")
+        with self.backend.connect() as conn:
+            cursor = self.backend.streaming_cursor(conn).execute(
+                f'SELECT * FROM {table_name} WHERE id > ? ORDER BY id', (after_id,))
+            columns = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield columns, self._resolve_texts(conn, table_name, columns, rows)
+
+    def migrate_inline_texts(self, chunk_size: int = 1000) -> int:
+        """Move texts still stored inline into the texts table and return the rows moved"""
+        moved = 0
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                for table_name, text_columns in TEXT_COLUMNS.items():
+                    for text_column, hash_column in text_columns.items():
+                        while True:
+                            rows = conn.execute(f'''
+                                SELECT id, {text_column} FROM {table_name}
+                                WHERE {hash_column} IS NULL LIMIT ?
+                            ''', (chunk_size,)).fetchall()
+                            if not rows:
+                                break
+                            for row_id, text in rows:
+                                cursor.execute(f'''
+                                    UPDATE {table_name} SET {text_column} = '', {hash_column} = ?
+                                    WHERE id = ?
+                                ''', (self._store_text(cursor, text), row_id))
+                            moved += len(rows)
+                            conn.commit()
+            self.backend.vacuum()
+            return moved
+        except Exception as e:
+            print(f"Error migrating inline texts: {str(e)}")
+            return moved
+
+    def get_export_watermark(self, destination: str, table_name: str) -> int:
+        """Return the highest id already exported to destination (0 if none)"""
+        try:
+            with self.backend.connect() as conn:
+                row = conn.execute('''
+                    SELECT last_id FROM export_watermarks
+                    WHERE destination = ? AND table_name = ?
+                ''', (destination, table_name)).fetchone()
+                return row[0] if row else 0
+        except Exception as e:
+            print(f"Error retrieving export watermark: {str(e)}")
+            return 0
+
+    def set_export_watermark(self, destination: str, table_name: str, last_id: int):
+        """Record the highest id exported to destination"""
+        try:
+            with self.backend.connect() as conn:
+                conn.execute('''
+                    INSERT INTO export_watermarks (destination, table_name, last_id)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (destination, table_name) DO UPDATE SET
+                        last_id = excluded.last_id,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (destination, table_name, last_id))
+        except Exception as e:
+            print(f"Error storing export watermark: {str(e)}")
+
+    @stage("store")
+    def store_score_trajectory(self, technique: str, baseline_id: int, scores: List[int]):
+        """Store the best score after each improvement round of one enhancement"""
+        if not scores:
+            return
+        try:
+            with self.backend.connect() as conn:
+                conn.execute('''
+                    INSERT INTO score_trajectories (technique, baseline_id, scores)
+                    VALUES (?, ?, ?)
+                ''', (technique, baseline_id, json.dumps(scores)))
+        except Exception as e:
+            print(f"Error storing score trajectory: {str(e)}")
+
+    def store_call_stats(self, stats: Dict[str, Tuple[int, float]]):
+        """Add (calls, seconds) per model to the lifetime call statistics"""
+        try:
+            with self.backend.connect() as conn:
+                for model, (calls, seconds) in stats.items():
+                    conn.execute('''
+                        INSERT INTO call_stats (model, calls, seconds) VALUES (?, ?, ?)
+                        ON CONFLICT (model) DO UPDATE SET
+                            calls = call_stats.calls + excluded.calls,
+                            seconds = call_stats.seconds + excluded.seconds,
+                            updated_at = CURRENT_TIMESTAMP
+                    ''', (model, calls, seconds))
+                conn.commit()
+        except Exception as e:
+            print(f"Error storing call stats: {str(e)}")
+
+    def get_call_latencies(self) -> Dict[str, float]:
+        """Mean seconds per successful LLM call for every model called so far"""
+        try:
+            with self.backend.connect() as conn:
+                rows = conn.execute(
+                    'SELECT model, seconds / calls FROM call_stats WHERE calls > 0').fetchall()
+                return {model: float(seconds) for model, seconds in rows}
+        except Exception as e:
+            print(f"Error retrieving call stats: {str(e)}")
+            return {}
+
+    def get_prompt_lengths(self, table_name: str, test_name: str) -> Tuple[int, Optional[float]]:
+        """Number of cases of a test in a case table and their mean prompt length in characters"""
+        if table_name not in CASE_TABLES:
+            raise ValueError(f"Unknown case table: {table_name}")
+        # Hashed prompts keep their length in the texts table
+        length = ("COALESCE(t.size, LENGTH(c.prompt))" if table_name in TEXT_COLUMNS
+                  else "LENGTH(c.prompt)")
+        join = ("LEFT JOIN texts t ON t.hash = c.prompt_hash" if table_name in TEXT_COLUMNS
+                else "")
+        try:
+            with self.backend.connect() as conn:
+                count, mean = conn.execute(f'''
+                    SELECT COUNT(*), AVG({length}) FROM {table_name} c {join}
+                    WHERE c.test_name = ?
+                ''', (test_name,)).fetchone()
+                return int(count), float(mean) if mean is not None else None
+        except Exception as e:
+            print(f"Error retrieving prompt lengths: {str(e)}")
+            return 0, None
+
+    def get_response_length(self, defender_model: str) -> Optional[float]:
+        """Mean length in characters of a defender model's complete, successful responses"""
+        try:
+            with self.backend.connect() as conn:
+                row = conn.execute('''
+                    SELECT AVG(COALESCE(t.size, LENGTH(r.llm_response)))
+                    FROM results r LEFT JOIN texts t ON t.hash = r.response_hash
+                    WHERE r.defender_model = ? AND (r.truncated IS NULL OR NOT r.truncated)
+                      AND COALESCE(r.response_hash, '') != ? AND r.llm_response != ?
+                ''', (defender_model, text_hash(ERROR_RESPONSE), ERROR_RESPONSE)).fetchone()
+                return float(row[0]) if row and row[0] is not None else None
+        except Exception as e:
+            print(f"Error retrieving response lengths: {str(e)}")
+            return None
+
+    def get_component_lengths(self, technique: str) -> Optional[Dict[str, float]]:
+        """Mean length in characters of each stored enhancement component of a technique"""
+        try:
+            with self.backend.connect() as conn:
+                row = conn.execute('''
+                    SELECT COUNT(*), AVG(LENGTH(context)), AVG(LENGTH(masked_attack)),
+                           AVG(LENGTH(followup_question))
+                    FROM enhancement_components WHERE technique = ?
+                ''', (technique,)).fetchone()
+                if not row[0]:
+                    return None
+                return {"context": float(row[1]), "masked_attack": float(row[2]),
+                        "followup_question": float(row[3])}
+        except Exception as e:
+            print(f"Error retrieving component lengths: {str(e)}")
+            return None
+
+    def get_score_trajectories(self, technique: str, limit: int = 1000) -> List[List[int]]:
+        """Retrieve the most recent score trajectories for a technique"""
+        try:
+            with self.backend.connect() as conn:
+                rows = conn.execute('''
+                    SELECT scores FROM score_trajectories
+                    WHERE technique = ? ORDER BY id DESC LIMIT ?
+                ''', (technique, limit)).fetchall()
+                return [json.loads(row[0]) for row in rows]
+        except Exception as e:
+            print(f"Error retrieving score trajectories: {str(e)}")
+            return []
+
+    @stage("load")
+    def get_judgment(self, cache_key: str) -> Optional[dict]:
+        """Return a cached judgment and count the hit, or None if not cached"""
+        try:
+            with self.backend.connect() as conn:
+                row = conn.execute('''
+                    UPDATE judgments SET hits = hits + 1
+                    WHERE cache_key = ?
+                    RETURNING judgment
+                ''', (cache_key,)).fetchone()
+                return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"Error retrieving judgment: {str(e)}")
+            return None
+
+    @stage("store")
+    def store_judgment(self, cache_key: str, judge_model: str, judgment: dict):
+        """Cache a judgment; the first stored verdict for a key wins"""
+        try:
+            with self.backend.connect() as conn:
+                conn.execute('''
+                    INSERT INTO judgments (cache_key, judge_model, relevance_score, judgment)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (cache_key) DO NOTHING
+                ''', (cache_key, judge_model, judgment['relevance_score'], json.dumps(judgment)))
+        except Exception as e:
+            print(f"Error storing judgment: {str(e)}")
+
+    def get_judgment_stats(self) -> Dict[str, Dict[str, int]]:
+        """Cached judgments and lifetime cache hits per judge model"""
+        try:
+            with self.backend.connect() as conn:
+                rows = conn.execute('''
+                    SELECT judge_model, COUNT(*), COALESCE(SUM(hits), 0)
+                    FROM judgments GROUP BY judge_model
+                ''').fetchall()
+                return {model: {"entries": entries, "hits": hits} for model, entries, hits in rows}
+        except Exception as e:
+            print(f"Error retrieving judgment stats: {str(e)}")
+            return {}
+
+    def enqueue_jobs(self, kind: str, payloads: List[dict]) -> int:
+        """Add pending jobs of one kind to the work queue"""
+        try:
+            with self.backend.connect() as conn:
+                conn.executemany('''
+                    INSERT INTO jobs (kind, payload) VALUES (?, ?)
+                ''', [(kind, json.dumps(payload)) for payload in payloads])
+            return len(payloads)
+        except Exception as e:
+            print(f"Error enqueuing {kind} jobs: {str(e)}")
+            return 0
+
+    def claim_jobs(self, worker_id: str, kinds: List[str], lease_seconds: int,
+                   limit: int = 1) -> List[dict]:
+        """Lease up to limit pending jobs, or jobs whose lease has expired"""
+        now = int(time.time())
+        try:
+            with self.backend.connect() as conn:
+                # Jobs whose workers died on their last attempt will never be claimed again
+                conn.execute('''
+                    UPDATE jobs SET status = 'failed', error = 'Lease expired', lease_expires_at = NULL
+                    WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+                ''', (now, MAX_JOB_ATTEMPTS))
+                columns, rows = self.backend.claim_rows(
+                    conn, 'jobs',
+                    f'''kind IN ({', '.join('?' * len(kinds))}) AND attempts < ?
+                        AND (status = 'pending' OR (status = 'running' AND lease_expires_at < ?))''',
+                    (*kinds, MAX_JOB_ATTEMPTS, now),
+                    '''status = 'running', worker_id = ?, lease_expires_at = ?,
+                       attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP''',
+                    (worker_id, now + lease_seconds),
+                    limit)
+            jobs = [dict(zip(columns, row)) for row in rows]
+            for job in jobs:
+                job['payload'] = json.loads(job['payload'])
+            return jobs
+        except Exception as e:
+            print(f"Error claiming jobs: {str(e)}")
+            return []
+
+    def heartbeat_job(self, job_id: int, worker_id: str, lease_seconds: int) -> bool:
+        """Extend a lease; returns False if the job is no longer ours"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.execute('''
+                    UPDATE jobs SET lease_expires_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND worker_id = ? AND status = 'running'
+                ''', (int(time.time()) + lease_seconds, job_id, worker_id))
+                return cursor.rowcount == 1
+        except Exception as e:
+            print(f"Error extending lease for job {job_id}: {str(e)}")
+            return False
+
+    def complete_job(self, job_id: int, worker_id: str) -> bool:
+        """Mark a leased job as done"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.execute('''
+                    UPDATE jobs SET status = 'done', lease_expires_at = NULL,
+                                    updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND worker_id = ? AND status = 'running'
+                ''', (job_id, worker_id))
+                return cursor.rowcount == 1
+        except Exception as e:
+            print(f"Error completing job {job_id}: {str(e)}")
+            return False
+
+    def fail_job(self, job_id: int, worker_id: str, error: str):
+        """Release a failed job for retry, or park it once attempts run out"""
+        try:
+            with self.backend.connect() as conn:
+                conn.execute('''
+                    UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                                    lease_expires_at = NULL, error = ?,
+                                    updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND worker_id = ? AND status = 'running'
+                ''', (MAX_JOB_ATTEMPTS, error, job_id, worker_id))
+        except Exception as e:
+            print(f"Error failing job {job_id}: {str(e)}")
+
+    def get_job_counts(self) -> Dict[str, Dict[str, int]]:
+        """Count queued jobs per kind and status"""
+        try:
+            with self.backend.connect() as conn:
+                counts = {}
+                for kind, status, count in conn.execute(
+                        'SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status').fetchall():
+                    counts.setdefault(kind, {})[status] = count
+                return counts
+        except Exception as e:
+            print(f"Error counting jobs: {str(e)}")
+            return {}
+
+    def create_batch_job(self, kind: str, test_name: str, base_url: str,
+                         items: List[Tuple[str, dict, dict]]) -> Optional[int]:
+        """Record a batch and its (custom_id, request, payload) items before anything is uploaded"""
+        try:
+            with self.backend.connect() as conn:
+                job_id = conn.execute('''
+                    INSERT INTO batch_jobs (kind, test_name, base_url) VALUES (?, ?, ?)
+                    RETURNING id
+                ''', (kind, test_name, base_url)).fetchone()[0]
+                self.backend.bulk_insert(
+                    conn, 'batch_items', ('job_id', 'custom_id', 'request', 'payload'),
+                    [(job_id, custom_id, json.dumps(request), json.dumps(payload))
+                     for custom_id, request, payload in items])
+                return job_id
+        except Exception as e:
+            print(f"Error creating batch job: {str(e)}")
+            return None
+
+    def update_batch_job(self, job_id: int, **fields):
+        """Set status, provider IDs or error of a batch job"""
+        try:
+            with self.backend.connect() as conn:
+                assignments = ', '.join(f'{column} = ?' for column in fields)
+                conn.execute(f'''
+                    UPDATE batch_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (*fields.values(), job_id))
+        except Exception as e:
+            print(f"Error updating batch job {job_id}: {str(e)}")
+
+    def get_batch_jobs(self, statuses: List[str] = None) -> List[dict]:
+        """Batch jobs with item counts, optionally only those in the given statuses"""
+        try:
+            with self.backend.connect() as conn:
+                where = f"WHERE status IN ({', '.join('?' * len(statuses))})" if statuses else ""
+                cursor = conn.execute(f'''
+                    SELECT batch_jobs.*,
+                           (SELECT COUNT(*) FROM batch_items WHERE job_id = batch_jobs.id) AS items,
+                           (SELECT COUNT(*) FROM batch_items
+                            WHERE job_id = batch_jobs.id AND ingested) AS ingested
+                    FROM batch_jobs {where} ORDER BY id
+                ''', tuple(statuses or ()))
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error retrieving batch jobs: {str(e)}")
+            return []
+
+    def get_batch_requests(self, job_id: int) -> List[Tuple[str, dict]]:
+        """The (custom_id, request body) pairs of a batch job, for writing its input file"""
+        try:
+            with self.backend.connect() as conn:
+                rows = conn.execute('''
+                    SELECT custom_id, request FROM batch_items WHERE job_id = ? ORDER BY custom_id
+                ''', (job_id,)).fetchall()
+                return [(custom_id, json.loads(request)) for custom_id, request in rows]
+        except Exception as e:
+            print(f"Error retrieving batch requests: {str(e)}")
+            return []
+
+    def _claim_batch_item(self, cursor, job_id: int, custom_id: str, error: str = None) -> Optional[dict]:
+        """Mark an item ingested and return its payload, or None if it already was"""
+        row = cursor.execute('''
+            UPDATE batch_items SET ingested = TRUE, error = ?
+            WHERE job_id = ? AND custom_id = ? AND NOT ingested
+            RETURNING payload
+        ''', (error, job_id, custom_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ingest_batch_result(self, job_id: int, custom_id: str, llm_response: str,
+                            error: str = None) -> bool:
+        """Store a defender response from a batch once, however often it is ingested"""
+        try:
+            with self.backend.connect() as conn:
+                cursor = conn.cursor()
+                payload = self._claim_batch_item(
+                    cursor, job_id, custom_id, error)
+                if payload is None:
+                    return False
+                self._insert_test_result(
+                    cursor, payload['test_name'], payload['prompt'], payload['should_pass'],
+                    payload['defender_model'], llm_response, payload['set_id'],
+                    payload.get('technique'), payload['case_id'])
+                return True
+        except Exception as e:
+            print(f"Error ingesting batch result {custom_id}: {str(e)}")
+            return False
+
+    def ingest_batch_cases(self, job_id: int, custom_id: str, prompts: List[str],
+                           error: str = None) -> bool:
+        """Store generated cases from a batch once, however often they are ingested"""
+        try:
+            with self.backend.connect() as conn:
+                payload = self._claim_batch_item(
+                    conn.cursor(), job_id, custom_id, error)
+                if payload is None:
+                    return False
+                self.backend.bulk_insert(
+                    conn, payload['table'], ('test_name', 'prompt', 'set_id', 'offender_model'),
+                    [(payload['test_name'], prompt, payload['set_id'], payload['offender_model'])
+                     for prompt in prompts])
+                return True
+        except Exception as e:
+            print(f"Error ingesting batch cases {custom_id}: {str(e)}")
+            return False
+
     def mark_baseline_as_enhanced(self, case_id: int):
         """Mark a baseline case as enhanced"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.backend.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE baseline 
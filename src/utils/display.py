@@ -1,34 +1,211 @@
-from typing import List
+import threading
+from typing import Dict, List
 from colorama import init, Fore, Style
 from ..models.result import Result
+from .verdict import guard_held, is_error, is_refusal
 
 # Initialize colorama
 init()
 
 
+def display_result(index: int, result: Result):
+    """Print one result in full, framed by a border"""
+    # Create a border around each test
+    print(f"\n{Fore.YELLOW}{'═' * 80}{Style.RESET_ALL}")
+    print(f"{Style.BRIGHT}{Fore.BLUE}Test #{index}{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}{'─' * 80}{Style.RESET_ALL}")
+
+    # Display prompt with better formatting
+    print(f"{Style.BRIGHT}Prompt:{Style.RESET_ALL}")
+    print(f"{Fore.WHITE}{result.prompt}{Style.RESET_ALL}")
+
+    # Display should_pass status with color
+    pass_status = (f"{Fore.GREEN}Yes{Style.RESET_ALL}"
+                   if result.should_pass
+                   else f"{Fore.RED}No{Style.RESET_ALL}")
+    print(f"\n{Style.BRIGHT}Should Pass:{Style.RESET_ALL} {pass_status}")
+
+    if result.defender_model:
+        print(f"{Style.BRIGHT}Defender:{Style.RESET_ALL} {
+              result.defender_model}")
+
+    # Display LLM response with better formatting
+    print(f"\n{Style.BRIGHT}LLM Response{' (stopped once the verdict was known)' if result.truncated else ''}:"
+          f"{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{result.llm_response}{Style.RESET_ALL}")
+
+
 def display_results(results: List[Result]):
     print(f"\n{Style.BRIGHT}{
           Fore.CYAN}=== Detailed Test Results ==={Style.RESET_ALL}")
 
     for i, result in enumerate(results, 1):
-        # Create a border around each test
-        print(f"\n{Fore.YELLOW}{'═' * 80}{Style.RESET_ALL}")
-        print(f"{Style.BRIGHT}{Fore.BLUE}Test #{i}{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}{'─' * 80}{Style.RESET_ALL}")
+        display_result(i, result)
 
-        # Display prompt with better formatting
-        print(f"{Style.BRIGHT}Prompt:{Style.RESET_ALL}")
-        print(f"{Fore.WHITE}{result.prompt}{Style.RESET_ALL}")
+    # Add a final border
+    print(f"\n{Fore.YELLOW}{'═' * 80}{Style.RESET_ALL}\n")
 
-        # Display should_pass status with color
-        pass_status = (f"{Fore.GREEN}Yes{Style.RESET_ALL}"
-                       if result.should_pass
-                       else f"{Fore.RED}No{Style.RESET_ALL}")
-        print(f"\n{Style.BRIGHT}Should Pass:{Style.RESET_ALL} {pass_status}")
 
-        # Display LLM response with better formatting
-        print(f"\n{Style.BRIGHT}LLM Response:{Style.RESET_ALL}")
-        print(f"{Fore.CYAN}{result.llm_response}{Style.RESET_ALL}")
+def _truncate(text: str, width: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= width else text[:width - 1] + "…"
 
-    # Add a final border
-    print(f"\n{Fore.YELLOW}{'═' * 80}{Style.RESET_ALL}\n")
+
+def display_compact_header(width: int = 40):
+    print(f"\n{Style.BRIGHT}{
+          Fore.CYAN}=== Test Results ==={Style.RESET_ALL}")
+    print(f"{'#':>5} {'Defender':<20} {'Pass?':<5} {'Verdict':<7} "
+          f"{'Prompt':<{width}} Response")
+    print(f"{Fore.YELLOW}{'─' * (42 + 2 * width)}{Style.RESET_ALL}")
+
+
+def display_compact_row(index: int, result: Result, width: int = 40):
+    """Print one result as a single line with the prompt and response truncated"""
+    if is_error(result.llm_response):
+        verdict = f"{Fore.YELLOW}{'ERROR':<7}{Style.RESET_ALL}"
+    elif guard_held(result.should_pass, result.llm_response):
+        verdict = f"{Fore.GREEN}{'HELD':<7}{Style.RESET_ALL}"
+    else:
+        verdict = f"{Fore.RED}{'FAILED':<7}{Style.RESET_ALL}"
+    print(f"{index:>5} {_truncate(result.defender_model, 20):<20} {'yes' if result.should_pass else 'no':<5} "
+          f"{verdict} {_truncate(result.prompt, width):<{width}} {_truncate(result.llm_response, width)}")
+
+
+class ResultStream:
+    """Display results one by one as tests complete.
+
+    mode is "full" (every result in full), "compact" (one truncated line per
+    result) or "summary" (only a progress counter). Results are also passed
+    to each report writer, so a full record can go to a file instead of the
+    terminal. Safe to call from several threads.
+    """
+
+    def __init__(self, mode: str = "full", reports: List = (), width: int = 40):
+        self.mode = mode
+        self.reports = list(reports)
+        self.width = width
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.mode == "full":
+            print(f"\n{Style.BRIGHT}{
+                  Fore.CYAN}=== Detailed Test Results ==={Style.RESET_ALL}")
+        elif self.mode == "compact":
+            display_compact_header(self.width)
+
+    def __call__(self, result: Result):
+        with self._lock:
+            self.count += 1
+            if self.mode == "full":
+                display_result(self.count, result)
+            elif self.mode == "compact":
+                display_compact_row(self.count, result, self.width)
+            else:
+                print(f"\r⏳ {self.count} results", end="", flush=True)
+            for report in self.reports:
+                report.write(result)
+
+    def close(self):
+        if self.mode == "full":
+            print(f"\n{Fore.YELLOW}{'═' * 80}{Style.RESET_ALL}\n")
+        elif self.mode == "summary" and self.count:
+            print()
+        for report in self.reports:
+            report.close()
+            print(f"📝 Report written to {report.path}")
+
+
+def display_summary(results: List[Result]):
+    """Print one line per defender model comparing how each guard held up"""
+    print(f"\n{Style.BRIGHT}{
+          Fore.CYAN}=== Defender Summary ==={Style.RESET_ALL}")
+    print(f"{'Model':<30} {'Cases':>6} {'Errors':>7} {'Refused':>8} {'Held':>6} {'Held %':>7}")
+    print(f"{Fore.YELLOW}{'─' * 69}{Style.RESET_ALL}")
+
+    models = list(dict.fromkeys(result.defender_model for result in results))
+    for model in models:
+        model_results = [r for r in results if r.defender_model == model]
+        answered = [r for r in model_results if not is_error(r.llm_response)]
+        refused = sum(is_refusal(r.llm_response) for r in answered)
+        held = sum(guard_held(r.should_pass, r.llm_response)
+                   for r in answered)
+        rate = f"{100 * held / len(answered):.1f}" if answered else "-"
+        color = Fore.GREEN if answered and held == len(answered) else Fore.RED
+        print(f"{str(model):<30} {len(model_results):>6} {
+              len(model_results) - len(answered):>7} {refused:>8} {held:>6} {color}{rate:>7}{Style.RESET_ALL}")
+
+    print()
+
+
+def display_latency(stats: Dict[str, dict]):
+    """Print per-model defender latency percentiles and hedging counts"""
+    if not stats:
+        return
+    print(f"\n{Style.BRIGHT}{
+          Fore.CYAN}=== Defender Latency ==={Style.RESET_ALL}")
+    print(f"{'Model':<30} {'Calls':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'Max s':>7} "
+          f"{'Hedged':>7} {'Won':>5} {'Timeouts':>9}")
+    print(f"{Fore.YELLOW}{'─' * 93}{Style.RESET_ALL}")
+
+    def seconds(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    for model, model_stats in stats.items():
+        print(f"{model:<30} {model_stats.get('calls', 0):>6} {seconds(model_stats['p50']):>7} "
+              f"{seconds(model_stats['p95']):>7} {seconds(model_stats['p99']):>7} "
+              f"{seconds(model_stats['max']):>7} {model_stats.get('hedges', 0):>7} "
+              f"{model_stats.get('hedges_won', 0):>5} {model_stats.get('timeouts', 0):>9}")
+
+    print()
+
+
+def display_early_abort(stats: Dict[str, dict]):
+    """Print per-model counts of streamed responses closed early and the estimated savings"""
+    if not stats:
+        return
+    print(f"\n{Style.BRIGHT}{
+          Fore.CYAN}=== Early Abort ==={Style.RESET_ALL}")
+    print(f"{'Model':<30} {'Streamed':>9} {'Stopped':>8} {'Tokens saved':>13} {'Seconds saved':>14}")
+    print(f"{Fore.YELLOW}{'─' * 78}{Style.RESET_ALL}")
+    for model, model_stats in stats.items():
+        print(f"{model:<30} {model_stats['streamed']:>9} {model_stats['truncated']:>8} "
+              f"{model_stats['tokens_saved']:>13} {model_stats['seconds_saved']:>14.1f}")
+
+    print()
+
+
+def display_sequential(stats: Dict[str, dict]):
+    """Print per-model refusal rate intervals reached by sequential testing and the calls saved"""
+    if not stats:
+        return
+    print(f"\n{Style.BRIGHT}{
+          Fore.CYAN}=== Sequential Testing ==={Style.RESET_ALL}")
+    print(f"{'Model':<30} {'Calls':>6} {'Refused':>8} {'Rate':>6} {'Interval':>15} {'Saved':>6}  Stopped")
+    print(f"{Fore.YELLOW}{'─' * 93}{Style.RESET_ALL}")
+    for model, model_stats in stats.items():
+        rate = f"{model_stats['rate']:.0%}" if model_stats['rate'] is not None else "-"
+        interval = f"{model_stats['low']:.0%} - {model_stats['high']:.0%}"
+        print(f"{model:<30} {model_stats['calls']:>6} {model_stats['refused']:>8} {rate:>6} "
+              f"{interval:>15} {model_stats['saved']:>6}  {model_stats['reason']}")
+
+    print()
+
+
+def display_stats(stats: List[dict]):
+    """Print aggregate pass-rate rows returned by TestsDB.get_result_stats"""
+    by_day = any('day' in row for row in stats)
+    print(f"\n{Style.BRIGHT}{
+          Fore.CYAN}=== Result Statistics ==={Style.RESET_ALL}")
+    print(f"{'Test':<8} {'Defender':<26} {'Technique':<10} {'Day' if by_day else '':<10} "
+          f"{'Total':>7} {'Errors':>7} {'Refused':>8} {'Held':>7} {'Held %':>7}")
+    print(f"{Fore.YELLOW}{'─' * 99}{Style.RESET_ALL}")
+
+    for row in stats:
+        rate = f"{100 * row['held_rate']:.1f}" if row['held_rate'] is not None else "-"
+        print(f"{row['test_name']:<8} {row['defender_model']:<26} {row['technique']:<10} {row.get('day', ''):<10} "
+              f"{row['total']:>7} {row['errors']:>7} {row['refused']:>8} {row['held']:>7} {rate:>7}")
+
+    if not stats:
+        print(f"{Fore.YELLOW}No results recorded yet{Style.RESET_ALL}")
+    print()
@@ -0,0 +1,150 @@
+import os
+from typing import Dict, Iterable, List, Tuple
+from .db_manager import DATA_TABLES, TestsDB
+
+# Low-cardinality columns stored as dictionary-encoded strings
+DICTIONARY_COLUMNS = {"test_name", "defender_model",
+                      "offender_model", "technique"}
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Codecs each format can write; Arrow IPC only supports lz4 and zstd
+COMPRESSIONS = {
+    "parquet": ("zstd", "lz4", "snappy", "none"),
+    "arrow": ("zstd", "lz4", "none"),
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ImportError(
+            "Exporting requires pyarrow. Install it with: pip install pyarrow")
+
+
+def _arrow_schema(pa, columns: List[Tuple[str, str]]):
+    """Map SQLite declared column types onto an Arrow schema"""
+    fields = []
+    for name, declared_type in columns:
+        declared_type = declared_type.upper()
+        if name in DICTIONARY_COLUMNS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif declared_type == "INTEGER":
+            arrow_type = pa.int64()
+        elif declared_type == "BOOLEAN":
+            arrow_type = pa.bool_()
+        elif declared_type in ("REAL", "FLOAT", "DOUBLE"):
+            arrow_type = pa.float64()
+        elif declared_type in ("TIMESTAMP", "DATETIME"):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batch(pa, schema, rows: List[tuple]):
+    """Build a record batch column by column from a chunk of SQLite rows"""
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        elif pa.types.is_timestamp(field.type):
+            arrays.append(pa.array(values, pa.string()).cast(
+                field.type, safe=False))
+        elif pa.types.is_boolean(field.type):
+            arrays.append(pa.array(
+                [None if value is None else bool(value) for value in values], field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Writer:
+    """Uniform write/close interface over Parquet and Arrow IPC writers"""
+
+    def __init__(self, pa, path: str, schema, fmt: str, compression: str):
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(
+                path, schema, compression=compression, use_dictionary=sorted(
+                    DICTIONARY_COLUMNS & set(schema.names)))
+        else:
+            options = pa.ipc.IpcWriteOptions(
+                compression=None if compression == "none" else compression)
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema, options=options)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
+
+
+def export_table(db: TestsDB, table_name: str, output_dir: str, fmt: str = "parquet",
+                 compression: str = "zstd", chunk_size: int = 10000,
+                 incremental: bool = True) -> int:
+    """Stream one table to a new file under output_dir and return the row count.
+
+    Only rows above the stored watermark are exported when incremental is
+    set, so repeated exports append new part files rather than rewriting.
+    """
+    pa = _import_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression not in COMPRESSIONS[fmt]:
+        raise ValueError(f"{fmt} exports support {', '.join(COMPRESSIONS[fmt])} compression, not {compression}")
+
+    table_dir = os.path.join(output_dir, table_name)
+    os.makedirs(table_dir, exist_ok=True)
+    destination = f"{os.path.abspath(output_dir)}:{fmt}"
+    after_id = db.get_export_watermark(
+        destination, table_name) if incremental else 0
+
+    schema = _arrow_schema(pa, db.get_table_columns(table_name))
+    temp_path = os.path.join(table_dir, f".{table_name}.partial")
+    writer = None
+    exported = 0
+    last_id = after_id
+    try:
+        for columns, rows in db.iter_table_chunks(table_name, after_id, chunk_size):
+            if writer is None:
+                writer = _Writer(pa, temp_path, schema, fmt, compression)
+            writer.write(_record_batch(pa, schema, rows))
+            exported += len(rows)
+            last_id = rows[-1][columns.index("id")]
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        # Leave no half-written part behind for the next export to trip over
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if writer is not None:
+        writer.close()
+
+    if exported:
+        final_path = os.path.join(
+            table_dir, f"{table_name}-{after_id + 1:010d}-{last_id:010d}{FORMATS[fmt]}")
+        os.replace(temp_path, final_path)
+        db.set_export_watermark(destination, table_name, last_id)
+    return exported
+
+
+def export_tables(db: TestsDB, output_dir: str, tables: Iterable[str] = DATA_TABLES,
+                  fmt: str = "parquet", compression: str = "zstd", chunk_size: int = 10000,
+                  incremental: bool = True) -> Dict[str, int]:
+    """Export several tables and return the number of new rows per table"""
+    counts = {}
+    for table_name in tables:
+        print(f"📦 Exporting {table_name}...")
+        counts[table_name] = export_table(
+            db, table_name, output_dir, fmt, compression, chunk_size, incremental)
+        print(f"✅ Exported {counts[table_name]} new rows from {table_name}")
+    return counts
@@ -0,0 +1,168 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+_active_tracker = contextvars.ContextVar("active_tracker", default=None)
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per model"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._latencies: Dict[str, deque] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(model, deque(
+                maxlen=self.window)).append(seconds)
+
+    def count(self, model: str, event: str):
+        """Count a per-model event such as a call, hedge, hedge win or timeout"""
+        with self._lock:
+            counts = self.counts.setdefault(model, {})
+            counts[event] = counts.get(event, 0) + 1
+
+    @contextmanager
+    def activate(self):
+        """Also record every hedged call made in this context, e.g. to report one run"""
+        token = _active_tracker.set(self)
+        try:
+            yield self
+        finally:
+            _active_tracker.reset(token)
+
+    def samples(self, model: str) -> int:
+        return len(self._latencies.get(model, ()))
+
+    def percentile(self, model: str, percent: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies.get(model, ()))
+        if not latencies:
+            return None
+        # Nearest-rank percentile
+        rank = max(1, round(percent / 100 * len(latencies)))
+        return latencies[min(rank, len(latencies)) - 1]
+
+    def stats(self) -> Dict[str, dict]:
+        """Latency percentiles and hedging counts per model"""
+        return {
+            model: {
+                "samples": self.samples(model),
+                "p50": self.percentile(model, 50),
+                "p95": self.percentile(model, 95),
+                "p99": self.percentile(model, 99),
+                "max": self.percentile(model, 100),
+                **self.counts.get(model, {}),
+            }
+            for model in sorted(set(self._latencies) | set(self.counts))
+        }
+
+
+class HedgedRequester:
+    """Runs requests with a deadline, hedging the slow ones.
+
+    A request still running after the rolling hedge_percentile latency of
+    its model gets one duplicate, and whichever answer arrives first is
+    returned. At most hedge_budget extra requests per request are sent
+    (0.05 means 5%), and no request is hedged before min_samples
+    latencies of its model are known. Requests still running at the
+    deadline raise TimeoutError. Latencies and counts go to tracker, which
+    drives the hedging, and to the tracker activated in the calling
+    context, if any. send receives the time left so the
+    losing copy is abandoned at the deadline too, and whether it is the
+    hedge copy so it can take its own rate limit share.
+    """
+
+    def __init__(self, timeout: float = None, hedge_budget: float = 0.05,
+                 hedge_percentile: float = 95, min_samples: int = 20,
+                 tracker: LatencyTracker = None, max_workers: int = 64):
+        self.timeout = timeout
+        self.hedge_budget = hedge_budget
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.tracker = tracker or LatencyTracker()
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="request")
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds after which a request to model is hedged, None if it is not"""
+        if self.hedge_budget <= 0 or self.tracker.samples(model) < self.min_samples:
+            return None
+        return self.tracker.percentile(model, self.hedge_percentile)
+
+    def _trackers(self):
+        active = _active_tracker.get()
+        return (self.tracker,) if active in (None, self.tracker) else (self.tracker, active)
+
+    def _record(self, model: str, seconds: float):
+        for tracker in self._trackers():
+            tracker.record(model, seconds)
+
+    def _count(self, model: str, event: str):
+        for tracker in self._trackers():
+            tracker.count(model, event)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.hedge_budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _submit(self, model: str, send: Callable[[Optional[float], bool], T],
+                deadline: Optional[float], hedge: bool = False):
+        def timed():
+            start = time.monotonic()
+            result = send(max(0.0, deadline - start)
+                          if deadline else None, hedge)
+            self._record(model, time.monotonic() - start)
+            return result
+        # Each copy runs in its own context so run budgets and stages still apply
+        return self._executor.submit(contextvars.copy_context().run, timed)
+
+    def call(self, model: str, send: Callable[[Optional[float], bool], T]) -> T:
+        """Run send(timeout, hedge) for model, hedged and bounded by the deadline"""
+        with self._lock:
+            self.calls += 1
+        self._count(model, "calls")
+        start = time.monotonic()
+        deadline = start + self.timeout if self.timeout else None
+        hedge_at = self.hedge_delay(model)
+        hedge_at = start + hedge_at if hedge_at is not None else None
+        primary = self._submit(model, send, deadline)
+        pending = {primary}
+        error = None
+        while pending:
+            wake = min((moment for moment in (deadline, hedge_at) if moment), default=None)
+            done, pending = wait(pending, return_when=FIRST_COMPLETED,
+                                 timeout=max(0.0, wake - time.monotonic()) if wake else None)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count(model, "hedges_won")
+                    return future.result()
+                error = future.exception()
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                self._count(model, "timeouts")
+                raise TimeoutError(
+                    f"Request to {model} timed out after {self.timeout:g}s")
+            if hedge_at and now >= hedge_at and pending:
+                hedge_at = None
+                if self._take_hedge():
+                    self._count(model, "hedges")
+                    pending.add(self._submit(
+                        model, send, deadline, hedge=True))
+        raise error
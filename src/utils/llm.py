@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
+from .budget import active_budget
+from .rate_limiter import estimate_prompt_tokens, estimate_tokens, get_rate_limiter
+from .tracing import SPAN_KIND_CLIENT, annotate, record_span, span
+
+if TYPE_CHECKING:
+    from .hedging import HedgedRequester
+
+T = TypeVar("T")
+
+# OpenAI-compatible endpoint used unless CLOD_BASE_URL points elsewhere
+DEFAULT_BASE_URL = "https://api.clod.io/v1"
+
+_client = None
+_client_lock = threading.Lock()
+
+# Optional per-model caps on in-flight requests across every thread of the process
+_model_slots: Dict[str, threading.BoundedSemaphore] = {}
+_default_slots = None
+
+# Successful calls and seconds spent in them per model, for run forecasts
+_call_stats: Dict[str, List[float]] = {}
+_call_stats_lock = threading.Lock()
+
+
+def build_client(base_url: str = None):
+    """Build a new API client for base_url, or CLOD_BASE_URL, or the default endpoint"""
+    import openai
+    return openai.Client(
+        api_key=os.getenv("CLOD_API_KEY"),
+        base_url=base_url or os.getenv("CLOD_BASE_URL") or DEFAULT_BASE_URL,
+    )
+
+
+def get_client():
+    """Return the process-wide API client, importing openai and building it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_client()
+    return _client
+
+
+def set_concurrency_limits(limits: Dict[str, int], default: int = None):
+    """Cap concurrent requests per model for the whole process; default applies to other models"""
+    global _default_slots
+    with _client_lock:
+        _model_slots.clear()
+        _model_slots.update({model: threading.BoundedSemaphore(limit)
+                             for model, limit in limits.items()})
+        _default_slots = default
+
+
+def _concurrency_slot(model: str) -> Optional[threading.BoundedSemaphore]:
+    if model not in _model_slots and _default_slots:
+        with _client_lock:
+            if model not in _model_slots:
+                _model_slots[model] = threading.BoundedSemaphore(
+                    _default_slots)
+    return _model_slots.get(model)
+
+
+def _throttled(client, requester: "HedgedRequester", kwargs: dict,
+               create: Callable[[dict], T], usage: Callable[[T, int], Tuple[int, int]]) -> T:
+    """Run create(extra_kwargs) under the rate limiter, concurrency cap and run budget.
+
+    usage(result, estimated) returns the (prompt, completion) tokens the
+    call actually used, or None when they are unknown and the estimate is charged.
+    """
+    import openai
+    with span("llm", SPAN_KIND_CLIENT, model=kwargs["model"]) as call_span:
+        limiter = get_rate_limiter(client.api_key, kwargs["model"])
+        estimated = estimate_tokens(kwargs["messages"], kwargs.get("max_tokens"))
+        waiting = time.time_ns()
+        limiter.acquire(estimated)
+        record_span("rate_limit_wait", waiting, model=kwargs["model"])
+        slot = _concurrency_slot(kwargs["model"])
+
+        def send(timeout, hedge):
+            # Each copy holds its own concurrency slot until its request returns;
+            # the primary's slot is taken before the call and released here
+            if hedge:
+                # Waiting for a slot would mean waiting for the primary, so a
+                # hedge is only sent when one is free
+                if slot is not None and not slot.acquire(blocking=False):
+                    raise RuntimeError(
+                        f"No free concurrency slot to hedge {kwargs['model']}")
+                # The duplicate is a real request: it takes quota and is charged
+                limiter.acquire(estimated)
+                budget = active_budget()
+                if budget is not None:
+                    budget.charge(kwargs["model"], estimated, 0)
+                if call_span is not None:
+                    # send runs on a requester thread, away from the open span
+                    call_span.attributes["hedged"] = True
+            try:
+                return create({"timeout": timeout} if timeout is not None else {})
+            finally:
+                if slot is not None:
+                    slot.release()
+
+        try:
+            waiting = time.time_ns()
+            if slot is not None:
+                slot.acquire()
+            record_span("concurrency_wait", waiting, model=kwargs["model"])
+            start = time.monotonic()
+            if requester is None:
+                result = send(None, False)
+            else:
+                result = requester.call(kwargs["model"], send)
+            seconds = time.monotonic() - start
+        except openai.RateLimitError:
+            # Another client shares the quota; back off everyone on this key
+            limiter.drain()
+            raise
+        with _call_stats_lock:
+            stats = _call_stats.setdefault(kwargs["model"], [0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+        tokens = usage(result, estimated)
+        if tokens is not None:
+            limiter.settle(estimated, sum(tokens))
+            annotate(prompt_tokens=tokens[0], completion_tokens=tokens[1])
+        budget = active_budget()
+        if budget is not None:
+            budget.charge(kwargs["model"], *(tokens or (estimated, 0)))
+        return result
+
+
+def take_call_stats() -> Dict[str, Tuple[int, float]]:
+    """(calls, seconds) per model since the last call, excluding rate limiter waits"""
+    with _call_stats_lock:
+        stats = {model: (int(calls), seconds)
+                 for model, (calls, seconds) in _call_stats.items()}
+        _call_stats.clear()
+    return stats
+
+
+def _response_usage(response, estimated: int) -> Optional[Tuple[int, int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None or not usage.total_tokens:
+        return None
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+def chat_completion(client, requester: "HedgedRequester" = None, **kwargs):
+    """client.chat.completions.create, throttled by the shared per-model rate limiter.
+
+    With a requester, the call is bounded by its deadline and hedged when
+    slow; time spent waiting for the rate limiter does not count.
+    """
+    return _throttled(
+        client, requester, kwargs,
+        lambda extra: client.chat.completions.create(**kwargs, **extra),
+        _response_usage)
+
+
+class StreamedCompletion(NamedTuple):
+    """Text read from a streamed completion, and whether reading stopped early"""
+    content: str
+    truncated: bool
+    completion_tokens: int
+    seconds: float
+    first_token_seconds: float
+
+
+def stream_chat_completion(client, stop: Callable[[str], bool],
+                           requester: "HedgedRequester" = None, **kwargs) -> StreamedCompletion:
+    """Stream a chat completion and close it as soon as stop(text so far) is true.
+
+    Throttled, deadlined and hedged like chat_completion. Each content
+    chunk counts as one completion token, since a closed stream never
+    reports usage.
+    """
+    def create(extra):
+        start = time.monotonic()
+        stream = client.chat.completions.create(**kwargs, **extra, stream=True)
+        parts, chunks, truncated, first_token = [], 0, False, None
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+                    parts.append(choice.delta.content)
+                    chunks += 1
+                    if choice.finish_reason is None and stop("".join(parts)):
+                        truncated = True
+                        break
+        finally:
+            # Closing the connection stops the defender generating the rest
+            stream.close()
+        seconds = time.monotonic() - start
+        return StreamedCompletion("".join(parts), truncated, chunks, seconds,
+                                  seconds if first_token is None else first_token)
+
+    def usage(streamed, estimated):
+        return estimate_prompt_tokens(kwargs["messages"]), streamed.completion_tokens
+
+    return _throttled(client, requester, kwargs, create, usage)
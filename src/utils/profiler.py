@@ -0,0 +1,265 @@
+import html
+import os
+import sys
+import threading
+import time
+import zlib
+from contextlib import ContextDecorator
+from typing import Dict, List, Tuple
+from . import tracing
+
+PROFILE_MODES = ("sampling", "cprofile")
+
+# Profiler collecting stage times and samples, None when profiling is off
+_active = None
+
+# Per thread, the profiler each open stage was entered under
+_entered = threading.local()
+
+
+class _Stage(ContextDecorator):
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        profiler = _active
+        if not hasattr(_entered, "stack"):
+            _entered.stack = []
+        _entered.stack.append(profiler)
+        if profiler is not None:
+            profiler._push(self.name)
+        tracing.start_span(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        tracing.end_span(exc)
+        profiler = _entered.stack.pop()
+        if profiler is not None:
+            profiler._pop()
+        return False
+
+
+def stage(name: str) -> _Stage:
+    """Attribute the time spent in a block or function to a pipeline stage.
+
+    Works as a context manager and as a decorator. Nested stages are
+    exclusive: time inside an inner stage is not counted for the outer one.
+    While a tracer is active, each stage is also traced as a span. Costs
+    two global lookups when neither is active.
+    """
+    return _Stage(name)
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """Wall/CPU time per stage, a sampled flame graph and a hot-function report.
+
+    A background thread samples the stacks of every thread each interval
+    seconds, rooted at the stage the thread was in, so network waits show
+    up next to CPU work. In "cprofile" mode the hot-function report comes
+    from cProfile on the thread that started profiling instead of from
+    the samples. Use as a context manager around any library call; on exit
+    the report is written to <prefix>.svg, <prefix>.folded and <prefix>.txt
+    (and <prefix>.prof in cprofile mode).
+    """
+
+    def __init__(self, prefix: str, mode: str = "sampling", interval: float = 0.005, top: int = 25):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.prefix = prefix
+        self.mode = mode
+        self.interval = interval
+        self.top = top
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.samples: Dict[Tuple[str, ...], int] = {}
+        self._stacks: Dict[int, List[list]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._cprofile = None
+
+    def _charge(self, segment: list, wall: float, cpu: float):
+        name, wall_start, cpu_start = segment
+        with self._lock:
+            self.wall[name] = self.wall.get(name, 0.0) + wall - wall_start
+            self.cpu[name] = self.cpu.get(name, 0.0) + cpu - cpu_start
+
+    def _push(self, name: str):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        if stack:
+            self._charge(stack[-1], wall, cpu)
+        stack.append([name, wall, cpu])
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _pop(self):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        stack = self._stacks[threading.get_ident()]
+        self._charge(stack.pop(), wall, cpu)
+        if stack:
+            stack[-1][1], stack[-1][2] = wall, cpu
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack = self._stacks.get(ident)
+                names.append(stack[-1][0] if stack else "unstaged")
+                key = tuple(reversed(names))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def start(self):
+        global _active
+        self._started = (time.perf_counter(), time.process_time())
+        _active = self
+        self._sampler = threading.Thread(
+            target=self._sample, name="profiler", daemon=True)
+        self._sampler.start()
+        if self.mode == "cprofile":
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def stop(self):
+        global _active
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self._stop.set()
+        self._sampler.join()
+        _active = None
+        self.total_wall = time.perf_counter() - self._started[0]
+        self.total_cpu = time.process_time() - self._started[1]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.write()
+        return False
+
+    def stage_table(self) -> str:
+        lines = [f"{'stage':<16} {'calls':>7} {'wall s':>9} {'cpu s':>9} {'cpu %':>6}"]
+        for name in sorted(self.wall, key=self.wall.get, reverse=True):
+            wall, cpu = self.wall[name], self.cpu[name]
+            lines.append(f"{name:<16} {self.calls.get(name, 0):>7} {wall:>9.3f} {cpu:>9.3f} "
+                         f"{100 * cpu / wall if wall else 0:>5.0f}%")
+        lines.append(f"{'total (process)':<16} {'':>7} {self.total_wall:>9.3f} {self.total_cpu:>9.3f}")
+        return "\n".join(lines)
+
+    def hot_functions(self) -> str:
+        """Top functions by samples spent in them (self) and under them (total)"""
+        if self._cprofile is not None:
+            import io
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(self._cprofile, stream=out).sort_stats(
+                "tottime").print_stats(self.top)
+            return out.getvalue()
+        own: Dict[str, int] = {}
+        total: Dict[str, int] = {}
+        count = sum(self.samples.values()) or 1
+        for stack, samples in self.samples.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + samples
+            for name in set(stack[1:]):
+                total[name] = total.get(name, 0) + samples
+        lines = [f"{'self %':>7} {'total %':>7}  function ({count} samples, every {self.interval * 1000:.0f} ms)"]
+        for name in sorted(own, key=own.get, reverse=True)[:self.top]:
+            lines.append(f"{100 * own[name] / count:>6.1f}% {100 * total.get(name, 0) / count:>6.1f}%  {name}")
+        return "\n".join(lines)
+
+    def write(self):
+        directory = os.path.dirname(self.prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.prefix}.folded", "w", encoding="utf-8") as f:
+            for stack, samples in sorted(self.samples.items()):
+                f.write(f"{';'.join(stack)} {samples}\n")
+        with open(f"{self.prefix}.svg", "w", encoding="utf-8") as f:
+            f.write(flame_graph_svg(self.samples))
+        with open(f"{self.prefix}.txt", "w", encoding="utf-8") as f:
+            f.write(f"Stages\n\n{self.stage_table()}\n\nHot functions\n\n{self.hot_functions()}\n")
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(f"{self.prefix}.prof")
+        print(f"\n⏱️ Profile by stage:\n{self.stage_table()}")
+        print(f"🔥 Flame graph and hot functions written to {
+              self.prefix}.svg and {self.prefix}.txt")
+
+
+def flame_graph_svg(samples: Dict[Tuple[str, ...], int], width: int = 1200,
+                    frame_height: int = 16, min_width: float = 0.5) -> str:
+    """Render folded stacks as a self-contained SVG flame graph"""
+    tree = {"children": {}, "count": 0}
+    for stack, count in samples.items():
+        node = tree
+        node["count"] += count
+        for name in stack:
+            node = node["children"].setdefault(
+                name, {"children": {}, "count": 0})
+            node["count"] += count
+
+    def depth(node) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    total = tree["count"] or 1
+    levels = depth(tree) - 1
+    height = (levels + 2) * frame_height
+    rects = []
+
+    def draw(node, name, x, level):
+        frame_width = node["count"] / total * width
+        if frame_width < min_width:
+            return
+        y = height - (level + 2) * frame_height
+        # Stable warm colour per function name
+        hue = zlib.crc32(name.encode()) % 60
+        label = name if frame_width > 7 * len(name) else name[:max(0, int(frame_width / 7) - 2)] + ".."
+        rects.append(
+            f'<g><title>{html.escape(name)} ({node["count"]} samples, {100 * node["count"] / total:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{frame_width:.1f}" height="{frame_height - 1}" '
+            f'fill="hsl({hue},85%,60%)"/>'
+            + (f'<text x="{x + 3:.1f}" y="{y + frame_height - 4}">{html.escape(label)}</text>'
+               if frame_width > 21 else "") + '</g>')
+        for child_name, child in sorted(node["children"].items()):
+            draw(child, child_name, x, level + 1)
+            x += child["count"] / total * width
+
+    x = 0.0
+    for name, child in sorted(tree["children"].items()):
+        draw(child, name, x, 0)
+        x += child["count"] / total * width
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="monospace" font-size="11">\n'
+            f'<text x="4" y="12">Flame graph ({tree["count"]} samples)</text>\n'
+            + "\n".join(rects) + "\n</svg>\n")
+
+
+def add_profile_arguments(parser):
+    """Add --profile, --profile-mode and --profile-top to a script's parser"""
+    parser.add_argument('--profile', type=str, default=None, metavar='PREFIX',
+                        help='Profile the run and write PREFIX.svg (flame graph), PREFIX.txt (stage times and hot functions) and PREFIX.folded')
+    parser.add_argument('--profile-mode', type=str, default='sampling', choices=PROFILE_MODES,
+                        help='Where the hot-function report comes from (default: sampling)')
+    parser.add_argument('--profile-top', type=int, default=25,
+                        help='Functions listed in the hot-function report (default: 25)')
+
+
+def profile_from_args(args):
+    """Profiler for a script's --profile options, or a no-op context without them"""
+    from contextlib import nullcontext
+    if not args.profile:
+        return nullcontext()
+    return Profiler(args.profile, mode=args.profile_mode, top=args.profile_top)
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, List, Tuple
+from config.models import DEFAULT_COMPLETION_TOKENS, DEFAULT_MODEL_LIMITS, MODEL_LIMITS
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are only shared between threads
+    fcntl = None
+
+# Bucket state on disk: available requests, available tokens, last refill time
+_STATE = struct.Struct("<ddd")
+
+
+def estimate_prompt_tokens(messages: List[dict]) -> int:
+    """Rough prompt token count: ~4 characters per token plus a few per message"""
+    prompt_chars = sum(len(message.get("content") or "")
+                       for message in messages)
+    return prompt_chars // 4 + 4 * len(messages)
+
+
+def estimate_tokens(messages: List[dict], max_tokens: int = None) -> int:
+    """Rough token count for a request: the prompt plus the completion"""
+    return estimate_prompt_tokens(messages) + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class TokenBucketLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model and API key.
+
+    The bucket state lives in a small file guarded by flock, so every process
+    on the machine using the same key draws from the same quota.
+    """
+
+    def __init__(self, path: str, rpm: int, tpm: int):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _update(self, change):
+        """Run change(requests, tokens) -> (requests, tokens, result) under the file lock"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._lock, os.fdopen(fd, "r+b") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                data = f.read(_STATE.size)
+                now = time.time()
+                if len(data) == _STATE.size:
+                    requests, tokens, updated_at = _STATE.unpack(data)
+                    elapsed = max(0.0, now - updated_at)
+                    requests = min(self.rpm, requests + elapsed * self.rpm / 60)
+                    tokens = min(self.tpm, tokens + elapsed * self.tpm / 60)
+                else:
+                    requests, tokens = float(self.rpm), float(self.tpm)
+                requests, tokens, result = change(requests, tokens)
+                f.seek(0)
+                f.truncate()
+                f.write(_STATE.pack(requests, tokens, now))
+                f.flush()
+                return result
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, tokens: int):
+        """Block until one request and the estimated tokens fit in the quota"""
+        # A request larger than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.tpm)
+
+        def take(available_requests, available_tokens):
+            if available_requests >= 1 and available_tokens >= tokens:
+                return available_requests - 1, available_tokens - tokens, 0.0
+            wait = max((1 - available_requests) * 60 / self.rpm,
+                       (tokens - available_tokens) * 60 / self.tpm)
+            return available_requests, available_tokens, wait
+
+        while True:
+            wait = self._update(take)
+            if wait <= 0:
+                return
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage of a request is known"""
+        self._update(lambda requests, tokens: (
+            requests, min(self.tpm, tokens + estimated - actual), None))
+
+    def drain(self):
+        """Empty both buckets after the provider reports a rate limit anyway"""
+        self._update(lambda requests, tokens: (
+            min(requests, 0.0), min(tokens, 0.0), None))
+
+
+_limiters: Dict[Tuple[str, str], TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: str, model: str) -> TokenBucketLimiter:
+    """Return the process-wide limiter for a model and API key"""
+    key_hash = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+    with _limiters_lock:
+        if (key_hash, model) not in _limiters:
+            directory = os.getenv("RATE_LIMIT_DIR") or os.path.join(
+                tempfile.gettempdir(), "llm-guard-rate-limits")
+            os.makedirs(directory, exist_ok=True)
+            limits = MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMITS)
+            safe_model = re.sub(r"[^A-Za-z0-9._-]", "_", model)
+            _limiters[(key_hash, model)] = TokenBucketLimiter(
+                os.path.join(directory, f"{key_hash}-{safe_model}.bucket"),
+                limits["rpm"], limits["tpm"])
+        return _limiters[(key_hash, model)]
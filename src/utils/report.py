@@ -0,0 +1,82 @@
+import html
+import json
+import os
+from ..models.result import Result
+from .verdict import guard_held, is_error
+
+
+def _verdict(result: Result) -> str:
+    if is_error(result.llm_response):
+        return "error"
+    return "held" if guard_held(result.should_pass, result.llm_response) else "failed"
+
+
+class JsonlReport:
+    """One JSON object per result, appended as results complete"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, result: Result):
+        self._file.write(json.dumps(
+            {**result.model_dump(), "verdict": _verdict(result)}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class HtmlReport:
+    """Self-contained HTML table, streamed row by row and closed at the end"""
+
+    _HEADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Test Results</title>
+<style>
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #ccc; padding: 6px; vertical-align: top; text-align: left; }
+td.text { white-space: pre-wrap; max-width: 40em; }
+.held { background: #e6f4ea; } .failed { background: #fce8e6; } .error { background: #fef7e0; }
+</style></head><body>
+<h1>Test Results</h1>
+<table>
+<tr><th>#</th><th>Defender</th><th>Should pass</th><th>Verdict</th><th>Prompt</th><th>Response</th></tr>
+"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.verdicts = {}
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(self._HEADER)
+
+    def write(self, result: Result):
+        self.count += 1
+        verdict = _verdict(result)
+        self.verdicts[verdict] = self.verdicts.get(verdict, 0) + 1
+        self._file.write(
+            f'<tr class="{verdict}"><td>{self.count}</td>'
+            f'<td>{html.escape(result.defender_model or "")}</td>'
+            f'<td>{"yes" if result.should_pass else "no"}</td><td>{verdict}</td>'
+            f'<td class="text">{html.escape(result.prompt)}</td>'
+            f'<td class="text">{html.escape(result.llm_response)}</td></tr>\n')
+        self._file.flush()
+
+    def close(self):
+        totals = ", ".join(f"{verdict}: {count}" for verdict,
+                           count in sorted(self.verdicts.items()))
+        self._file.write(
+            f"</table>\n<p>{self.count} results ({totals})</p>\n</body></html>\n")
+        self._file.close()
+
+
+def open_report(path: str):
+    """Open a streaming report writer chosen by the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".jsonl":
+        return JsonlReport(path)
+    if extension in (".html", ".htm"):
+        return HtmlReport(path)
+    raise ValueError(
+        f"Unsupported report format {extension or path!r}, use .jsonl or .html")
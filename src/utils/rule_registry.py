@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+# Built-in rulesets; RULES_PATH adds directories searched before this one
+BUILTIN_RULESETS_DIR = os.path.join(os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "config", "rulesets")
+
+DEFAULT_RULESET = "llama_guard"
+
+RULESET_EXTENSIONS = (".json", ".toml")
+
+
+def default_ruleset() -> str:
+    """Ruleset used when a command names none, overridable with RULESET"""
+    return os.getenv("RULESET") or DEFAULT_RULESET
+
+
+def _load_file(path: str) -> dict:
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RuleRegistry:
+    """Rulesets read from data files, indexed by (ruleset, test_name).
+
+    Each file in a rulesets directory holds one ruleset named after the file:
+    {"description": "...", "rules": [{"test_name": "S1", "rule": "..."}, ...]}.
+    Construction only lists the directories; a ruleset file is parsed the
+    first time one of its rules is requested and then kept in memory.
+    """
+
+    def __init__(self, paths: List[str] = None):
+        if paths is None:
+            extra = [path for path in os.getenv(
+                "RULES_PATH", "").split(os.pathsep) if path]
+            paths = extra + [BUILTIN_RULESETS_DIR]
+        self._files: Dict[str, str] = {}
+        for directory in paths:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                name, extension = os.path.splitext(filename)
+                # Earlier directories take precedence, so packs can override built-ins
+                if extension in RULESET_EXTENSIONS and name not in self._files:
+                    self._files[name] = os.path.join(directory, filename)
+        self._rules: Dict[str, List[dict]] = {}
+        self._index: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def rulesets(self) -> List[str]:
+        return sorted(self._files)
+
+    def _load(self, ruleset: str):
+        if ruleset in self._rules:
+            return
+        if ruleset not in self._files:
+            raise ValueError(f"Unknown ruleset: {ruleset} (available: {
+                             ', '.join(self.rulesets())})")
+        with self._lock:
+            if ruleset in self._rules:
+                return
+            rules = _load_file(self._files[ruleset]).get("rules", [])
+            index = {}
+            for rule in rules:
+                if rule["test_name"] in index:
+                    raise ValueError(f"Duplicate test_name {
+                                     rule['test_name']} in ruleset {ruleset}")
+                index[rule["test_name"]] = rule
+            self._index[ruleset] = index
+            self._rules[ruleset] = rules
+
+    def rules(self, ruleset: str) -> List[dict]:
+        """All rules of a ruleset in file order"""
+        self._load(ruleset)
+        return self._rules[ruleset]
+
+    def get(self, ruleset: str, test_name: str) -> dict:
+        self._load(ruleset)
+        if test_name not in self._index[ruleset]:
+            raise ValueError(f"Unknown rule {test_name} in ruleset {ruleset}")
+        return self._index[ruleset][test_name]
+
+    def rule_id(self, ref: str, ruleset: Optional[str] = None) -> str:
+        """Stable "ruleset/test_name" ID for "ruleset/test_name", "test_name" or a legacy 1-based position"""
+        ref = str(ref)
+        if "/" in ref:
+            ruleset, ref = ref.split("/", 1)
+        ruleset = ruleset or default_ruleset()
+        self._load(ruleset)
+        if ref in self._index[ruleset] or not ref.isdigit():
+            return f"{ruleset}/{self.get(ruleset, ref)['test_name']}"
+        rules = self._rules[ruleset]
+        position = int(ref)
+        if position < 1 or position > len(rules):
+            raise ValueError(f"Category number must be between 1 and {
+                             len(rules)}")
+        return f"{ruleset}/{rules[position - 1]['test_name']}"
+
+    def resolve(self, ref: str, ruleset: Optional[str] = None) -> dict:
+        """Look up a rule by any reference rule_id accepts"""
+        ruleset, test_name = self.rule_id(ref, ruleset).split("/", 1)
+        return self.get(ruleset, test_name)
+
+
+_registry = None
+
+
+def get_registry() -> RuleRegistry:
+    """Return the process-wide registry"""
+    global _registry
+    if _registry is None:
+        _registry = RuleRegistry()
+    return _registry
@@ -0,0 +1,63 @@
+import math
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+
+def wilson_interval(successes: int, trials: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion; (0, 1) without trials"""
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = successes / trials
+    center = (rate + z * z / (2 * trials)) / (1 + z * z / trials)
+    half_width = (z / (1 + z * z / trials)) * \
+        math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+class SequentialEstimate:
+    """Running refusal rate of one defender with a stopping rule.
+
+    Testing can stop once the Wilson interval is at most width wide, or,
+    with a threshold, once the interval lies entirely above or below it.
+    Neither rule applies before min_cases outcomes, so a lucky start does
+    not end a run. The interval is recomputed after every outcome, which
+    makes the stopping rule slightly optimistic; a higher confidence
+    compensates.
+    """
+
+    def __init__(self, width: float = 0.1, threshold: float = None,
+                 confidence: float = 0.95, min_cases: int = 5):
+        if not 0 < confidence < 1:
+            raise ValueError("Confidence must be between 0 and 1")
+        self.width = width
+        self.threshold = threshold
+        self.confidence = confidence
+        self.min_cases = min_cases
+        self.trials = 0
+        self.refused = 0
+
+    def update(self, refused: bool):
+        self.trials += 1
+        self.refused += int(refused)
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self.refused / self.trials if self.trials else None
+
+    def interval(self) -> Tuple[float, float]:
+        return wilson_interval(self.refused, self.trials, self.confidence)
+
+    def stop_reason(self) -> Optional[str]:
+        """Why testing can stop now, or None to keep going"""
+        if self.trials < self.min_cases:
+            return None
+        low, high = self.interval()
+        if self.threshold is not None:
+            if low > self.threshold:
+                return "above threshold"
+            if high < self.threshold:
+                return "below threshold"
+        if high - low <= self.width:
+            return "precise"
+        return None
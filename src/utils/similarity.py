@@ -0,0 +1,38 @@
+import re
+from typing import List
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+def tfidf_matrix(texts: List[str]) -> np.ndarray:
+    """L2-normalized TF-IDF rows for texts, with the vocabulary and IDF fitted on texts"""
+    documents = [tokenize(text) for text in texts]
+    vocabulary = {}
+    for tokens in documents:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    counts = np.zeros((len(documents), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, tokens in enumerate(documents):
+        if tokens:
+            np.add.at(counts[row], [vocabulary[token] for token in tokens], 1.0)
+
+    # Smoothed IDF, as in scikit-learn: ln((1 + n) / (1 + df)) + 1
+    document_frequency = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    weights = counts * idf.astype(np.float32)
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1, norms)
+
+
+def cosine_similarities(query: str, texts: List[str]) -> np.ndarray:
+    """Cosine similarity of query to each of texts, computed in one batch"""
+    if not texts:
+        return np.zeros(0, dtype=np.float32)
+    matrix = tfidf_matrix([query, *texts])
+    return matrix[1:] @ matrix[0]
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import zlib
+from typing import Tuple
+
+# Texts shorter than this are stored uncompressed; the codec overhead
+# outweighs the savings on short prompts
+DEFAULT_MIN_COMPRESS_BYTES = 512
+
+CODECS = ("none", "zlib", "zstd")
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd-compressed texts require zstandard. Install it with: pip install zstandard")
+
+
+def text_hash(text: str) -> str:
+    """Content address used as the texts table key"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def default_codec() -> str:
+    """Pick the codec from TEXT_COMPRESSION, preferring zstd when installed"""
+    codec = os.getenv("TEXT_COMPRESSION", "auto").lower()
+    if codec == "auto":
+        try:
+            import zstandard  # noqa: F401
+            return "zstd"
+        except ImportError:
+            return "zlib"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown TEXT_COMPRESSION codec: {codec}")
+    return codec
+
+
+def encode_text(text: str, codec: str = None) -> Tuple[str, bytes]:
+    """Serialize text for storage, returning the codec actually used"""
+    codec = codec or default_codec()
+    data = text.encode("utf-8")
+    min_bytes = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES",
+                              DEFAULT_MIN_COMPRESS_BYTES))
+    if codec == "none" or len(data) < min_bytes:
+        return "none", data
+    if codec == "zstd":
+        return "zstd", _zstd().ZstdCompressor(level=6).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def decode_text(codec: str, body: bytes) -> str:
+    """Inverse of encode_text"""
+    if codec == "zstd":
+        body = _zstd().ZstdDecompressor().decompress(body)
+    elif codec == "zlib":
+        body = zlib.decompress(body)
+    return bytes(body).decode("utf-8")
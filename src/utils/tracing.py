@@ -0,0 +1,433 @@
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Instrumentation scope and default service name written with every span
+SERVICE_NAME = "llm-guard-tester"
+
+# Spans recording time spent waiting for a rate limiter or concurrency slot
+QUEUE_SPANS = ("rate_limit_wait", "concurrency_wait")
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+# Tracer receiving finished spans, None when tracing is off
+_active = None
+
+# Per thread, the spans opened and not yet ended (None while tracing is off)
+_open = threading.local()
+
+_ids = random.Random()
+
+
+def _span_id() -> str:
+    return f"{_ids.getrandbits(64):016x}"
+
+
+class Span:
+    """One timed operation, written to the trace file when it ends"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "kind", "start_ns", "end_ns",
+                 "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional['Span'], kind: int, attributes: dict,
+                 start_ns: int = None):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else f"{_ids.getrandbits(128):032x}"
+        self.span_id = _span_id()
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+
+class _SpanContext:
+    def __init__(self, name: str, kind: int, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self) -> Optional[Span]:
+        self.span = start_span(self.name, self.kind, **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        end_span(exc)
+        return False
+
+
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> _SpanContext:
+    """Trace a block as a span, a child of the span open on this thread.
+
+    Yields the span, or None when no tracer is active, which costs one
+    global lookup.
+    """
+    return _SpanContext(name, kind, attributes)
+
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Optional[Span]:
+    """Open a span on this thread; every start_span must be paired with end_span"""
+    if not hasattr(_open, "stack"):
+        _open.stack = []
+    if _active is None:
+        _open.stack.append(None)
+        return None
+    parent = next((item for item in reversed(_open.stack) if item is not None), None)
+    opened = Span(name, parent, kind, attributes)
+    _open.stack.append(opened)
+    return opened
+
+
+def end_span(error: BaseException = None):
+    """End the span most recently opened on this thread, marking it failed with error"""
+    opened = _open.stack.pop()
+    if opened is not None:
+        opened.end_ns = time.time_ns()
+        if error is not None:
+            opened.error = f"{type(error).__name__}: {error}"
+        tracer = _active
+        if tracer is not None:
+            tracer.record(opened)
+
+
+def current_span() -> Optional[Span]:
+    stack = getattr(_open, "stack", None)
+    return stack[-1] if stack else None
+
+
+def record_span(name: str, start_ns: int, **attributes):
+    """Add a finished child span of the current span, from start_ns until now"""
+    parent = current_span()
+    if parent is None or _active is None:
+        return
+    finished = Span(name, parent, SPAN_KIND_INTERNAL, attributes, start_ns)
+    finished.end_ns = time.time_ns()
+    _active.record(finished)
+
+
+def annotate(**attributes):
+    """Set attributes on the span open on this thread"""
+    opened = current_span()
+    if opened is not None:
+        opened.attributes.update(
+            (key, value) for key, value in attributes.items() if value is not None)
+
+
+def trace_case(test_name: str, set_id: str, baseline_id: int = None, case_id: int = None,
+               **attributes):
+    """Tie the span open on this thread to one test case.
+
+    Records the case's rule, set_id and baseline id on the span. When the
+    span is the root of its trace, its trace id is derived from them, so
+    the enhancement of a baseline and every test of the cases built from
+    it share one trace, even across processes. Call it before opening
+    child spans.
+    """
+    opened = current_span()
+    if opened is None:
+        return
+    annotate(test_name=test_name, set_id=set_id, baseline_id=baseline_id,
+             case_id=case_id, **attributes)
+    if opened.parent is None:
+        key = f"{test_name}/{set_id}/" + \
+            (f"baseline/{baseline_id}" if baseline_id is not None else f"case/{case_id}")
+        opened.trace_id = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> List[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(finished: Span) -> dict:
+    record = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": finished.kind,
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": _otlp_attributes(finished.attributes),
+        "status": {"code": 2, "message": finished.error} if finished.error else {},
+    }
+    if finished.parent is not None:
+        record["parentSpanId"] = finished.parent.span_id
+    return record
+
+
+class Tracer:
+    """Writes finished spans to path in the OTLP JSON file format.
+
+    Each line is one ExportTraceServiceRequest, as written by the
+    OpenTelemetry Collector file exporter, so the file can be replayed into
+    any OTLP backend. Spans are buffered and appended batch_size at a time
+    or every flush_seconds, so several processes can trace into one file.
+    Use as a context manager around any library call.
+    """
+
+    def __init__(self, path: str, service_name: str = SERVICE_NAME, batch_size: int = 256,
+                 flush_seconds: float = 5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.resource = {"attributes": _otlp_attributes({
+            "service.name": service_name,
+            "process.pid": os.getpid(),
+            "process.command_line": " ".join(sys.argv),
+        })}
+        self.spans = 0
+        self._buffer: List[Span] = []
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, finished: Span):
+        with self._lock:
+            self._buffer.append(finished)
+            self.spans += 1
+            due = len(self._buffer) >= self.batch_size or \
+                time.monotonic() - self._flushed >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._flushed = time.monotonic()
+            if not batch:
+                return
+            line = json.dumps({"resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME},
+                                "spans": [_otlp_span(finished) for finished in batch]}],
+            }]})
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def start(self):
+        global _active
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        _active = None
+        self.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        print(f"🧭 {self.spans} spans written to {self.path}")
+        return False
+
+
+def add_trace_arguments(parser):
+    """Add --trace to a script's parser"""
+    parser.add_argument('--trace', type=str, default=None, metavar='FILE',
+                        help='Append spans of every case, stage and LLM call to FILE (OTLP JSON lines); analyze with scripts.trace')
+
+
+def trace_from_args(args):
+    """Tracer for a script's --trace option, or a no-op context without it"""
+    from contextlib import nullcontext
+    if not args.trace:
+        return nullcontext()
+    return Tracer(args.trace)
+
+
+class TraceSpan:
+    """A span read back from a trace file, times in seconds"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes",
+                 "error", "parent", "children")
+
+    def __init__(self, record: dict):
+        self.trace_id = record["traceId"]
+        self.span_id = record["spanId"]
+        self.parent_id = record.get("parentSpanId") or None
+        self.name = record["name"]
+        self.start = int(record["startTimeUnixNano"]) / 1e9
+        self.end = int(record["endTimeUnixNano"]) / 1e9
+        self.attributes = {attribute["key"]: next(iter(attribute["value"].values()))
+                           for attribute in record.get("attributes", [])}
+        self.error = (record.get("status") or {}).get("message")
+        self.parent: Optional['TraceSpan'] = None
+        self.children: List['TraceSpan'] = []
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def read_spans(paths: Iterable[str]) -> List[TraceSpan]:
+    """Spans of OTLP JSON trace files, linked to their children"""
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                for resource_spans in json.loads(line).get("resourceSpans", []):
+                    for scope_spans in resource_spans.get("scopeSpans", []):
+                        spans.extend(TraceSpan(record)
+                                     for record in scope_spans.get("spans", []))
+    by_id = {(item.trace_id, item.span_id): item for item in spans}
+    for item in spans:
+        parent = by_id.get((item.trace_id, item.parent_id))
+        if parent is not None:
+            item.parent = parent
+            parent.children.append(item)
+    return spans
+
+
+def root_spans(spans: List[TraceSpan]) -> List[TraceSpan]:
+    ids = {(item.trace_id, item.span_id) for item in spans}
+    return [item for item in spans if (item.trace_id, item.parent_id) not in ids]
+
+
+def critical_path(root: TraceSpan, end: float = None) -> List[Tuple[TraceSpan, float]]:
+    """(span, seconds) segments of the chain of work that determined when root ended.
+
+    Walks back from the end: the child that finished last is on the path,
+    then whatever finished last before that child started, and so on;
+    time covered by no child is the span's own. Children running in
+    parallel with the path are left off.
+    """
+    end = root.end if end is None else end
+    segments = []
+    cursor = end
+    for child in sorted(root.children, key=lambda item: item.end, reverse=True):
+        if child.start >= cursor:
+            continue
+        child_end = min(child.end, cursor)
+        if cursor > child_end:
+            segments.append((root, cursor - child_end))
+        segments.extend(critical_path(child, child_end))
+        cursor = max(child.start, root.start)
+        if cursor <= root.start:
+            break
+    if cursor > root.start:
+        segments.append((root, cursor - root.start))
+    return segments
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))] if ordered else 0.0
+
+
+def _case_label(root: TraceSpan) -> str:
+    attributes = root.attributes
+    parts = [root.name]
+    for key, label in (("test_name", ""), ("technique", ""), ("baseline_id", "baseline "),
+                       ("case_id", "case "), ("defender_model", ""), ("iteration", "round ")):
+        if key in attributes:
+            parts.append(f"{label}{attributes[key]}")
+    if "set_id" in attributes:
+        parts.append(f"set {str(attributes['set_id'])[:8]}")
+    return " ".join(parts)
+
+
+def _step_label(item: TraceSpan) -> str:
+    """Path of a span below its root, e.g. improve/round[2]/judge/llm(gpt-3.5-turbo)"""
+    names = []
+    while item.parent is not None:
+        label = item.name
+        if "iteration" in item.attributes:
+            label += f"[{item.attributes['iteration']}]"
+        if item.name == "llm" and "model" in item.attributes:
+            label += f"({item.attributes['model']})"
+        names.append(label)
+        item = item.parent
+    return "/".join(reversed(names)) or item.name
+
+
+def analyze(spans: List[TraceSpan], top: int = 10) -> str:
+    """Critical path report: slowest stages, queueing delays and slowest cases"""
+    if not spans:
+        return "No spans found."
+    roots = root_spans(spans)
+    start = min(item.start for item in spans)
+    end = max(item.end for item in spans)
+    lines = [f"🧭 {len(spans)} spans in {len({item.trace_id for item in spans})} traces "
+             f"({len(roots)} root spans) over {end - start:.1f}s", ""]
+
+    on_path: Dict[str, float] = {}
+    paths = {}
+    for root in roots:
+        paths[id(root)] = critical_path(root)
+        for item, seconds in paths[id(root)]:
+            on_path[item.name] = on_path.get(item.name, 0.0) + seconds
+    durations: Dict[str, List[float]] = {}
+    for item in spans:
+        durations.setdefault(item.name, []).append(item.duration)
+    path_total = sum(on_path.values()) or 1.0
+
+    lines.append("Stages by time on the critical path")
+    lines.append(f"{'span':<18} {'spans':>7} {'critical s':>11} {'share':>6} {'p50 s':>8} "
+                 f"{'p95 s':>8} {'max s':>8}")
+    for name in sorted(durations, key=lambda name: on_path.get(name, 0.0), reverse=True):
+        values = durations[name]
+        lines.append(f"{name:<18} {len(values):>7} {on_path.get(name, 0.0):>11.2f} "
+                     f"{100 * on_path.get(name, 0.0) / path_total:>5.1f}% "
+                     f"{_percentile(values, 0.5):>8.3f} {_percentile(values, 0.95):>8.3f} "
+                     f"{max(values):>8.3f}")
+
+    waits: Dict[Tuple[str, str], List[float]] = {}
+    calls: Dict[str, float] = {}
+    for item in spans:
+        if item.name in QUEUE_SPANS:
+            model = str(item.attributes.get("model", "?"))
+            waits.setdefault((model, item.name), []).append(item.duration)
+        elif item.name == "llm":
+            model = str(item.attributes.get("model", "?"))
+            calls[model] = calls.get(model, 0.0) + item.duration
+    if waits:
+        lines.append("")
+        lines.append("Queueing delays")
+        lines.append(f"{'model':<22} {'wait':<17} {'waits':>6} {'total s':>9} {'p95 s':>8} "
+                     f"{'of calls':>9}")
+        for (model, name), values in sorted(waits.items(), key=lambda item: -sum(item[1])):
+            total = sum(values)
+            lines.append(f"{model:<22} {name:<17} {len(values):>6} {total:>9.2f} "
+                         f"{_percentile(values, 0.95):>8.3f} "
+                         f"{100 * total / calls[model] if calls.get(model) else 0:>8.1f}%")
+
+    lines.append("")
+    lines.append(f"Slowest {min(top, len(roots))} root spans and their critical paths")
+    for root in sorted(roots, key=lambda item: item.duration, reverse=True)[:top]:
+        lines.append(f"{root.duration:>8.2f}s  {_case_label(root)}"
+                     + (f"  ❌ {root.error}" if root.error else ""))
+        merged: List[Tuple[TraceSpan, float]] = []
+        for item, seconds in reversed(paths[id(root)]):
+            if merged and merged[-1][0] is item:
+                merged[-1] = (item, merged[-1][1] + seconds)
+            else:
+                merged.append((item, seconds))
+        steps = [f"{_step_label(item)} {seconds:.2f}s" for item, seconds in merged
+                 if seconds >= 0.005]
+        if steps:
+            lines.append("           " + " → ".join(steps))
+    return "\n".join(lines)
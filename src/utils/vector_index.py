@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from .db_manager import CASE_TABLES
+from .similarity import tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialized between threads
+    fcntl = None
+
+# Tables whose prompts are indexed
+INDEX_TABLES = CASE_TABLES
+
+DEFAULT_DIM = 256
+
+# Rows scored per matrix multiply; bounds memory at 1M+ indexed prompts
+SEARCH_BLOCK_ROWS = 65536
+
+# Serializes updates between threads; flock does the same between processes
+_update_lock = threading.Lock()
+
+
+def embed(texts: List[str], dim: int = DEFAULT_DIM) -> np.ndarray:
+    """L2-normalized signed feature hashing of word unigrams and bigrams.
+
+    Unlike TF-IDF the vectors need no fitted vocabulary, so rows embedded
+    today stay comparable with rows appended later.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    rows, columns, signs = [], [], []
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            rows.append(row)
+            columns.append(h % dim)
+            signs.append(1.0 if h & 0x80000000 else -1.0)
+    if rows:
+        np.add.at(vectors, (np.array(rows), np.array(columns)),
+                  np.array(signs, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _merge_top_k(best_scores: np.ndarray, best_refs: np.ndarray,
+                 scores: np.ndarray, refs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the k highest scores per query row from two candidate sets"""
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_refs = np.concatenate([best_refs, refs], axis=1)
+    if all_scores.shape[1] > k:
+        top = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+        all_scores = np.take_along_axis(all_scores, top, axis=1)
+        all_refs = np.take_along_axis(all_refs, top, axis=1)
+    return all_scores, all_refs
+
+
+class VectorIndex:
+    """Append-only on-disk index of prompt embeddings, one file pair per table.
+
+    {table}.vectors holds float32 rows and {table}.ids the matching row ids;
+    both are memory-mapped for search. meta.json records how many rows each
+    table holds, so a crash between appends and the metadata write is undone
+    by truncating back to the recorded size on the next update. Files cut
+    shorter than recorded are rolled back to their complete rows, and the
+    rows after those are embedded again.
+    """
+
+    def __init__(self, directory: str = None, dim: int = DEFAULT_DIM):
+        self.directory = directory or os.getenv("INDEX_DIR", "./vector_index")
+        os.makedirs(self.directory, exist_ok=True)
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.meta = {"dim": dim, "tables": {}}
+        self._load_meta()
+        self.dim = self.meta["dim"]
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+
+    def _path(self, table_name: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{table_name}.{kind}")
+
+    def _save_meta(self):
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, self.meta_path)
+
+    def count(self, table_name: str) -> int:
+        return self.meta["tables"].get(table_name, {}).get("rows", 0)
+
+    def vectors(self, table_name: str) -> np.ndarray:
+        rows = self.count(table_name)
+        if rows == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self._path(table_name, "vectors"), dtype=np.float32,
+                         mode="r", shape=(rows, self.dim))
+
+    def ids(self, table_name: str) -> np.ndarray:
+        rows = self.count(table_name)
+        if rows == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.memmap(self._path(table_name, "ids"), dtype=np.int64, mode="r", shape=(rows,))
+
+    def update(self, db, tables: List[str] = INDEX_TABLES, chunk_size: int = 10000) -> Dict[str, int]:
+        """Embed and append rows stored since the last update; returns rows added per table"""
+        fd = os.open(os.path.join(self.directory, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        with _update_lock, os.fdopen(fd, "r+b") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have appended since this index was opened
+                self._load_meta()
+                return self._append(db, tables, chunk_size)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, db, tables: List[str], chunk_size: int) -> Dict[str, int]:
+        added = {}
+        for table_name in tables:
+            state = self.meta["tables"].setdefault(
+                table_name, {"rows": 0, "last_id": 0})
+            added[table_name] = 0
+            with open(self._path(table_name, "vectors"), "ab") as vectors_file, \
+                    open(self._path(table_name, "ids"), "ab") as ids_file:
+                self._recover(table_name, state)
+                vectors_file.truncate(state["rows"] * self.dim * 4)
+                ids_file.truncate(state["rows"] * 8)
+                for columns, rows in db.iter_table_chunks(table_name, state["last_id"], chunk_size):
+                    id_column = columns.index("id")
+                    prompt_column = columns.index("prompt")
+                    vectors_file.write(
+                        embed([row[prompt_column] for row in rows], self.dim).tobytes())
+                    ids_file.write(np.array([row[id_column] for row in rows],
+                                            dtype=np.int64).tobytes())
+                    vectors_file.flush()
+                    ids_file.flush()
+                    state["rows"] += len(rows)
+                    state["last_id"] = rows[-1][id_column]
+                    added[table_name] += len(rows)
+                    self._save_meta()
+            self._save_meta()
+        return added
+
+    def _recover(self, table_name: str, state: dict):
+        """Roll the recorded size back to the complete rows left in truncated files"""
+        complete = min(os.path.getsize(self._path(table_name, "vectors")) // (self.dim * 4),
+                       os.path.getsize(self._path(table_name, "ids")) // 8)
+        if complete >= state["rows"]:
+            return
+        state["rows"] = complete
+        state["last_id"] = int(self.ids(table_name)[-1]) if complete else 0
+
+    def _blocks(self, tables: List[str]) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        for table_number, table_name in enumerate(tables):
+            vectors, ids = self.vectors(table_name), self.ids(table_name)
+            for start in range(0, len(ids), SEARCH_BLOCK_ROWS):
+                yield (table_number, np.asarray(vectors[start:start + SEARCH_BLOCK_ROWS]),
+                       np.asarray(ids[start:start + SEARCH_BLOCK_ROWS]))
+
+    def search_vectors(self, queries: np.ndarray, k: int = 10,
+                       tables: List[str] = INDEX_TABLES) -> List[List[Tuple[str, int, float]]]:
+        """Top-k (table, id, cosine similarity) per query row, best first"""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        # Packed references: table number in the high bits, row id in the low 48
+        best_refs = np.zeros((len(queries), 0), dtype=np.int64)
+        for table_number, vectors, ids in self._blocks(tables):
+            scores = queries @ vectors.T
+            refs = np.broadcast_to((table_number << 48) | ids, scores.shape)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                refs = np.take_along_axis(refs, top, axis=1)
+            best_scores, best_refs = _merge_top_k(
+                best_scores, best_refs, scores, refs, k)
+
+        results = []
+        for scores, refs in zip(best_scores, best_refs):
+            order = np.argsort(-scores)
+            results.append([(tables[refs[i] >> 48], int(refs[i] & ((1 << 48) - 1)), float(scores[i]))
+                            for i in order])
+        return results
+
+    def search(self, texts: List[str], k: int = 10,
+               tables: List[str] = INDEX_TABLES) -> List[List[Tuple[str, int, float]]]:
+        """Top-k most similar indexed prompts for each query text"""
+        return self.search_vectors(embed(texts, self.dim), k, tables)
+
+    def similar_to(self, table_name: str, row_id: int, k: int = 10,
+                   tables: List[str] = INDEX_TABLES) -> List[Tuple[str, int, float]]:
+        """Nearest neighbours of an indexed row, excluding the row itself"""
+        ids = self.ids(table_name)
+        position = np.searchsorted(ids, row_id)
+        if position >= len(ids) or ids[position] != row_id:
+            raise ValueError(f"{table_name} row {row_id} is not indexed")
+        query = np.asarray(self.vectors(table_name)[position:position + 1])
+        return [match for match in self.search_vectors(query, k + 1, tables)[0]
+                if match[:2] != (table_name, row_id)][:k]
+
+    def coverage(self, source: str = "baseline", target: str = "enhanced",
+                 threshold: float = 0.5, batch_size: int = 1024) -> Tuple[int, List[int]]:
+        """Count source rows with a target row at least threshold similar; return (covered, uncovered ids)"""
+        vectors, ids = self.vectors(source), self.ids(source)
+        covered, uncovered = 0, []
+        for start in range(0, len(ids), batch_size):
+            best = self.search_vectors(
+                np.asarray(vectors[start:start + batch_size]), 1, [target])
+            for row_id, matches in zip(ids[start:start + batch_size], best):
+                if matches and matches[0][2] >= threshold:
+                    covered += 1
+                else:
+                    uncovered.append(int(row_id))
+        return covered, uncovered
+
+    def near_duplicates(self, table_name: str, threshold: float = 0.95,
+                        batch_size: int = 1024) -> List[Tuple[int, int, float]]:
+        """Pairs of rows in a table at least threshold similar, as (lower id, higher id, score)"""
+        vectors, ids = self.vectors(table_name), self.ids(table_name)
+        pairs = []
+        for start in range(0, len(ids), batch_size):
+            queries = np.asarray(vectors[start:start + batch_size])
+            query_ids = np.asarray(ids[start:start + batch_size])
+            # Only compare against later rows so each pair is found once
+            for block_start in range(start, len(ids), SEARCH_BLOCK_ROWS):
+                block = np.asarray(
+                    vectors[block_start:block_start + SEARCH_BLOCK_ROWS])
+                block_ids = np.asarray(
+                    ids[block_start:block_start + SEARCH_BLOCK_ROWS])
+                scores = queries @ block.T
+                rows, columns = np.nonzero(scores >= threshold)
+                for row, column in zip(rows, columns):
+                    if query_ids[row] < block_ids[column]:
+                        pairs.append((int(query_ids[row]), int(block_ids[column]),
+                                      float(scores[row, column])))
+        return pairs
+
+
+def refresh_index(db, directory: str = None) -> Optional[Dict[str, int]]:
+    """Append new rows to the index in directory if one was built; None if there is none"""
+    directory = directory or os.getenv("INDEX_DIR", "./vector_index")
+    if not os.path.exists(os.path.join(directory, "meta.json")):
+        return None
+    try:
+        added = VectorIndex(directory).update(db)
+    except Exception as e:
+        print(f"Error updating the similarity index: {str(e)}")
+        return None
+    if any(added.values()):
+        print(f"📥 Indexed {', '.join(f'{count} {table}' for table, count in added.items() if count)} rows")
+    return added
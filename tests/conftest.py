@@ -0,0 +1,55 @@
+import os
+import uuid
+
+import pytest
+
+from src.utils import db_backends, db_manager
+
+# PostgreSQL tests run against this server when DB_URL points at one
+POSTGRES_URL = os.getenv("DB_URL", "")
+if not POSTGRES_URL.startswith(("postgres://", "postgresql://")):
+    POSTGRES_URL = None
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path, monkeypatch):
+    """Point every test at its own SQLite file and rate limit directory"""
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "tests.db"))
+    monkeypatch.delenv("DB_URL", raising=False)
+    monkeypatch.setenv("RATE_LIMIT_DIR", str(tmp_path / "rate_limits"))
+    monkeypatch.setenv("CLOD_API_KEY", "test")
+    monkeypatch.setattr(db_backends, "_backends", {})
+    monkeypatch.setattr(db_manager, "_verified_backends", set())
+
+
+@pytest.fixture
+def db():
+    return db_manager.TestsDB()
+
+
+@pytest.fixture
+def postgres_url(monkeypatch):
+    """DB_URL of a fresh PostgreSQL schema, dropped after the test"""
+    if not POSTGRES_URL:
+        pytest.skip("DB_URL does not point at a PostgreSQL database")
+    import psycopg
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(POSTGRES_URL, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    separator = "&" if "?" in POSTGRES_URL else "?"
+    url = f"{POSTGRES_URL}{separator}options=-csearch_path%3D{schema}"
+    monkeypatch.setenv("DB_URL", url)
+    yield url
+    for backend in db_backends._backends.values():
+        if isinstance(backend, db_backends.PostgresBackend):
+            backend.pool.close()
+    with psycopg.connect(POSTGRES_URL, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend_db(request):
+    """A TestsDB on each backend; PostgreSQL is skipped unless DB_URL is set"""
+    if request.param == "postgres":
+        request.getfixturevalue("postgres_url")
+    return db_manager.TestsDB()
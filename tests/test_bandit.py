@@ -0,0 +1,99 @@
+import pytest
+
+from src.core import tester as tester_module
+from src.utils import db_manager
+from src.utils.bandit import PRIOR_STRENGTH, CaseSelector
+
+# Ten cases in each of three arms; ids encode the arm
+CASES = ([(index, "storyline", 1) for index in range(100, 110)] +
+         [(index, "storyline", 2) for index in range(200, 210)] +
+         [(index, "coding", 3) for index in range(300, 310)])
+
+
+def arm_of(case_id):
+    return {1: ("storyline", 1), 2: ("storyline", 2), 3: ("coding", 3)}[case_id // 100]
+
+
+class Case:
+    def __init__(self, case_id):
+        self.technique, self.baseline_id = arm_of(case_id)
+
+
+def test_posteriors_are_seeded_from_arm_and_technique_outcomes():
+    selector = CaseSelector(CASES, {("storyline", 1): (9, 1)}, seed=0)
+    rate = (9 + 1) / (9 + 1 + 2)
+
+    assert selector.posteriors[("storyline", 1)] == pytest.approx(
+        [1 + PRIOR_STRENGTH * rate + 9, 1 + PRIOR_STRENGTH * (1 - rate) + 1])
+    # A baseline without results starts from its technique's rate
+    assert selector.posteriors[("storyline", 2)] == pytest.approx(
+        [1 + PRIOR_STRENGTH * rate, 1 + PRIOR_STRENGTH * (1 - rate)])
+    # A technique without results starts from an even prior
+    assert selector.posteriors[("coding", 3)] == pytest.approx(
+        [1 + PRIOR_STRENGTH / 2, 1 + PRIOR_STRENGTH / 2])
+
+    selector.update(Case(300), bypassed=True)
+    selector.update(Case(301), bypassed=False)
+    assert selector.posteriors[("coding", 3)] == pytest.approx(
+        [2 + PRIOR_STRENGTH / 2, 2 + PRIOR_STRENGTH / 2])
+
+
+@pytest.mark.parametrize("policy", ["random", "thompson", "epsilon"])
+def test_no_case_is_picked_twice(policy):
+    selector = CaseSelector(CASES, {("coding", 3): (20, 0)}, policy=policy, seed=1)
+    picked = [selector.next() for _ in range(len(CASES))]
+
+    assert sorted(picked) == sorted(case_id for case_id, _, _ in CASES)
+    assert selector.remaining() == 0
+    assert selector.next() is None
+
+
+def test_same_seed_same_choices():
+    def picks(seed):
+        selector = CaseSelector(CASES, {}, policy="thompson", seed=seed)
+        return [selector.next() for _ in range(10)]
+
+    assert picks(7) == picks(7)
+
+
+def test_exploration_tries_other_arms():
+    outcomes = {("coding", 3): (20, 0), ("storyline", 1): (0, 20), ("storyline", 2): (0, 20)}
+
+    greedy = CaseSelector(CASES, outcomes, policy="epsilon", exploration=0, seed=0)
+    assert {arm_of(greedy.next()) for _ in range(10)} == {("coding", 3)}
+
+    exploring = CaseSelector(CASES, outcomes, policy="epsilon", exploration=1, seed=0)
+    assert len({arm_of(exploring.next()) for _ in range(10)}) > 1
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        CaseSelector(CASES, {}, policy="greedy")
+    with pytest.raises(ValueError):
+        CaseSelector(CASES, {}, exploration=1.5)
+
+
+def test_adaptive_run_loads_only_the_cases_it_tests(db, monkeypatch):
+    for index in range(20):
+        db.store_enhanced_cases("S1", f"prompt {index}", "set-1", "gpt-4o-mini",
+                                baseline_id=index % 4 + 1, technique="storyline", score=8)
+    fetched = []
+    get_case = db_manager.TestsDB.get_case
+
+    def counting_get_case(self, table_name, case_id):
+        fetched.append(case_id)
+        return get_case(self, table_name, case_id)
+
+    def no_full_load(self, *args, **kwargs):
+        raise AssertionError("adaptive selection loaded every enhanced case")
+
+    monkeypatch.setattr(db_manager.TestsDB, "get_case", counting_get_case)
+    monkeypatch.setattr(db_manager.TestsDB, "get_enhanced_cases", no_full_load)
+    monkeypatch.setattr(tester_module.Tester, "get_llm_response",
+                        lambda self, prompt, defender_model: "Sure, here is how.")
+
+    results = tester_module.Tester().run_tests("S1", 0, 5, "gpt-4o", selection="thompson")
+
+    assert len(results) == 5
+    assert len(set(fetched)) == len(fetched) == 5
+    assert len({result.prompt for result in results}) == 5
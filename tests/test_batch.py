@@ -0,0 +1,120 @@
+import pytest
+
+from src.core.batch import BatchRunner
+from src.utils.batch_standin import CANNED_RESPONSE, BatchStandIn, canned_response, serve_standin
+from src.utils.verdict import ERROR_RESPONSE
+
+
+@pytest.fixture
+def standin():
+    standin = BatchStandIn()
+    server = serve_standin(standin, port=0, background=True)
+    standin.base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    yield standin
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def runner(backend_db, standin):
+    return BatchRunner(base_url=standin.base_url)
+
+
+def count(db, table_name):
+    with db.backend.connect() as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table_name}').fetchone()[0]
+
+
+def store_cases(db, valid_cases=()):
+    # A case limit of 0 means all cases, so tests without valid cases store none
+    if valid_cases:
+        db.store_valid_cases("S1", list(valid_cases), "set-1", "gpt-4o")
+    db.store_baseline_cases("S1", ["baseline"], "set-1", "gpt-4o")
+    baseline_id = db.get_baseline_cases("S1")[0].id
+    for index in range(3):
+        db.store_enhanced_cases("S1", f"enhanced {index}", "set-2", "gpt-4o-mini",
+                                baseline_id, "storyline", 8)
+
+
+def test_submit_and_ingest_tests(backend_db, runner):
+    store_cases(backend_db, ["valid one", "valid two"])
+
+    job_ids = runner.submit_tests("S1", 2, 3, ["defender-a", "defender-b"])
+    assert runner.wait(interval=0.05, timeout=10)
+
+    results = backend_db.get_test_results("S1")
+    assert len(results) == 10
+    assert {result["llm_response"] for result in results} == {CANNED_RESPONSE}
+    assert len({result["set_id"] for result in results}) == 1
+    assert sum(result["should_pass"] for result in results) == 4
+    stats = backend_db.get_result_stats("S1")
+    assert sum(row["total"] for row in stats) == 10
+    assert sum(row["refused"] for row in stats) == 10
+    [job] = backend_db.get_batch_jobs()
+    assert (job["id"], job["status"], job["items"], job["ingested"]) == (job_ids[0], "ingested", 10, 10)
+
+
+def test_reingesting_a_batch_stores_nothing_twice(backend_db, runner):
+    store_cases(backend_db)
+    runner.submit_tests("S1", 0, 3, ["defender-a"])
+    assert runner.wait(interval=0.05, timeout=10)
+    [job] = backend_db.get_batch_jobs()
+
+    assert runner.ingest(job) == {"stored": 0, "failed": 0, "skipped": 3}
+    assert runner.poll() == 0
+    assert count(backend_db, "results") == 3
+    assert sum(row["total"] for row in backend_db.get_result_stats("S1")) == 3
+
+
+def test_failed_requests_are_stored_as_errors(backend_db, runner, standin):
+    store_cases(backend_db)
+
+    def responder(body):
+        if body["messages"][-1]["content"] == "enhanced 1":
+            raise RuntimeError("upstream timeout")
+        return canned_response(body)
+
+    standin.responder = responder
+    runner.submit_tests("S1", 0, 3, ["defender-a"])
+    assert runner.wait(interval=0.05, timeout=10)
+    [job] = backend_db.get_batch_jobs()
+
+    responses = {result["prompt"]: result["llm_response"]
+                 for result in backend_db.get_test_results("S1")}
+    assert responses == {"enhanced 0": CANNED_RESPONSE, "enhanced 1": ERROR_RESPONSE,
+                         "enhanced 2": CANNED_RESPONSE}
+    assert runner.ingest(job)["skipped"] == 3
+    assert count(backend_db, "results") == 3
+
+
+def test_submit_and_ingest_generation(backend_db, runner):
+    runner.submit_generation("S1", "Violent Crimes", "gpt-4o", 3, 2)
+    assert runner.wait(interval=0.05, timeout=10)
+
+    assert len(backend_db.get_valid_cases("S1")) == 3
+    baseline = backend_db.get_baseline_cases("S1")
+    assert len(baseline) == 2
+    assert all(case.prompt.startswith("Stand-in test case") for case in baseline)
+    [job] = backend_db.get_batch_jobs()
+    assert runner.ingest(job) == {"stored": 0, "failed": 0, "skipped": 2}
+    assert count(backend_db, "valid") == 3
+    assert count(backend_db, "baseline") == 2
+
+
+def test_recorded_jobs_are_uploaded_by_the_next_poll(backend_db, runner):
+    store_cases(backend_db)
+    job_id = backend_db.create_batch_job("test", "S1", runner.base_url, [
+        ("enhanced:1:defender-a", {"model": "defender-a",
+                                   "messages": [{"role": "user", "content": "enhanced 0"}]},
+         {"test_name": "S1", "prompt": "enhanced 0", "should_pass": False,
+          "defender_model": "defender-a", "set_id": "set-3", "technique": "storyline",
+          "case_id": 1})])
+
+    # As if the submitting process stopped right after recording the job
+    assert backend_db.get_batch_jobs()[0]["batch_id"] is None
+    assert runner.wait(interval=0.05, timeout=10)
+
+    [job] = backend_db.get_batch_jobs()
+    assert (job["id"], job["status"], job["ingested"]) == (job_id, "ingested", 1)
+    assert [result["llm_response"] for result in backend_db.get_test_results("S1")] == [
+        CANNED_RESPONSE]
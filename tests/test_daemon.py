@@ -0,0 +1,67 @@
+import sys
+import threading
+
+import pytest
+
+from src.core import daemon as daemon_module
+from src.core import tester as tester_module
+
+
+@pytest.fixture
+def daemon():
+    instance = daemon_module.Daemon(max_runs=2)
+    yield instance
+    instance.shutdown()
+
+
+def wait(run, timeout=10):
+    sent = 0
+    while True:
+        sent += len(run.wait_for_events(sent, timeout))
+        if run.finished and sent == len(run.events):
+            return run.events
+
+
+def test_finished_run_already_has_its_terminal_event():
+    run = daemon_module.Run("test", {})
+    seen = []
+
+    def follow():
+        while not run.finished:
+            pass
+        # The follower's exit check must never see the status before the event
+        seen.append(run.events[-1])
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    run.write("partial line")
+    run.set_status("done", result={"total": 0})
+    follower.join(5)
+
+    assert seen == [{"type": "status", "status": "done", "result": {"total": 0}, "seq": 2}]
+    assert [event["type"] for event in run.events] == ["status", "output", "status"]
+
+
+def test_fanout_worker_output_is_captured_by_the_run(db, daemon, monkeypatch, capsys):
+    # pytest swaps sys.stdout back in between fixture setup and the test
+    monkeypatch.setattr(sys, "stdout", daemon.stdout)
+    for index in range(3):
+        db.store_enhanced_cases("S1", f"prompt {index}", "set-1", "gpt-4o-mini",
+                                baseline_id=index + 1, technique="storyline", score=8)
+
+    def get_llm_response(self, prompt, defender_model):
+        print(f"asking {defender_model}: {prompt}")
+        return "I can't help with that."
+
+    monkeypatch.setattr(tester_module.Tester, "get_llm_response", get_llm_response)
+    run = daemon.submit("test", {"rule": "S1", "max_enhanced_cases": 3,
+                                 "defender_models": {"model-a": 2, "model-b": 1}})
+    events = wait(run)
+
+    assert run.status == "done", run.error
+    assert run.result["total"] == 6
+    lines = [event["line"] for event in events if event["type"] == "output"]
+    for model in ("model-a", "model-b"):
+        for index in range(3):
+            assert f"asking {model}: prompt {index}" in lines
+    assert "asking" not in capsys.readouterr().out
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from src.utils.db_backends import _to_postgres
+from src.utils import db_manager
+
+LONG_RESPONSE = "I can't help with that request. " * 40
+
+
+def test_to_postgres_keeps_question_marks_in_literals():
+    query = "SELECT '?', \"a?\", 'it''s 5%?' FROM t WHERE a = ? AND b LIKE '%x'"
+    assert _to_postgres(query) == (
+        "SELECT '?', \"a?\", 'it''s 5%%?' FROM t WHERE a = %s AND b LIKE '%%x'")
+
+
+def test_literal_question_marks_reach_the_database(backend_db):
+    with backend_db.backend.connect() as conn:
+        row = conn.execute("SELECT 'why?', ?, '100%'", ("answer",)).fetchone()
+    assert tuple(row) == ("why?", "answer", "100%")
+
+
+def test_schema_version_is_recorded(backend_db):
+    with backend_db.backend.connect() as conn:
+        assert backend_db.backend.get_schema_version(conn) == db_manager.SCHEMA_VERSION
+
+
+def test_stores_and_reads_cases(backend_db):
+    backend_db.store_valid_cases("S1", ["valid one?", "valid two"], "set-1", "gpt-4o")
+    backend_db.store_baseline_cases("S1", ["baseline %s"], "set-1", "gpt-4o")
+    baseline = backend_db.get_baseline_cases("S1")
+    backend_db.store_enhanced_cases("S1", "enhanced?", "set-2", "gpt-4o-mini",
+                                    baseline[0].id, "storyline", 8)
+
+    assert sorted(case.prompt for case in backend_db.get_valid_cases("S1")) == [
+        "valid one?", "valid two"]
+    assert [case.prompt for case in baseline] == ["baseline %s"]
+    enhanced = backend_db.get_enhanced_cases("S1")
+    assert [(case.prompt, case.baseline_id, case.technique) for case in enhanced] == [
+        ("enhanced?", baseline[0].id, "storyline")]
+    assert backend_db.get_valid_cases("S2") == []
+
+
+def test_results_and_stats(backend_db):
+    backend_db.store_test_result("S1", "prompt?", False, "defender-a", LONG_RESPONSE,
+                                 "set-1", technique="storyline", seconds_saved=0.25)
+    backend_db.store_test_result("S1", "prompt?", False, "defender-a", "Sure, here it is",
+                                 "set-1", technique="storyline")
+    backend_db.store_test_result("S1", "valid", True, "defender-b", "Sure", "set-1")
+
+    results = backend_db.get_test_results("S1")
+    assert [result["llm_response"] for result in results] == [
+        LONG_RESPONSE, "Sure, here it is", "Sure"]
+    assert results[0]["prompt"] == "prompt?"
+    assert results[0]["seconds_saved"] == 0.25
+
+    stats = {(row["defender_model"], row["technique"]): row
+             for row in backend_db.get_result_stats("S1")}
+    assert stats[("defender-a", "storyline")]["total"] == 2
+    assert stats[("defender-a", "storyline")]["refused"] == 1
+    assert stats[("defender-a", "storyline")]["held"] == 1
+    assert stats[("defender-b", "none")]["held"] == 1
+    assert backend_db.get_result_stats(defender_model="defender-c") == []
+
+
+def test_claims_are_disjoint(backend_db):
+    backend_db.enqueue_jobs("test", [{"case": index} for index in range(5)])
+
+    first = backend_db.claim_jobs("worker-1", ["test"], lease_seconds=60, limit=2)
+    second = backend_db.claim_jobs("worker-2", ["test"], lease_seconds=60, limit=5)
+
+    assert len(first) == 2 and len(second) == 3
+    claimed = [job["payload"]["case"] for job in first + second]
+    assert sorted(claimed) == list(range(5))
+    assert backend_db.claim_jobs("worker-3", ["test"], lease_seconds=60) == []
+    assert backend_db.complete_job(first[0]["id"], "worker-1")
+    assert not backend_db.complete_job(first[1]["id"], "worker-2")
+    assert backend_db.get_job_counts() == {"test": {"done": 1, "running": 4}}
+
+
+def test_export(backend_db, tmp_path):
+    pytest.importorskip("pyarrow")
+    from src.utils.exporter import export_table
+    backend_db.store_valid_cases("S1", ["one", "two", "three"], "set-1", "gpt-4o")
+    backend_db.store_test_result("S1", "one", True, "defender-a", "Sure", "set-1",
+                                 seconds_saved=1.5)
+
+    assert export_table(backend_db, "valid", str(tmp_path), chunk_size=2) == 3
+    assert export_table(backend_db, "results", str(tmp_path), "arrow") == 1
+    assert export_table(backend_db, "valid", str(tmp_path)) == 0
+    assert os.listdir(tmp_path / "valid") == ["valid-0000000001-0000000003.parquet"]
+
+
+def test_reopening_keeps_data(backend_db):
+    backend_db.store_valid_cases("S1", ["kept"], "set-1", "gpt-4o")
+    reopened = db_manager.TestsDB(backend_db.backend)
+    assert [case.prompt for case in reopened.get_valid_cases("S1")] == ["kept"]
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from src.utils import exporter  # noqa: E402
+
+
+def store_results(db, count=3):
+    for index in range(count):
+        db.store_test_result("S1", f"prompt {index}", False, "defender-a",
+                             "I can't help with that.", "set-1", technique="roleplay",
+                             completion_tokens=10 + index, seconds_saved=index + 0.5)
+
+
+def read_table(path, fmt):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    with pa.ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_exports_real_columns_as_float64(db, tmp_path, fmt):
+    store_results(db)
+    output_dir = tmp_path / "export"
+
+    assert exporter.export_table(db, "results", str(output_dir), fmt) == 3
+
+    files = os.listdir(output_dir / "results")
+    assert files == [f"results-0000000001-0000000003{exporter.FORMATS[fmt]}"]
+    table = read_table(output_dir / "results" / files[0], fmt)
+    assert table.schema.field("seconds_saved").type == pa.float64()
+    assert table.column("seconds_saved").to_pylist() == [0.5, 1.5, 2.5]
+    assert table.column("completion_tokens").to_pylist() == [10, 11, 12]
+    assert table.column("prompt").to_pylist() == ["prompt 0", "prompt 1", "prompt 2"]
+
+
+def test_incremental_export_appends_new_rows(db, tmp_path):
+    store_results(db, 2)
+    output_dir = str(tmp_path / "export")
+    assert exporter.export_table(db, "results", output_dir) == 2
+    assert exporter.export_table(db, "results", output_dir) == 0
+
+    store_results(db, 1)
+    assert exporter.export_table(db, "results", output_dir) == 1
+    assert sorted(os.listdir(os.path.join(output_dir, "results"))) == [
+        "results-0000000001-0000000002.parquet",
+        "results-0000000003-0000000003.parquet",
+    ]
+
+
+def test_failed_export_removes_partial_file(db, tmp_path, monkeypatch):
+    store_results(db, 2)
+    output_dir = tmp_path / "export"
+    record_batch = exporter._record_batch
+    calls = []
+
+    def failing_record_batch(pa, schema, rows):
+        calls.append(rows)
+        if len(calls) > 1:
+            raise RuntimeError("disk full")
+        return record_batch(pa, schema, rows)
+
+    monkeypatch.setattr(exporter, "_record_batch", failing_record_batch)
+    with pytest.raises(RuntimeError):
+        exporter.export_table(db, "results", str(output_dir), chunk_size=1)
+
+    assert os.listdir(output_dir / "results") == []
+    # Nothing was exported, so the next export starts from the first row again
+    monkeypatch.setattr(exporter, "_record_batch", record_batch)
+    assert exporter.export_table(db, "results", str(output_dir)) == 2
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4", "snappy", "none"])
+def test_parquet_compressions(db, tmp_path, compression):
+    store_results(db, 1)
+    assert exporter.export_table(db, "results", str(tmp_path), "parquet", compression) == 1
+
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4", "none"])
+def test_arrow_compressions(db, tmp_path, compression):
+    store_results(db, 1)
+    assert exporter.export_table(db, "results", str(tmp_path), "arrow", compression) == 1
+
+
+def test_arrow_rejects_snappy(db, tmp_path):
+    store_results(db, 1)
+    with pytest.raises(ValueError, match="arrow exports support"):
+        exporter.export_table(db, "results", str(tmp_path), "arrow", "snappy")
+    assert not os.path.exists(tmp_path / "results")
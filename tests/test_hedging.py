@@ -0,0 +1,128 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import llm, rate_limiter
+from src.utils.hedging import HedgedRequester, LatencyTracker
+
+
+def warmed_tracker(model="m", samples=200, seconds=0.01):
+    tracker = LatencyTracker()
+    for _ in range(samples):
+        tracker.record(model, seconds)
+    return tracker
+
+
+def test_deadline_raises_timeout():
+    requester = HedgedRequester(timeout=0.1, hedge_budget=0)
+    release = threading.Event()
+    try:
+        with pytest.raises(TimeoutError):
+            requester.call("m", lambda timeout, hedge: release.wait(2))
+    finally:
+        release.set()
+    assert requester.tracker.counts["m"]["timeouts"] == 1
+
+
+def test_no_hedge_before_min_samples():
+    requester = HedgedRequester(hedge_budget=1.0, min_samples=5,
+                                tracker=warmed_tracker(samples=4))
+    sent = []
+
+    def send(timeout, hedge):
+        sent.append(hedge)
+        time.sleep(0.1)
+        return "done"
+
+    assert requester.hedge_delay("m") is None
+    assert requester.call("m", send) == "done"
+    assert sent == [False]
+    # The call's own latency is the fifth sample
+    assert requester.hedge_delay("m") is not None
+
+
+def test_first_finisher_wins():
+    requester = HedgedRequester(hedge_budget=1.0, tracker=warmed_tracker())
+    release = threading.Event()
+
+    def send(timeout, hedge):
+        if hedge:
+            return "hedge"
+        release.wait(2)
+        return "primary"
+
+    try:
+        assert requester.call("m", send) == "hedge"
+    finally:
+        release.set()
+    assert requester.tracker.counts["m"]["hedges"] == 1
+    assert requester.tracker.counts["m"]["hedges_won"] == 1
+
+
+def test_hedges_stay_within_budget():
+    requester = HedgedRequester(hedge_budget=0.25, tracker=warmed_tracker())
+    sent = []
+
+    def send(timeout, hedge):
+        sent.append(hedge)
+        if not hedge:
+            time.sleep(0.1)
+        return hedge
+
+    results = [requester.call("m", send) for _ in range(8)]
+    assert sent.count(True) == requester.hedges == 2
+    assert results.count(True) == 2
+
+
+@pytest.fixture
+def slots(monkeypatch):
+    monkeypatch.setattr(llm, "_model_slots", {})
+    monkeypatch.setattr(llm, "_default_slots", None)
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+
+
+@pytest.mark.parametrize("limit, expected", [(1, "primary"), (2, "hedge")])
+def test_every_copy_holds_its_own_concurrency_slot(slots, limit, expected):
+    llm.set_concurrency_limits({"m": limit})
+    requester = HedgedRequester(hedge_budget=1.0, tracker=warmed_tracker())
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+    calls = []
+
+    def create(extra):
+        with lock:
+            calls.append(len(calls))
+            first = len(calls) == 1
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.2 if first else 0)
+        with lock:
+            in_flight.pop()
+        return "primary" if first else "hedge"
+
+    result = llm._throttled(SimpleNamespace(api_key="test"), requester,
+                            {"model": "m", "messages": [{"role": "user", "content": "hi"}]},
+                            create, lambda result, estimated: None)
+    assert result == expected
+    assert max(peak) == limit
+    # The losing copy gives its slot back once its request returns
+    time.sleep(0.3)
+    slot = llm._model_slots["m"]
+    assert all(slot.acquire(blocking=False) for _ in range(limit))
+    assert not slot.acquire(blocking=False)
+
+
+def test_activated_tracker_sees_only_its_own_calls():
+    requester = HedgedRequester(hedge_budget=0)
+    requester.call("m", lambda timeout, hedge: "before")
+    run = LatencyTracker()
+    with run.activate():
+        requester.call("m", lambda timeout, hedge: "during")
+    requester.call("m", lambda timeout, hedge: "after")
+
+    assert requester.tracker.counts["m"]["calls"] == 3
+    assert run.counts["m"]["calls"] == 1
+    assert run.samples("m") == 1
@@ -0,0 +1,43 @@
+import pytest
+
+from config.models import BATCH_PRICE_FACTOR
+from src.core.daemon import plan_run
+from src.core.planner import plan_tests
+
+
+@pytest.fixture
+def enhanced_cases(db):
+    for index in range(4):
+        db.store_enhanced_cases("S1", f"enhanced {index}", "set-1", "gpt-4o-mini",
+                                index + 1, "storyline", 8)
+
+
+def test_concurrency_divides_duration(db, enhanced_cases):
+    single = plan_tests("S1", 0, 4, {"gpt-4o": 1}, db=db)
+    parallel = plan_tests("S1", 0, 4, {"gpt-4o": 4}, db=db)
+
+    assert single.calls == parallel.calls == 4
+    assert parallel.makespan == pytest.approx(single.makespan / 4)
+
+
+def test_batch_plans_use_batch_prices_and_no_duration(db, enhanced_cases):
+    regular = plan_tests("S1", 0, 4, {"gpt-4o": 4}, db=db)
+    batch = plan_tests("S1", 0, 4, {"gpt-4o": 4}, batch=True, db=db)
+
+    assert batch.calls == regular.calls
+    assert batch.tokens == regular.tokens
+    assert batch.dollars == pytest.approx(regular.dollars * BATCH_PRICE_FACTOR)
+    assert batch.makespan == 0
+    assert "batch requests" in batch.summary()
+
+
+def test_daemon_plans_use_the_job_defaults(db, enhanced_cases):
+    plan = plan_run("test", {"rule": "S1"})
+    assert [(step["model"], step["calls"]) for step in plan.steps] == [("gemini-1.5-flash", 3)]
+
+    plan = plan_run("test", {"rule": "S1", "max_enhanced_cases": 0,
+                             "defender_models": ["gpt-4o=2", "gpt-4o-mini"]})
+    assert [(step["model"], step["calls"]) for step in plan.steps] == [
+        ("gpt-4o", 4), ("gpt-4o-mini", 4)]
+    with pytest.raises(ValueError):
+        plan_run("compact", {"rule": "S1"})
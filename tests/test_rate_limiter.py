@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from src.utils.rate_limiter import TokenBucketLimiter
+
+
+def bucket_path():
+    directory = os.environ["RATE_LIMIT_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "test-m.bucket")
+
+
+def acquire_many(rpm, tpm, tokens, count, times):
+    limiter = TokenBucketLimiter(bucket_path(), rpm, tpm)
+    for _ in range(count):
+        limiter.acquire(tokens)
+        times.put(time.time())
+
+
+def settle(rpm, tpm, estimated, actual):
+    TokenBucketLimiter(bucket_path(), rpm, tpm).settle(estimated, actual)
+
+
+def drain(rpm, tpm):
+    TokenBucketLimiter(bucket_path(), rpm, tpm).drain()
+
+
+def run(target, *args):
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+
+def bucket_state(limiter):
+    """(requests, tokens) available in the shared bucket right now"""
+    return limiter._update(lambda requests, tokens: (requests, tokens, (requests, tokens)))
+
+
+# Both quotas allow a burst of 600 requests and then 10 per second
+@pytest.mark.parametrize("rpm, tpm, tokens", [(600, 10 ** 9, 1), (10 ** 6, 60000, 100)])
+def test_processes_never_exceed_the_shared_quota(rpm, tpm, tokens):
+    burst, per_second = 600, 10
+    context = multiprocessing.get_context("spawn")
+    times = context.Queue()
+    start = time.time()
+    processes = [context.Process(target=acquire_many, args=(rpm, tpm, tokens, 153, times))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    acquired = sorted(times.get(timeout=30) for _ in range(4 * 153))
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    # Never more than the burst plus what refilled since the bucket was created
+    for count, moment in enumerate(acquired, 1):
+        assert count <= burst + per_second * (moment - start) + 1
+    assert acquired[-1] - start >= (len(acquired) - burst) / per_second - 0.1
+
+
+def test_settle_and_drain_change_the_shared_bucket():
+    # Both buckets refill by one per second
+    limiter = TokenBucketLimiter(bucket_path(), 60, 60)
+    limiter.acquire(50)
+    assert bucket_state(limiter)[1] == pytest.approx(10, abs=3)
+
+    # Another process learns the request used 10 tokens, not 50
+    run(settle, 60, 60, 50, 10)
+    assert bucket_state(limiter)[1] == pytest.approx(50, abs=3)
+
+    run(drain, 60, 60)
+    requests, tokens = bucket_state(limiter)
+    assert requests < 3 and tokens < 3
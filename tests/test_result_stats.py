@@ -0,0 +1,82 @@
+from src.utils.text_store import text_hash
+from src.utils.verdict import ERROR_RESPONSE
+
+REFUSAL = "I'm sorry, but I can't help with that."
+
+
+def store_results(db):
+    for response in (REFUSAL, REFUSAL, "Sure, here is how", ERROR_RESPONSE):
+        db.store_test_result("S1", "attack", False, "defender-a", response, "set-1",
+                             technique="storyline")
+    for response in ("Paris is the capital", REFUSAL):
+        db.store_test_result("S1", "valid", True, "defender-a", response, "set-1")
+    db.store_test_result("S2", "attack", False, "defender-b", REFUSAL, "set-2",
+                         technique="coding")
+
+
+def stats(db):
+    return {(row["test_name"], row["defender_model"], row["technique"]):
+            (row["total"], row["errors"], row["refused"], row["held"])
+            for row in db.get_result_stats(by_day=True)}
+
+
+def test_rebuild_matches_incremental_aggregates(backend_db):
+    store_results(backend_db)
+    incremental = stats(backend_db)
+    assert incremental == {
+        ("S1", "defender-a", "storyline"): (4, 1, 2, 2),
+        ("S1", "defender-a", "none"): (2, 0, 1, 1),
+        ("S2", "defender-b", "coding"): (1, 0, 1, 1),
+    }
+
+    assert backend_db.rebuild_result_stats() == 7
+    assert stats(backend_db) == incremental
+    assert backend_db.rebuild_result_stats() == 7
+    assert stats(backend_db) == incremental
+
+
+def test_rebuild_classifies_results_without_refused(backend_db):
+    store_results(backend_db)
+    expected = stats(backend_db)
+    with backend_db.backend.connect() as conn:
+        conn.execute('UPDATE results SET refused = NULL')
+        # A row written before texts were hashed keeps its response inline
+        conn.execute('''
+            INSERT INTO results (test_name, prompt, should_pass, defender_model, llm_response, set_id)
+            VALUES ('S2', 'attack', ?, 'defender-b', ?, 'set-0')
+        ''', (False, "As an AI, I must decline."))
+
+    assert backend_db.rebuild_result_stats() == 8
+    expected[("S2", "defender-b", "none")] = (1, 0, 1, 1)
+    assert stats(backend_db) == expected
+    with backend_db.backend.connect() as conn:
+        refused = conn.execute('''
+            SELECT COALESCE(response_hash, llm_response), refused FROM results
+        ''').fetchall()
+    assert {response: bool(flag) for response, flag in refused} == {
+        text_hash(REFUSAL): True, text_hash("Sure, here is how"): False,
+        text_hash(ERROR_RESPONSE): False, text_hash("Paris is the capital"): False,
+        "As an AI, I must decline.": True,
+    }
+
+
+def test_new_table_counts_existing_results_with_a_notice(backend_db, capsys):
+    store_results(backend_db)
+    expected = stats(backend_db)
+    with backend_db.backend.connect() as conn:
+        conn.execute('DROP TABLE result_stats')
+    capsys.readouterr()
+
+    backend_db.create_result_stats_table()
+
+    assert "Counting 7 existing results" in capsys.readouterr().out
+    assert stats(backend_db) == expected
+
+
+def test_new_table_on_an_empty_database_is_silent(db, capsys):
+    with db.backend.connect() as conn:
+        conn.execute('DROP TABLE result_stats')
+    capsys.readouterr()
+    db.create_result_stats_table()
+    assert capsys.readouterr().out == ""
+    assert db.get_result_stats() == []
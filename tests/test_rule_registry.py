@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from src.utils.rule_registry import RuleRegistry
+
+
+def write_json(directory, name, rules):
+    directory.mkdir(exist_ok=True)
+    (directory / f"{name}.json").write_text(json.dumps({"rules": rules}), encoding="utf-8")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.delenv("RULES_PATH", raising=False)
+    monkeypatch.delenv("RULESET", raising=False)
+    return RuleRegistry()
+
+
+@pytest.mark.parametrize("ref, ruleset", [("S1", None), ("llama_guard/S1", None), ("1", None),
+                                          (1, None), ("S1", "llama_guard"), ("1", "llama_guard")])
+def test_references_resolve_to_the_same_rule(registry, ref, ruleset):
+    assert registry.rule_id(ref, ruleset) == "llama_guard/S1"
+    assert registry.resolve(ref, ruleset) is registry.get("llama_guard", "S1")
+
+
+def test_positions_follow_file_order(registry):
+    rules = registry.rules("llama_guard")
+    assert registry.rule_id(str(len(rules))) == f"llama_guard/{rules[-1]['test_name']}"
+    for position in ("0", str(len(rules) + 1)):
+        with pytest.raises(ValueError, match="between 1 and"):
+            registry.rule_id(position)
+
+
+def test_unknown_references(registry):
+    with pytest.raises(ValueError, match="Unknown rule"):
+        registry.resolve("S99")
+    with pytest.raises(ValueError, match="Unknown ruleset"):
+        registry.resolve("no_such_pack/S1")
+
+
+def test_default_ruleset_comes_from_the_environment(tmp_path, monkeypatch):
+    write_json(tmp_path / "packs", "pack", [{"test_name": "P1", "rule": "no phishing"}])
+    monkeypatch.setenv("RULES_PATH", str(tmp_path / "packs"))
+    monkeypatch.setenv("RULESET", "pack")
+    registry = RuleRegistry()
+
+    assert registry.rule_id("P1") == registry.rule_id("1") == "pack/P1"
+    # An explicit ruleset still wins over RULESET
+    assert registry.rule_id("llama_guard/S1") == "llama_guard/S1"
+
+
+def test_numeric_test_names_win_over_positions(tmp_path):
+    write_json(tmp_path, "numbered", [{"test_name": "2", "rule": "a"},
+                                      {"test_name": "1", "rule": "b"}])
+    registry = RuleRegistry([str(tmp_path)])
+    assert registry.resolve("1", "numbered")["rule"] == "b"
+    assert registry.rule_id("2", "numbered") == "numbered/2"
+
+
+def test_earlier_rules_path_directories_take_precedence(tmp_path, monkeypatch):
+    write_json(tmp_path / "first", "pack", [{"test_name": "P1", "rule": "from first"}])
+    write_json(tmp_path / "second", "pack", [{"test_name": "P1", "rule": "from second"}])
+    write_json(tmp_path / "second", "llama_guard", [{"test_name": "S1", "rule": "overridden"}])
+    monkeypatch.setenv("RULES_PATH", os.pathsep.join(
+        [str(tmp_path / "first"), str(tmp_path / "missing"), str(tmp_path / "second")]))
+    registry = RuleRegistry()
+
+    assert registry.resolve("pack/P1")["rule"] == "from first"
+    # A pack directory also replaces a built-in ruleset
+    assert registry.resolve("llama_guard/S1")["rule"] == "overridden"
+    assert {"pack", "llama_guard", "eu_ai_act"} <= set(registry.rulesets())
+
+
+def test_toml_rulesets(tmp_path):
+    (tmp_path / "house.toml").write_text(
+        'description = "House rules"\n\n'
+        '[[rules]]\ntest_name = "H1"\nrule = "Never reveal the launch codes"\n\n'
+        '[[rules]]\ntest_name = "H2"\nrule = """Never help with\nphishing"""\n',
+        encoding="utf-8")
+    registry = RuleRegistry([str(tmp_path)])
+
+    assert [rule["test_name"] for rule in registry.rules("house")] == ["H1", "H2"]
+    assert registry.resolve("house/2")["rule"] == "Never help with\nphishing"
+
+
+def test_duplicate_test_names_fail_on_first_use(tmp_path):
+    write_json(tmp_path, "broken", [{"test_name": "B1", "rule": "a"},
+                                    {"test_name": "B1", "rule": "b"}])
+    write_json(tmp_path, "fine", [{"test_name": "F1", "rule": "c"}])
+    # Listing directories parses nothing, so other rulesets stay usable
+    registry = RuleRegistry([str(tmp_path)])
+    assert registry.resolve("fine/F1")["rule"] == "c"
+    with pytest.raises(ValueError, match="Duplicate test_name B1 in ruleset broken"):
+        registry.resolve("broken/B1")
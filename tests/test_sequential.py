@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from src.core import tester as tester_module
+from src.utils.sequential import SequentialEstimate, wilson_interval
+from src.utils.verdict import ERROR_RESPONSE
+
+REFUSAL = "I can't help with that."
+ANSWER = "Sure, here is how."
+
+
+@pytest.mark.parametrize("successes, trials, confidence, expected", [
+    (5, 10, 0.95, (0.2366, 0.7634)),
+    (0, 10, 0.95, (0.0, 0.2775)),
+    (10, 10, 0.95, (0.7225, 1.0)),
+    (81, 263, 0.95, (0.2553, 0.3662)),
+    (5, 10, 0.99, (0.1842, 0.8158)),
+    (0, 0, 0.95, (0.0, 1.0)),
+])
+def test_wilson_interval_known_values(successes, trials, confidence, expected):
+    assert wilson_interval(successes, trials, confidence) == pytest.approx(expected, abs=1e-4)
+
+
+def test_no_stop_before_min_cases():
+    estimate = SequentialEstimate(threshold=0.1, min_cases=5)
+    for _ in range(4):
+        estimate.update(True)
+        assert estimate.stop_reason() is None
+    # 4 of 4 would already clear the threshold
+    assert estimate.interval()[0] > 0.1
+    estimate.update(True)
+    assert estimate.stop_reason() == "above threshold"
+
+
+def test_below_threshold():
+    estimate = SequentialEstimate(threshold=0.9, min_cases=5)
+    for _ in range(5):
+        estimate.update(False)
+    assert estimate.stop_reason() == "below threshold"
+
+
+def test_precise_once_the_interval_is_narrow():
+    estimate = SequentialEstimate(width=0.3, threshold=0.5)
+    widths = []
+    while estimate.stop_reason() is None:
+        estimate.update(estimate.trials % 2 == 0)
+        low, high = estimate.interval()
+        widths.append(high - low)
+    assert estimate.stop_reason() == "precise"
+    assert widths[-1] <= 0.3 < widths[-2]
+
+
+def test_invalid_confidence():
+    with pytest.raises(ValueError):
+        SequentialEstimate(confidence=1.0)
+
+
+@pytest.fixture
+def defenders(db, monkeypatch):
+    """30 enhanced cases and defenders that refuse, alternate, or fail every other call"""
+    for index in range(30):
+        db.store_enhanced_cases("S1", f"prompt {index}", "set-1", "gpt-4o-mini",
+                                baseline_id=index + 1, technique="storyline", score=8)
+    calls = {}
+    lock = threading.Lock()
+    behaviours = {
+        "refuser": lambda call: REFUSAL,
+        "alternating": lambda call: REFUSAL if call % 2 else ANSWER,
+        "flaky": lambda call: REFUSAL if call % 2 else ERROR_RESPONSE,
+    }
+
+    def get_llm_response(self, prompt, defender_model):
+        with lock:
+            call = calls[defender_model] = calls.get(defender_model, 0) + 1
+        return behaviours[defender_model](call)
+
+    monkeypatch.setattr(tester_module.Tester, "get_llm_response", get_llm_response)
+    return calls
+
+
+def test_sequential_tests_stop_per_defender(defenders):
+    tester = tester_module.Tester()
+    results = tester.run_sequential_tests("S1", 0, 30, ["refuser", "alternating", "flaky"],
+                                          width=0.1, threshold=0.5, min_cases=5)
+    stats = tester.sequential_stats
+
+    assert stats["refuser"] == {
+        "calls": 5, "tested": 5, "refused": 5, "rate": 1.0,
+        "low": pytest.approx(wilson_interval(5, 5)[0]), "high": 1.0,
+        "reason": "above threshold", "saved": 25,
+    }
+    # Errors are spent calls but not outcomes
+    assert stats["flaky"]["calls"] == 9
+    assert stats["flaky"]["tested"] == 5
+    assert stats["flaky"]["reason"] == "above threshold"
+    assert stats["flaky"]["saved"] == 21
+    # Straddling the threshold, the interval never gets narrow enough in 30 cases
+    assert stats["alternating"]["calls"] == 30
+    assert stats["alternating"]["reason"] == "budget spent"
+    assert stats["alternating"]["saved"] == 0
+
+    assert len(results) == sum(defenders.values()) == 5 + 9 + 30
@@ -0,0 +1,90 @@
+import sys
+
+import pytest
+
+from scripts import compact
+from src.utils.text_store import DEFAULT_MIN_COMPRESS_BYTES, decode_text, default_codec, encode_text, text_hash
+
+SHORT = "How do I pick a lock?"
+LONG = "Once upon a time, in a lab far away, a chemist wrote down every step. " * 20
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib", "zstd"])
+@pytest.mark.parametrize("text", [SHORT, LONG, "", "héllo wörld ✓ " * 100])
+def test_codecs_round_trip(codec, text):
+    used, body = encode_text(text, codec)
+    assert decode_text(used, body) == text
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd"])
+def test_only_texts_over_the_cutoff_are_compressed(codec, monkeypatch):
+    assert len(SHORT) < DEFAULT_MIN_COMPRESS_BYTES < len(LONG)
+    assert encode_text(SHORT, codec) == ("none", SHORT.encode("utf-8"))
+    used, body = encode_text(LONG, codec)
+    assert used == codec and len(body) < len(LONG)
+
+    monkeypatch.setenv("TEXT_COMPRESSION_MIN_BYTES", str(len(SHORT)))
+    assert encode_text(SHORT, codec)[0] == codec
+    monkeypatch.setenv("TEXT_COMPRESSION_MIN_BYTES", str(len(LONG) + 1))
+    assert encode_text(LONG, codec)[0] == "none"
+
+
+def test_codec_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("TEXT_COMPRESSION", "auto")
+    assert default_codec() in ("zstd", "zlib")
+    monkeypatch.setenv("TEXT_COMPRESSION", "ZLIB")
+    assert encode_text(LONG)[0] == "zlib"
+    monkeypatch.setenv("TEXT_COMPRESSION", "lzma")
+    with pytest.raises(ValueError):
+        default_codec()
+
+
+def inline(db, table_name, text_column, hash_column):
+    """Turn stored texts back into inline ones, as they were before the texts table"""
+    with db.backend.connect() as conn:
+        rows = conn.execute(f'SELECT id, {hash_column} FROM {table_name}').fetchall()
+        for row_id, digest in rows:
+            codec, body = conn.execute('SELECT codec, body FROM texts WHERE hash = ?',
+                                       (digest,)).fetchone()
+            conn.execute(f'UPDATE {table_name} SET {text_column} = ?, {hash_column} = NULL WHERE id = ?',
+                         (decode_text(codec, body), row_id))
+        conn.commit()
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib", "zstd"])
+def test_inline_texts_migrate_into_the_texts_table(backend_db, monkeypatch, capsys, codec):
+    monkeypatch.setenv("TEXT_COMPRESSION", codec)
+    db = backend_db
+    db.store_baseline_cases("S1", ["attack"], "set-1", "gpt-4o-mini")
+    db.store_enhanced_cases("S1", LONG, "set-1", "gpt-4o-mini", 1, "storyline", 8)
+    db.store_enhanced_cases("S1", SHORT, "set-1", "gpt-4o-mini", 1, "coding", 7)
+    # The long text is an enhanced prompt, a tested prompt and a response
+    for response in (LONG, "I can't help with that."):
+        db.store_test_result("S1", LONG, False, "gpt-4o", response, "set-2", "storyline")
+    enhanced = sorted(case.prompt for case in db.get_enhanced_cases("S1"))
+    results = sorted((row["prompt"], row["llm_response"]) for row in db.get_test_results("S1"))
+
+    inline(db, "enhanced", "prompt", "prompt_hash")
+    inline(db, "results", "prompt", "prompt_hash")
+    inline(db, "results", "llm_response", "response_hash")
+    with db.backend.connect() as conn:
+        conn.execute('DELETE FROM texts')
+        conn.commit()
+
+    monkeypatch.setattr(sys, "argv", ["compact", "--chunk-size", "1"])
+    compact.main()
+    assert "Moved 6 texts" in capsys.readouterr().out
+    assert db.migrate_inline_texts() == 0
+
+    assert sorted(case.prompt for case in db.get_enhanced_cases("S1")) == enhanced
+    assert sorted((row["prompt"], row["llm_response"]) for row in db.get_test_results("S1")) == results
+    with db.backend.connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM enhanced WHERE prompt != ''").fetchone()[0] == 0
+        stored = {digest: (used, size) for digest, used, size in
+                  conn.execute('SELECT hash, codec, size FROM texts').fetchall()}
+    # Each distinct text once, compressed only over the cutoff
+    assert stored == {
+        text_hash(LONG): (codec, len(LONG)),
+        text_hash(SHORT): ("none", len(SHORT)),
+        text_hash("I can't help with that."): ("none", len("I can't help with that.")),
+    }
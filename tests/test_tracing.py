@@ -0,0 +1,94 @@
+import hashlib
+import multiprocessing
+
+import pytest
+
+from src.utils import tracing
+from src.utils.tracing import TraceSpan, critical_path, read_spans, root_spans
+
+
+def make(name, start, end, parent=None):
+    item = TraceSpan({"traceId": "t", "spanId": name, "name": name,
+                      "parentSpanId": parent.span_id if parent else "",
+                      "startTimeUnixNano": str(int(start * 1e9)),
+                      "endTimeUnixNano": str(int(end * 1e9))})
+    if parent is not None:
+        item.parent = parent
+        parent.children.append(item)
+    return item
+
+
+def path_of(segments):
+    return [(item.name, pytest.approx(seconds)) for item, seconds in segments]
+
+
+def test_critical_path_skips_parallel_children_and_counts_gaps():
+    root = make("root", 0, 10)
+    first = make("first", 1, 4, root)
+    make("inside_first", 2, 3, root)
+    last = make("last", 5, 9, root)
+    make("beside_last", 6, 8, root)
+    make("nested", 5, 7, last)
+    make("nested_in_first", 1, 2, first)
+
+    assert path_of(critical_path(root)) == [
+        ("root", 1), ("last", 2), ("nested", 2), ("root", 1),
+        ("first", 2), ("nested_in_first", 1), ("root", 1)]
+    assert sum(seconds for _, seconds in critical_path(root)) == pytest.approx(root.duration)
+
+
+def test_critical_path_of_a_leaf_is_its_own_time():
+    assert path_of(critical_path(make("leaf", 2, 5))) == [("leaf", 3)]
+
+
+def test_child_running_past_its_parent_is_cut_at_the_parent_end():
+    root = make("root", 0, 4)
+    make("late", 1, 6, root)
+    assert path_of(critical_path(root)) == [("late", 3), ("root", 1)]
+
+
+def trace_step(path, name, baseline_id, case_id):
+    """Trace one root span of a case into path, the way a separate script run would"""
+    with tracing.Tracer(path):
+        with tracing.span(name):
+            tracing.trace_case("S1", "set-1", baseline_id=baseline_id, case_id=case_id)
+            with tracing.span("llm", model="gpt-4o"):
+                pass
+
+
+def run(target, *args):
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+
+def test_trace_case_ids_are_shared_across_processes(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    run(trace_step, path, "enhance", 3, None)
+    run(trace_step, path, "test", 3, 17)
+    run(trace_step, path, "test", 4, 18)
+    trace_step(path, "test", None, 19)
+
+    spans = read_spans([path])
+    # Keyed by case id, or baseline id for the enhancement; OTLP stores ints as strings
+    roots = {item.attributes.get("case_id") or item.attributes["baseline_id"]: item
+             for item in root_spans(spans)}
+    assert len(roots) == 4
+    expected = hashlib.sha256(b"S1/set-1/baseline/3").hexdigest()[:32]
+    # Enhancing a baseline and testing a case built from it land in one trace
+    assert roots["3"].trace_id == roots["17"].trace_id == expected
+    assert roots["18"].trace_id != expected
+    assert roots["19"].trace_id == hashlib.sha256(b"S1/set-1/case/19").hexdigest()[:32]
+    # Children are written with their root's derived trace id
+    for root in roots.values():
+        assert [child.name for child in root.children] == ["llm"]
+
+
+def test_trace_case_leaves_child_spans_in_their_trace(tmp_path):
+    with tracing.Tracer(str(tmp_path / "trace.jsonl")):
+        with tracing.span("run") as run_span:
+            with tracing.span("case") as case_span:
+                tracing.trace_case("S1", "set-1", baseline_id=3)
+    assert case_span.trace_id == run_span.trace_id
+    assert case_span.attributes["baseline_id"] == 3
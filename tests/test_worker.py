@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from src.core import worker as worker_module
+from src.utils import db_manager
+
+# Fresh interpreters, so no process inherits a parent's connections or pool
+spawn = multiprocessing.get_context("spawn")
+
+
+def claim_until_empty(worker_id, claimed):
+    db = db_manager.TestsDB()
+    ids = []
+    while True:
+        jobs = db.claim_jobs(worker_id, ["test"], lease_seconds=60)
+        if not jobs:
+            break
+        ids.extend(job["id"] for job in jobs)
+        db.complete_job(jobs[0]["id"], worker_id)
+    claimed.put((worker_id, ids))
+
+
+def claim_and_die(lease_seconds):
+    db = db_manager.TestsDB()
+    assert db.claim_jobs("doomed", ["test"], lease_seconds)
+    os._exit(1)
+
+
+def run_crashing_worker(lease_seconds):
+    worker = worker_module.Worker(["test"], lease_seconds, poll_interval=0.1)
+
+    def crash(payload):
+        # Die mid-job without completing, failing or releasing the lease
+        os._exit(1)
+
+    worker._run_test = crash
+    worker.run(max_jobs=1)
+
+
+def start(target, *args):
+    process = spawn.Process(target=target, args=args)
+    process.start()
+    return process
+
+
+def job_rows(db):
+    with db.backend.connect() as conn:
+        return conn.execute(
+            'SELECT id, status, worker_id, attempts FROM jobs ORDER BY id').fetchall()
+
+
+def test_concurrent_claimers_never_share_a_job(backend_db):
+    backend_db.enqueue_jobs("test", [{"case": index} for index in range(60)])
+    claimed = spawn.Queue()
+
+    processes = [start(claim_until_empty, f"worker-{index}", claimed) for index in range(4)]
+    results = dict(claimed.get(timeout=60) for _ in processes)
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+
+    ids = [job_id for worker_ids in results.values() for job_id in worker_ids]
+    assert len(ids) == len(set(ids)) == 60
+    assert backend_db.get_job_counts() == {"test": {"done": 60}}
+    assert {attempts for _, _, _, attempts in job_rows(backend_db)} == {1}
+
+
+def test_expired_lease_is_requeued(backend_db):
+    backend_db.enqueue_jobs("test", [{"case": 1}])
+    process = start(claim_and_die, 1)
+    process.join(30)
+    assert process.exitcode == 1
+
+    # Still leased to the dead process until the lease runs out
+    assert backend_db.claim_jobs("survivor", ["test"], lease_seconds=60) == []
+    time.sleep(2.1)
+    jobs = backend_db.claim_jobs("survivor", ["test"], lease_seconds=60)
+
+    assert [(job["worker_id"], job["attempts"]) for job in jobs] == [("survivor", 2)]
+    assert not backend_db.complete_job(jobs[0]["id"], "doomed")
+    assert backend_db.complete_job(jobs[0]["id"], "survivor")
+
+
+def test_jobs_whose_workers_keep_dying_are_parked(backend_db):
+    backend_db.enqueue_jobs("test", [{"case": 1}])
+    # A negative lease has already expired when it is granted
+    for attempt in range(1, db_manager.MAX_JOB_ATTEMPTS + 1):
+        jobs = backend_db.claim_jobs(f"worker-{attempt}", ["test"], lease_seconds=-1)
+        assert [job["attempts"] for job in jobs] == [attempt]
+
+    assert backend_db.claim_jobs("worker-last", ["test"], lease_seconds=60) == []
+    assert job_rows(backend_db)[0][1:] == (
+        "failed", f"worker-{db_manager.MAX_JOB_ATTEMPTS}", db_manager.MAX_JOB_ATTEMPTS)
+
+
+def test_crashed_worker_job_is_picked_up_again(backend_db, monkeypatch):
+    backend_db.enqueue_jobs("test", [{"case": 1}, {"case": 2}])
+    process = start(run_crashing_worker, 1)
+    process.join(60)
+    assert process.exitcode == 1
+    crashed = [row for row in job_rows(backend_db) if row[1] == "running"]
+    assert len(crashed) == 1
+
+    time.sleep(2.1)
+    ran = []
+    survivor = worker_module.Worker(["test"], lease_seconds=60, poll_interval=0.1)
+    monkeypatch.setattr(survivor, "_run_test", lambda payload: ran.append(payload["case"]))
+    assert survivor.run(exit_when_idle=True) == 2
+
+    assert sorted(ran) == [1, 2]
+    assert backend_db.get_job_counts() == {"test": {"done": 2}}
+    attempts = {job_id: attempts for job_id, _, _, attempts in job_rows(backend_db)}
+    assert attempts[crashed[0][0]] == 2
+
+
+@pytest.mark.parametrize("failures, status", [(1, "pending"), (db_manager.MAX_JOB_ATTEMPTS, "failed")])
+def test_failed_jobs_retry_until_attempts_run_out(db, failures, status):
+    db.enqueue_jobs("test", [{"case": 1}])
+    for _ in range(failures):
+        job = db.claim_jobs("worker", ["test"], lease_seconds=60)[0]
+        db.fail_job(job["id"], "worker", "boom")
+    assert db.get_job_counts() == {"test": {status: 1}}